@@ -10,5 +10,12 @@ class CommonConfig(AppConfig):
     verbose_name = "Touch Technology Common"
 
     def ready(self):
-        """Import Django system checks on startup."""
+        """Import Django system checks and connect signal handlers on startup."""
+        from django.db.models.signals import post_delete, post_save
+
         from . import checks  # noqa
+        from .models import SitemapNode
+        from .utils import invalidate_navigation
+
+        post_save.connect(invalidate_navigation, SitemapNode)
+        post_delete.connect(invalidate_navigation, SitemapNode)
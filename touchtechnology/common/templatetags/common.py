@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import operator
 import os
@@ -16,7 +17,9 @@ except ImportError:
     sentry_sdk = None
 
 from django.conf import settings
-from django.db.models import Model, Q
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Model
 from django.db.models.query import QuerySet
 from django.forms.boundfield import BoundField
 from django.forms.widgets import (
@@ -45,15 +48,22 @@ from touchtechnology.common.default_settings import CURRENCY_SYMBOL, SITEMAP_ROO
 from touchtechnology.common.exceptions import NotModelManager
 from touchtechnology.common.models import SitemapNode
 from touchtechnology.common.utils import (
-    create_exclude_filter,
+    NAVIGATION_VERSION_KEY,
+    cache_version_kwargs,
     get_all_perms_for_model_cached,
+    get_version_stamp,
     model_and_manager,
-    tree_for_node,
 )
 from tournamentcontrol.competition.utils import FauxQueryset
 
 logger = logging.getLogger(__name__)
 
+NAVIGATION_TIMEOUT = 600
+
+# Flattened SitemapNode trees for this process, keyed by tenant schema, each
+# stored with the version stamp it was built from.
+_navigation_trees = {}
+
 camel_case_re = re.compile(r"(?P<new_word>((?<![A-Z])[A-Z]|[A-Z](?![A-Z0-9])))")
 
 version_re = re.compile(
@@ -240,6 +250,95 @@ def do_navigation(
         )
 
 
+def _navigation_tree():
+    """
+    Return every ``SitemapNode`` as a list sorted by ``(tree_id, lft)`` with
+    the absolute URL of each precomputed. The list is built once per process
+    (and tenant) and rebuilt whenever a node is saved or deleted.
+    """
+    tenant = getattr(connection, "tenant", None)
+    key = getattr(tenant, "schema_name", None)
+    version = get_version_stamp(NAVIGATION_VERSION_KEY, tenant)
+    built_version, tree = _navigation_trees.get(key, (None, None))
+    if built_version == version:
+        return version, tree
+
+    # flatten the list of nodes to a list, sorted so that parents
+    # always appear before their children in the URL precompute loop.
+    tree = sorted(
+        SitemapNode._tree_manager.select_related("content_type", "parent"),
+        key=operator.attrgetter("tree_id", "lft"),
+    )
+
+    # Precompute URLs using the in-memory tree to avoid per-node
+    # get_ancestors() queries.
+    _url_cache = {}
+    for node in tree:
+        if node.parent_id is None:
+            if node.is_root_node() and node.slug == SITEMAP_ROOT:
+                url = "/"
+            else:
+                url = "/" + os.path.join(node.slug, "")
+        else:
+            parent_url = _url_cache[node.parent_id]
+            url = "/" + os.path.join(parent_url.strip("/"), node.slug, "")
+        if settings.APPEND_SLASH and not url.endswith("/"):
+            url += "/"
+        _url_cache[node.pk] = url
+        node._cached_absolute_url = url
+
+    _navigation_trees[key] = (version, tree)
+    return version, tree
+
+
+def _navigation_tree_for_node(tree, node):
+    """
+    In-memory equivalent of ``tree_for_node``; the ancestors, siblings and
+    children of ``node`` along with the siblings of each of its ancestors.
+    """
+    if not isinstance(node, SitemapNode):
+        real_nodes = [
+            n for n in tree if n.tree_id == node.tree_id and n.lft <= node.lft
+        ]
+        node = real_nodes[-1] if real_nodes else None
+    else:
+        node = next((n for n in tree if n.pk == node.pk), None)
+
+    if node is None:
+        return []
+
+    ancestors = {
+        n.pk: n
+        for n in tree
+        if n.tree_id == node.tree_id and n.lft < node.lft and n.rght > node.rght
+    }
+    parent_ids = {node.parent_id} | {n.parent_id for n in ancestors.values()}
+
+    return [
+        n
+        for n in tree
+        if n.level <= node.level + 1
+        and (
+            n.pk in ancestors
+            or n.parent_id in parent_ids
+            or (n.tree_id == node.tree_id and node.lft < n.lft < node.rght)
+        )
+    ]
+
+
+def _navigation_cache_key(node):
+    if node is None:
+        return None
+    return (
+        type(node).__name__,
+        getattr(node, "pk", None),
+        node.tree_id,
+        node.lft,
+        node.rght,
+        node.level,
+    )
+
+
 def _do_navigation(
     root=None,
     start_at=None,
@@ -249,8 +348,6 @@ def _do_navigation(
     template_name=None,
     **kwargs,
 ):
-    nodes = SitemapNode._tree_manager.select_related("content_type", "parent")
-
     if template_name is None:
         template_name = "touchtechnology/common/templatetags/navigation.html"
 
@@ -262,19 +359,50 @@ def _do_navigation(
     logger.debug("expand_all_nodes: %r", expand_all_nodes)
     logger.debug("current_node: %r", current_node)
 
-    if root is not None:
-        if isinstance(root, str):
-            try:
-                root = resolve(root).kwargs.get("node")
-            except Resolver404:
-                root = resolve(reverse(root)).kwargs.get("node")
+    has_root = root is not None
+    if isinstance(root, str):
+        try:
+            root = resolve(root).kwargs.get("node")
+        except Resolver404:
+            root = resolve(reverse(root)).kwargs.get("node")
+
+    version, all_nodes = _navigation_tree()
+    nodes = all_nodes
+
+    # The rendered fragment depends only on the arguments and the version of
+    # the tree, so reuse it across renders (header, footer, sidebar, ...).
+    cache_key = "navigation:%s:%s" % (
+        version,
+        hashlib.md5(
+            repr(
+                (
+                    template_name,
+                    has_root,
+                    _navigation_cache_key(root),
+                    _navigation_cache_key(current_node),
+                    start_at,
+                    stop_at,
+                    bool(expand_all_nodes),
+                )
+            ).encode()
+        ).hexdigest(),
+    )
+    v_kw = cache_version_kwargs(getattr(connection, "tenant", None))
+    html = cache.get(cache_key, **v_kw)
+    if html is not None:
+        return html
 
+    if has_root:
         logger.debug("root: %r", root)
 
-        try:
-            nodes = root.get_descendants(include_self=True)
-        except AttributeError:
-            nodes = SitemapNode.objects.none()
+        if isinstance(root, SitemapNode):
+            nodes = [
+                n
+                for n in all_nodes
+                if n.tree_id == root.tree_id and root.lft <= n.lft <= root.rght
+            ]
+        else:
+            nodes = []
 
         if (
             current_node is not None
@@ -282,46 +410,27 @@ def _do_navigation(
             and root.lft < current_node.lft
             and not expand_all_nodes
         ):
-            nodes = tree_for_node(current_node)
+            nodes = _navigation_tree_for_node(all_nodes, current_node)
 
     elif current_node is not None and not expand_all_nodes:
-        nodes = tree_for_node(current_node)
+        nodes = _navigation_tree_for_node(all_nodes, current_node)
 
     logger.debug("nodes: %r", nodes)
 
     # make sure we hide any nodes that are in a hidden part of the tree
-    nodes_hidden_from_navigation = nodes.filter(
-        Q(hidden_from_navigation=True) | Q(enabled=False)
-    )
-
-    hidden_from_navigation = create_exclude_filter(nodes_hidden_from_navigation)
-
-    nodes = nodes.exclude(hidden_from_navigation)
+    nodes_hidden_from_navigation = [
+        n for n in nodes if n.hidden_from_navigation or not n.enabled
+    ]
 
-    logger.debug("nodes[cleaned]: %r", nodes)
+    def is_hidden(node):
+        return any(
+            node.tree_id == hidden.tree_id and hidden.lft <= node.lft <= hidden.rght
+            for hidden in nodes_hidden_from_navigation
+        )
 
-    # flatten the list of nodes to a list, sorted so that parents
-    # always appear before their children in the URL precompute loop.
-    tree = sorted(nodes, key=operator.attrgetter("tree_id", "lft"))
+    tree = [n for n in nodes if not is_hidden(n)]
 
-    # Precompute URLs using the in-memory tree to avoid per-node
-    # get_ancestors() queries.
-    _url_cache = {}
-    for node in tree:
-        if node.parent_id is None:
-            if node.is_root_node() and node.slug == SITEMAP_ROOT:
-                url = "/"
-            else:
-                url = "/" + os.path.join(node.slug, "")
-        elif node.parent_id in _url_cache:
-            parent_url = _url_cache[node.parent_id]
-            url = "/" + os.path.join(parent_url.strip("/"), node.slug, "")
-        else:
-            url = node.get_absolute_url()
-        if settings.APPEND_SLASH and not url.endswith("/"):
-            url += "/"
-        _url_cache[node.pk] = url
-        node._cached_absolute_url = url
+    logger.debug("nodes[cleaned]: %r", tree)
 
     if current_node is None and not expand_all_nodes:
         stop_at = max(start_at or 0, stop_at or 0, 0)
@@ -365,7 +474,9 @@ def _do_navigation(
         "stop_at": stop_at,
     }
 
-    return render_to_string(template_name, context)
+    html = render_to_string(template_name, context)
+    cache.set(cache_key, html, timeout=NAVIGATION_TIMEOUT, **v_kw)
+    return html
 
 
 @register.simple_tag
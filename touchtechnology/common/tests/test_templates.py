@@ -254,6 +254,42 @@ class NavigationQueryPerformanceTest(TestCase):
         )
 
 
+class NavigationCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.home = SitemapNode.objects.create(title="Home", slug="home")
+        cls.about = SitemapNode.objects.create(title="About", slug="about")
+        cls.team = SitemapNode.objects.create(
+            title="Team", slug="team", parent=cls.about
+        )
+
+    def test_repeat_render_without_queries(self):
+        template = Template("{% load common %}{% navigation current_node=node %}")
+        context = Context({"node": self.team})
+        value = template.render(context)
+        with self.assertNumQueries(0):
+            self.assertEqual(value, template.render(context))
+
+    def test_tree_shared_between_arguments(self):
+        Template("{% load common %}{% navigation %}").render(Context())
+        template = Template("{% load common %}{% navigation current_node=node %}")
+        with self.assertNumQueries(0):
+            template.render(Context({"node": self.team}))
+
+    def test_node_saved(self):
+        template = Template("{% load common %}{% navigation %}")
+        self.assertIn(">About</a>", template.render(Context()))
+        self.about.title = "About Us"
+        self.about.save()
+        self.assertIn(">About Us</a>", template.render(Context()))
+
+    def test_node_deleted(self):
+        template = Template("{% load common %}{% navigation %}")
+        self.assertIn(">Home</a>", template.render(Context()))
+        self.home.delete()
+        self.assertNotIn(">Home</a>", template.render(Context()))
+
+
 class TwittifyTest(TestCase):
     def test_twittify(self):
         context = Context({"value": "@goodtune"})
@@ -1,12 +1,13 @@
 import functools
 import logging
+import uuid
 from operator import attrgetter, or_
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from django.apps import apps
 from django.core.cache import cache
 from django.core.paginator import Paginator
-from django.db import connection
+from django.db import connection, transaction
 from django.db.models import Model, Q
 from django.http import Http404, HttpRequest
 from django.template.loader import select_template
@@ -271,3 +272,70 @@ def get_all_perms_for_model_cached(model, ttl=60, **extra):
         model_perms = get_all_perms_for_model(model, **extra)
         cache.set(cache_key, model_perms, timeout=ttl)
     return model_perms
+
+
+def cache_version_kwargs(tenant=None):
+    """
+    When working with multiple tenants, we want to shard the cache for each of
+    them. Use of the version is a nice way to do this as it will prevent
+    collisions while making the API consistent.
+    """
+    # TODO write a cache backend that will do this automatically, and
+    #      contribute it back to django-tenant-schemas
+    if tenant is not None:
+        return {"version": tenant.schema_name}
+    return {}
+
+
+def get_version_stamp(key, tenant=None):
+    """
+    Return the version stamp held in the shared cache under ``key``,
+    establishing one if there is none. Every process that sees the same stamp
+    can keep using whatever it has already built from that data.
+    """
+    v_kw = cache_version_kwargs(tenant)
+    version = cache.get(key, **v_kw)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None, **v_kw)
+        version = cache.get(key, **v_kw)
+    return version
+
+
+def bump_version_stamp(key, tenant=None):
+    """
+    Issue a new version stamp under ``key`` so that every process discards
+    what it has built from the previous one.
+    """
+    v_kw = cache_version_kwargs(tenant)
+    cache.set(key, uuid.uuid4().hex, timeout=None, **v_kw)
+
+
+def bump_version_stamps_on_commit(keys, tenant=None):
+    """
+    Issue new version stamps under ``keys`` straight away, so this process
+    sees its own writes, and again once the transaction commits, so no other
+    process keeps what it built from the uncommitted data in between.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    v_kw = cache_version_kwargs(tenant)
+
+    def bump():
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None, **v_kw)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+NAVIGATION_VERSION_KEY = "navigation_version"
+
+
+def invalidate_navigation(sender, instance, **kwargs):
+    """
+    When a SitemapNode is changed, issue a new version of the navigation tree
+    so that each process rebuilds it on the next render.
+    """
+    bump_version_stamps_on_commit(
+        [NAVIGATION_VERSION_KEY], getattr(connection, "tenant", None)
+    )
@@ -8,6 +8,7 @@ from django.conf import settings
 from django.contrib.sitemaps.views import sitemap
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.db import transaction
 from django.http import HttpResponseForbidden
 from django.shortcuts import redirect, render
 from django.template import RequestContext, TemplateDoesNotExist
@@ -23,178 +24,255 @@ from touchtechnology.common.default_settings import (
 from touchtechnology.common.models import SitemapNode
 from touchtechnology.common.sitemaps import NodeSitemap
 from touchtechnology.common.sites import AccountsSite
+from touchtechnology.common.utils import (
+    bump_version_stamps_on_commit,
+    cache_version_kwargs,
+    get_version_stamp,
+)
 from touchtechnology.common.views import login
 from touchtechnology.content.models import Redirect
 from touchtechnology.content.views import dispatch
 
 DEHYDRATED_URLPATTERNS_KEY = "urlpatterns"
 DEHYDRATED_URLPATTERNS_TIMEOUT = 600
+URLPATTERNS_VERSION_KEY = "urlpatterns_version"
+REDIRECTS_KEY = "redirects"
+REDIRECTS_VERSION_KEY = "redirects_version"
 
 logger = logging.getLogger(__name__)
 protect = AccountsSite(name="protect")
 
-
-class SitemapNodeMiddleware(MiddlewareMixin):
-    def process_request(self, request):
-        # When working with multiple tenants, we want to shard the cache for
-        # each of them. Use of the version is a nice way to do this as it will
-        # prevent collisions while making the API consistent.
-        v_kw = {}
-        if hasattr(request, "tenant"):
-            v_kw.setdefault("version", request.tenant.schema_name)
-
-        # TODO write a cache backend that will do this automatically, and
-        #      contribute it back to django-tenant-schemas
-
-        dehydrated = cache.get(DEHYDRATED_URLPATTERNS_KEY, [], **v_kw)
-
-        if not dehydrated:
-            logging.getLogger("newrelic.cache").debug("RECALCULATE URLCONF")
-
-            # We need a secret set of account urls so we can bounce the user
-            # here if the page is protected. As we haven't yet embedded our
-            # url conf (we're in the middle of building it!) this will need
-            # to be found using a reverse_lazy below.
-            try:
-                root = SitemapNode._tree_manager.root_nodes().first()
-            except ObjectDoesNotExist:
-                root = None
-            dehydrated.append(
-                {"route": "p/", "site": protect, "kwargs": {"node": root}}
-            )
-
-            enabled_nodes = SitemapNode._tree_manager.all()
-            related_nodes = enabled_nodes.select_related("content_type")
-
-            def has_disabled_ancestors(st):
-                for ancestor in st["ancestors"]:
-                    if not ancestor.enabled:
-                        return True
-                return False
-
-            def get_absolute_url(n, st):
-                assert not n.is_root_node()
-                offset = 1 if st["ancestors"][0].slug == SITEMAP_ROOT else 0
-                paths = [ancestor.slug for ancestor in st["ancestors"][offset:]]
-                if paths:
-                    return os.path.join(os.path.join(*paths), n.slug)
-                return n.slug
-
-            for node, struct in tree_item_iterator(related_nodes, True, lambda x: x):
-                # Skip over nodes that they themselves or have disabled ancestors.
-                if not node.enabled:
-                    logger.debug("%r is disabled, omit from urlconf", node)
-                    continue
-                if has_disabled_ancestors(struct):
-                    logger.debug("%r has disabled ancestor, omit from urlconf", node)
-                    continue
-
-                if node.is_root_node() and node.slug == SITEMAP_ROOT:
-                    part = ""
-                elif node.is_root_node():
-                    part = node.slug
+# Rehydrated urlconf modules for this process, keyed by tenant schema and
+# ROOT_URLCONF, each stored with the version stamp it was built from. The
+# ``SitemapNode`` and ``Application`` instances in their patterns are shared by
+# every request and thread, so they must be treated as read-only once built.
+_urlconfs = {}
+
+# Redirect tables for this process, keyed by tenant schema, each stored with
+# the version stamp it was loaded at.
+_redirects = {}
+
+
+def bump_urlpatterns_version(tenant=None):
+    """
+    Discard the dehydrated urlpatterns and issue a new version stamp so that
+    every process rebuilds its urlconf on the next request.
+    """
+    v_kw = cache_version_kwargs(tenant)
+
+    def discard():
+        cache.delete(DEHYDRATED_URLPATTERNS_KEY, **v_kw)
+
+    # Repeat once the transaction commits, in case a request rebuilt the
+    # patterns from the old rows in the meantime.
+    discard()
+    transaction.on_commit(discard)
+    bump_version_stamps_on_commit([URLPATTERNS_VERSION_KEY], tenant)
+
+
+def get_redirects(tenant=None):
+    """
+    Return the mapping of ``source_url`` to ``(destination_url, permanent)``
+    for every ``Redirect``. The table is loaded once per process and shared
+    through the cache, and reloaded when the version stamp is bumped.
+    """
+    key = getattr(tenant, "schema_name", None)
+    version = get_version_stamp(REDIRECTS_VERSION_KEY, tenant)
+    built_version, redirects = _redirects.get(key, (None, None))
+    if built_version != version:
+        v_kw = cache_version_kwargs(tenant)
+        cached = cache.get(REDIRECTS_KEY, **v_kw)
+        if cached is not None and cached[0] == version:
+            redirects = cached[1]
+        else:
+            redirects = {}
+            for source_url, destination_url, permanent in Redirect.objects.values_list(
+                "source_url", "destination_url", "permanent"
+            ):
+                redirects.setdefault(source_url, (destination_url, permanent))
+            cache.set(REDIRECTS_KEY, (version, redirects), timeout=None, **v_kw)
+        _redirects[key] = (version, redirects)
+    return redirects
+
+
+def bump_redirects_version(tenant=None):
+    """
+    Issue a new version stamp for the redirect table so that every process
+    reloads it on the next request.
+    """
+    bump_version_stamps_on_commit([REDIRECTS_VERSION_KEY], tenant)
+
+
+def get_urlconf(tenant=None):
+    """
+    Return the urlconf module for the sitemap, rebuilding it only when the
+    patterns have been invalidated since it was last built. Reusing the module
+    keeps Django's resolver and reverse caches warm between requests.
+    """
+    version = get_version_stamp(URLPATTERNS_VERSION_KEY, tenant)
+    key = (getattr(tenant, "schema_name", None), settings.ROOT_URLCONF)
+    built_version, urlconf = _urlconfs.get(key, (None, None))
+    if built_version != version:
+        urlconf = build_urlconf(tenant)
+        if _urlconfs.get(key) is not None:
+            # Django's resolver caches are keyed by urlconf module; flush
+            # them so the one we are replacing can be released.
+            clear_url_caches()
+        _urlconfs[key] = (version, urlconf)
+    return urlconf
+
+
+def build_urlconf(tenant=None):
+    v_kw = cache_version_kwargs(tenant)
+    dehydrated = cache.get(DEHYDRATED_URLPATTERNS_KEY, [], **v_kw)
+
+    if not dehydrated:
+        logging.getLogger("newrelic.cache").debug("RECALCULATE URLCONF")
+
+        # We need a secret set of account urls so we can bounce the user
+        # here if the page is protected. As we haven't yet embedded our
+        # url conf (we're in the middle of building it!) this will need
+        # to be found using a reverse_lazy below.
+        try:
+            root = SitemapNode._tree_manager.root_nodes().first()
+        except ObjectDoesNotExist:
+            root = None
+        dehydrated.append({"route": "p/", "site": protect, "kwargs": {"node": root}})
+
+        enabled_nodes = SitemapNode._tree_manager.all()
+        related_nodes = enabled_nodes.select_related("content_type")
+
+        def has_disabled_ancestors(st):
+            for ancestor in st["ancestors"]:
+                if not ancestor.enabled:
+                    return True
+            return False
+
+        def get_absolute_url(n, st):
+            assert not n.is_root_node()
+            offset = 1 if st["ancestors"][0].slug == SITEMAP_ROOT else 0
+            paths = [ancestor.slug for ancestor in st["ancestors"][offset:]]
+            if paths:
+                return os.path.join(os.path.join(*paths), n.slug)
+            return n.slug
+
+        for node, struct in tree_item_iterator(related_nodes, True, lambda x: x):
+            # Skip over nodes that they themselves or have disabled ancestors.
+            if not node.enabled:
+                logger.debug("%r is disabled, omit from urlconf", node)
+                continue
+            if has_disabled_ancestors(struct):
+                logger.debug("%r has disabled ancestor, omit from urlconf", node)
+                continue
+
+            if node.is_root_node() and node.slug == SITEMAP_ROOT:
+                part = ""
+            elif node.is_root_node():
+                part = node.slug
+            else:
+                part = get_absolute_url(node, struct)
+
+            if part and settings.APPEND_SLASH:
+                part += "/"
+
+            if (
+                node.content_type is not None
+                and node.content_type.model == "placeholder"
+            ):
+                try:
+                    app = node.object.site(node)
+                except (AttributeError, ImportError, ValueError):
+                    logger.exception("Application is unavailable, disabling this node.")
+                    node.disable()
                 else:
-                    part = get_absolute_url(node, struct)
-
-                if part and settings.APPEND_SLASH:
-                    part += "/"
-
-                if (
-                    node.content_type is not None
-                    and node.content_type.model == "placeholder"
-                ):
-                    try:
-                        app = node.object.site(node)
-                    except (AttributeError, ImportError, ValueError):
-                        logger.exception(
-                            "Application is unavailable, disabling this node."
-                        )
-                        node.disable()
+                    pattern = {
+                        "route": part,
+                        "site": app,
+                        "kwargs": dict(node=node, **node.kwargs),
+                        "name": app.name,
+                    }
+                    # When nesting applications we need to ensure that any
+                    # root url is not clobbered by the patterns of the
+                    # parent application. In these cases, force them to the
+                    # top of the map.
+                    if (
+                        node.parent
+                        and node.parent.content_type
+                        and node.parent.content_type.model == "placeholder"
+                    ):
+                        dehydrated.insert(0, pattern)
                     else:
-                        pattern = {
-                            "route": part,
-                            "site": app,
-                            "kwargs": dict(node=node, **node.kwargs),
-                            "name": app.name,
-                        }
-                        # When nesting applications we need to ensure that any
-                        # root url is not clobbered by the patterns of the
-                        # parent application. In these cases, force them to the
-                        # top of the map.
-                        if (
-                            node.parent
-                            and node.parent.content_type
-                            and node.parent.content_type.model == "placeholder"
-                        ):
-                            dehydrated.insert(0, pattern)
-                        else:
-                            dehydrated.append(pattern)
-
-                elif node.object_id is None:
-                    dehydrated.append(
-                        {
-                            "route": part,
-                            "view": dispatch,
-                            "kwargs": dict(node=node, url=part),
-                            "name": f"folder_{node.pk}",
-                        }
-                    )
+                        dehydrated.append(pattern)
+
+            elif node.object_id is None:
+                dehydrated.append(
+                    {
+                        "route": part,
+                        "view": dispatch,
+                        "kwargs": dict(node=node, url=part),
+                        "name": f"folder_{node.pk}",
+                    }
+                )
 
-                else:
-                    dehydrated.append(
-                        {
-                            "route": part,
-                            "view": dispatch,
-                            "kwargs": dict(page_id=node.object_id, node=node, url=part),
-                            "name": f"page_{node.object_id if node.object_id else None}",
-                        }
-                    )
-
-            cache.set(
-                DEHYDRATED_URLPATTERNS_KEY,
-                dehydrated,
-                timeout=DEHYDRATED_URLPATTERNS_TIMEOUT,
-                **v_kw,
+            else:
+                dehydrated.append(
+                    {
+                        "route": part,
+                        "view": dispatch,
+                        "kwargs": dict(page_id=node.object_id, node=node, url=part),
+                        "name": f"page_{node.object_id if node.object_id else None}",
+                    }
+                )
+
+        cache.set(
+            DEHYDRATED_URLPATTERNS_KEY,
+            dehydrated,
+            timeout=DEHYDRATED_URLPATTERNS_TIMEOUT,
+            **v_kw,
+        )
+
+    # Always start with the project wide ROOT_URLCONF and add our sitemap.xml view
+    urlpatterns = [
+        path(
+            "sitemap.xml",
+            sitemap,
+            {"sitemaps": {"nodes": NodeSitemap}},
+            name="sitemap",
+        ),
+        path("", include(settings.ROOT_URLCONF)),
+    ]
+
+    # Construct the cache of url pattern definitions. We are not keeping
+    # the actual patterns, because pickling is problematic for the .url
+    # instancemethod - instead we keep the skeleton and build it on the
+    # fly from cache... rehydrating it ;)
+    for node in dehydrated:
+        try:
+            pattern = path(
+                node["route"],
+                node["view"],
+                node["kwargs"],
+                name=node.get("name"),
+            )
+        except KeyError:
+            pattern = path(
+                node["route"],
+                node["site"].urls,
+                node["kwargs"],
+                name=node["site"].name,
             )
+        urlpatterns.append(pattern)
 
-        # Always start with the project wide ROOT_URLCONF and add our sitemap.xml view
-        urlpatterns = [
-            path(
-                "sitemap.xml",
-                sitemap,
-                {"sitemaps": {"nodes": NodeSitemap}},
-                name="sitemap",
-            ),
-            path("", include(settings.ROOT_URLCONF)),
-        ]
-
-        # Construct the cache of url pattern definitions. We are not keeping
-        # the actual patterns, because pickling is problematic for the .url
-        # instancemethod - instead we keep the skeleton and build it on the
-        # fly from cache... rehydrating it ;)
-        for node in dehydrated:
-            try:
-                pattern = path(
-                    node["route"],
-                    node["view"],
-                    node["kwargs"],
-                    name=node.get("name"),
-                )
-            except KeyError:
-                pattern = path(
-                    node["route"],
-                    node["site"].urls,
-                    node["kwargs"],
-                    name=node["site"].name,
-                )
-            urlpatterns.append(pattern)
+    # Create a new module on the fly and attach the rehydrated urlpatterns
+    dynamic_urls = module_from_spec(ModuleSpec("dynamic_urls", None))
+    dynamic_urls.urlpatterns = urlpatterns
+    return dynamic_urls
 
-        # Create a new module on the fly and attach the rehydrated urlpatterns
-        dynamic_urls = module_from_spec(ModuleSpec("dynamic_urls", None))
-        dynamic_urls.urlpatterns = urlpatterns
 
+class SitemapNodeMiddleware(MiddlewareMixin):
+    def process_request(self, request):
         # Attach the module to the request
-        request.urlconf = dynamic_urls
+        request.urlconf = get_urlconf(getattr(request, "tenant", None))
 
     def process_view(self, request, view_func, view_args, view_kwargs):
         node = view_kwargs.get("node")
@@ -244,24 +322,12 @@ class SitemapNodeMiddleware(MiddlewareMixin):
             return redirect(redirect_to)
 
 
-    def process_response(self, request, response):
-        # Each request creates a unique dynamic module for request.urlconf.
-        # Django's URL system has multiple @functools.cache caches keyed by
-        # the urlconf module or its resolvers (e.g. _get_cached_resolver,
-        # get_ns_resolver). Since our dynamic module is unique per request,
-        # every request adds entries that are never evicted — causing
-        # unbounded memory growth. Use clear_url_caches() to clear all
-        # URL-related caches after each request.
-        clear_url_caches()
-        return response
-
-
 def redirect_middleware(get_response):
     def middleware(request):
-        objects = Redirect.objects.filter(source_url__exact=request.path)
-        if objects.exists():
-            instance = objects.first()
-            return redirect(instance.destination_url, instance.permanent)
+        redirects = get_redirects(getattr(request, "tenant", None))
+        if request.path in redirects:
+            destination_url, permanent = redirects[request.path]
+            return redirect(destination_url, permanent=permanent)
         return get_response(request)
 
     return middleware
@@ -1,6 +1,12 @@
+from django.http import HttpResponse
+from django.test import RequestFactory
 from django.urls.resolvers import _get_cached_resolver, get_ns_resolver
 from test_plus.test import TestCase
 
+from touchtechnology.common.models import SitemapNode
+from touchtechnology.content.middleware import redirect_middleware
+from touchtechnology.content.tests import factories
+
 
 class SitemapNodeMiddlewareMemoryLeakTest(TestCase):
     def test_resolver_cache_does_not_grow_per_request(self):
@@ -34,3 +40,62 @@ class SitemapNodeMiddlewareMemoryLeakTest(TestCase):
             0,
             "`get_ns_resolver` cache grew by %d entries over 10 requests" % growth,
         )
+
+
+class SitemapNodeMiddlewareUrlconfTest(TestCase):
+    def test_urlconf_reused_between_requests(self):
+        sitemap_url = self.reverse("sitemap")
+        first = self.client.get(sitemap_url).wsgi_request.urlconf
+        second = self.client.get(sitemap_url).wsgi_request.urlconf
+        self.assertIs(first, second)
+
+    def test_urlconf_rebuilt_when_node_saved(self):
+        sitemap_url = self.reverse("sitemap")
+        first = self.client.get(sitemap_url).wsgi_request.urlconf
+
+        SitemapNode.objects.create(title="Folder", slug="folder")
+        second = self.client.get(sitemap_url).wsgi_request.urlconf
+        self.assertIsNot(first, second)
+        self.assertIn("folder/", [p.pattern._route for p in second.urlpatterns])
+
+    def test_urlconf_rebuilt_when_node_deleted(self):
+        node = SitemapNode.objects.create(title="Folder", slug="folder")
+        sitemap_url = self.reverse("sitemap")
+        first = self.client.get(sitemap_url).wsgi_request.urlconf
+
+        node.delete()
+        second = self.client.get(sitemap_url).wsgi_request.urlconf
+        self.assertIsNot(first, second)
+        self.assertNotIn("folder/", [p.pattern._route for p in second.urlpatterns])
+
+
+class RedirectMiddlewareTest(TestCase):
+    def setUp(self):
+        self.redirect = factories.RedirectFactory.create(
+            source_url="/old/", destination_url="/new/"
+        )
+        self.middleware = redirect_middleware(lambda request: HttpResponse())
+
+    def test_redirect(self):
+        response = self.middleware(RequestFactory().get("/old/"))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "/new/")
+
+    def test_no_match_without_queries(self):
+        self.middleware(RequestFactory().get("/other/"))
+        with self.assertNumQueries(0):
+            response = self.middleware(RequestFactory().get("/other/"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_redirect_changed(self):
+        self.middleware(RequestFactory().get("/old/"))
+        self.redirect.permanent = True
+        self.redirect.save()
+        response = self.middleware(RequestFactory().get("/old/"))
+        self.assertEqual(response.status_code, 301)
+
+    def test_redirect_deleted(self):
+        self.middleware(RequestFactory().get("/old/"))
+        self.redirect.delete()
+        response = self.middleware(RequestFactory().get("/old/"))
+        self.assertEqual(response.status_code, 200)
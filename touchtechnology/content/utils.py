@@ -5,14 +5,14 @@ import os.path
 from importlib import import_module
 
 from django.conf import settings
-from django.core.cache import cache
-from django.db.models.signals import post_save
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
 from django.db.utils import DatabaseError
 from django.utils.module_loading import import_string
 
 from touchtechnology.common.models import SitemapNode
 from touchtechnology.content.app_settings import TENANT_MEDIA_PUBLIC
-from touchtechnology.content.models import Placeholder
+from touchtechnology.content.models import Placeholder, Redirect
 
 logger = logging.getLogger(__name__)
 
@@ -79,7 +79,21 @@ def invalidate_sitemapnode_urlpatterns(sender, instance, **kwargs):
     """
     logger.debug("SitemapNodeMiddleware cache requires invalidation.")
     middleware = import_module("touchtechnology.content.middleware")
-    cache.delete(middleware.DEHYDRATED_URLPATTERNS_KEY)
+    middleware.bump_urlpatterns_version(getattr(connection, "tenant", None))
 
 
 post_save.connect(invalidate_sitemapnode_urlpatterns, SitemapNode)
+post_delete.connect(invalidate_sitemapnode_urlpatterns, SitemapNode)
+
+
+def invalidate_redirects(sender, instance, **kwargs):
+    """
+    When a Redirect is changed, issue a new version of the redirect table so
+    that each process reloads it on the next request.
+    """
+    middleware = import_module("touchtechnology.content.middleware")
+    middleware.bump_redirects_version(getattr(connection, "tenant", None))
+
+
+post_save.connect(invalidate_redirects, Redirect)
+post_delete.connect(invalidate_redirects, Redirect)
@@ -45,6 +45,7 @@ from tournamentcontrol.competition.decorators import (
     registration,
 )
 from tournamentcontrol.competition.forms import (
+    AutoScheduleForm,
     ClubAssociationForm,
     ClubRoleForm,
     CompetitionForm,
@@ -108,6 +109,8 @@ from tournamentcontrol.competition.models import (
     UndecidedTeam,
     Venue,
 )
+from tournamentcontrol.competition.progression import progress_season
+from tournamentcontrol.competition.scheduling import auto_schedule
 from tournamentcontrol.competition.sites import CompetitionAdminMixin
 from tournamentcontrol.competition.tasks import (
     build_live_stream_event_body,
@@ -449,6 +452,11 @@ class CompetitionAdminComponent(CompetitionAdminMixin, AdminComponent):
                     self.match_reschedule,
                     name="reschedule",
                 ),
+                path(
+                    "<int:season_id>/progress/",
+                    self.progress_season,
+                    name="progress",
+                ),
                 path(
                     "<int:season_id>/timeslot/",
                     include(timeslot_urls, namespace="seasonmatchtime"),
@@ -642,6 +650,11 @@ class CompetitionAdminComponent(CompetitionAdminMixin, AdminComponent):
                 self.match_schedule,
                 name="match-schedule",
             ),
+            path(
+                "schedule/auto/",
+                self.match_auto_schedule,
+                name="match-auto-schedule",
+            ),
             path(
                 "visual-schedule/",
                 self.match_visual_schedule,
@@ -2224,6 +2237,39 @@ class CompetitionAdminComponent(CompetitionAdminMixin, AdminComponent):
         templates = self.template_path("reschedule.html")
         return self.render(request, templates, context)
 
+    @competition_by_pk_m
+    @staff_login_required_m
+    def progress_season(self, request, competition, season, extra_context, **kwargs):
+        """
+        Preview every team that can be progressed across the season, and save
+        them all at once when posted.
+        """
+        progression = progress_season(season)
+        redirect_to = season.urls["edit"]
+
+        if request.method == "POST":
+            count = len(progression.save())
+            if count:
+                message = ngettext(
+                    "Teams have been progressed into %(count)d match.",
+                    "Teams have been progressed into %(count)d matches.",
+                    count,
+                ) % {"count": count}
+                messages.success(request, message)
+            else:
+                messages.info(request, _("No teams are ready to be progressed."))
+            return self.redirect(redirect_to)
+
+        context = {
+            "season": season,
+            "progression": progression,
+            "cancel_url": redirect_to,
+        }
+        context.update(extra_context)
+
+        templates = self.template_path("season/progress.html")
+        return self.render(request, templates, context)
+
     def _build_match_queryset(
         self,
         season,
@@ -2469,6 +2515,56 @@ class CompetitionAdminComponent(CompetitionAdminMixin, AdminComponent):
             **kwargs,
         )
 
+    @competition_by_pk_m
+    @staff_login_required_m
+    def match_auto_schedule(
+        self, request, competition, season, date, extra_context, **kwargs
+    ):
+        """
+        Preview an automatic allocation of times and places for the matches on
+        the day which have not been scheduled, and save it when posted as long
+        as it is still the allocation that was previewed.
+        """
+        data = request.POST if request.method == "POST" else request.GET or None
+        form = AutoScheduleForm(data=data)
+
+        schedule = None
+        if not form.is_bound or form.is_valid():
+            min_gap = form.cleaned_data["min_gap"] if form.is_bound else 0
+            schedule = auto_schedule(season, date, min_gap=min_gap)
+
+        if request.method == "POST" and schedule is not None:
+            if form.cleaned_data["preview"] == schedule.digest:
+                count = len(schedule.save())
+                if count:
+                    message = ngettext(
+                        "%(count)d match has been scheduled.",
+                        "%(count)d matches have been scheduled.",
+                        count,
+                    ) % {"count": count}
+                    messages.success(request, message)
+                else:
+                    messages.info(request, _("No matches were updated."))
+                return self.redirect(season.urls["edit"])
+
+            # Something has changed since the preview was shown, so show the
+            # new allocations to be reviewed rather than saving them unseen.
+            messages.warning(
+                request,
+                _("The schedule has changed since the preview, please review it."),
+            )
+
+        context = {
+            "form": form,
+            "season": season,
+            "date": date,
+            "schedule": schedule,
+        }
+        context.update(extra_context)
+
+        templates = self.template_path("match/auto_schedule.html")
+        return self.render(request, templates, context)
+
     @competition_by_pk_m
     @staff_login_required_m
     def match_results(
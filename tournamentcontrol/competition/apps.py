@@ -33,9 +33,11 @@ class CompetitionConfig(AppConfig):
             LiveStreamKey,
             Match,
             Season,
+            SimpleScoreMatchStatistic,
             Stage,
             StageGroup,
             Team,
+            UndecidedTeam,
             Venue,
         )
         from tournamentcontrol.competition.signals import (
@@ -43,9 +45,11 @@ class CompetitionConfig(AppConfig):
             changed_points_formula,
             delete_related,
             delete_team,
+            invalidate_placeholder_labels,
             match_forfeit,
             match_saved_handler,
             notify_match_forfeit_email,
+            refresh_team_titles,
             scale_ladder_entry,
             set_ground_latlng,
             set_ground_timezone,
@@ -56,15 +60,56 @@ class CompetitionConfig(AppConfig):
         # Imported from the submodule rather than the signals package to
         # avoid a circular import: models imports the signals package, and
         # these handlers import tasks which imports models.
+        from tournamentcontrol.competition.signals.calendars import (
+            capture_calendar_fields,
+            render_division_calendars,
+            render_match_calendars,
+            render_renamed_calendars,
+        )
         from tournamentcontrol.competition.signals.live_streams import (
             cleanup_youtube_broadcast,
             cleanup_youtube_stream,
         )
+        from tournamentcontrol.competition.signals.pages import invalidate_pages
 
         site.register(CompetitionAdminComponent)
 
         post_save.connect(match_saved_handler, sender=Match)
 
+        # Store the titles of teams before anything renders the match
+        for model in (Match, Team, UndecidedTeam):
+            post_save.connect(refresh_team_titles, sender=model)
+
+        # Keep pre-rendered calendar feeds up to date
+        post_save.connect(render_match_calendars, sender=Match)
+        post_delete.connect(render_match_calendars, sender=Match)
+        post_save.connect(render_division_calendars, sender=Division)
+        for model in (Competition, Season, Division, Stage):
+            pre_save.connect(capture_calendar_fields, sender=model)
+            post_save.connect(render_renamed_calendars, sender=model)
+
+        # Labels of unresolved teams are cached for each division
+        for model in (Stage, StageGroup, UndecidedTeam, Match):
+            post_save.connect(invalidate_placeholder_labels, sender=model)
+            post_delete.connect(invalidate_placeholder_labels, sender=model)
+
+        # Invalidate the cached public pages that show what has changed
+        for model in (
+            Season,
+            Division,
+            Stage,
+            StageGroup,
+            Team,
+            UndecidedTeam,
+            Match,
+            LadderSummary,
+            SimpleScoreMatchStatistic,
+            Venue,
+            Ground,
+        ):
+            post_save.connect(invalidate_pages, sender=model)
+            post_delete.connect(invalidate_pages, sender=model)
+
         pre_save.connect(scale_ladder_entry, sender=LadderSummary)
         post_save.connect(team_ladder_entry_aggregation, sender=LadderEntry)
         post_delete.connect(team_ladder_entry_aggregation, sender=LadderEntry)
@@ -1,4 +1,5 @@
 import decimal
+import functools
 import operator
 
 from pyparsing import (
@@ -13,7 +14,13 @@ from pyparsing import (
     nums,
 )
 
-__all__ = ("Calculator", "BonusPointCalculator")
+__all__ = (
+    "Calculator",
+    "BonusPointCalculator",
+    "compile_points_formula",
+    "compile_bonus_points_formula",
+    "clear_formula_cache",
+)
 
 Zero = decimal.Decimal(0)
 
@@ -148,3 +155,60 @@ class BonusPointCalculator(Calculator):
     def parse(self, data):
         if data.strip():
             self.pattern.parseString(data)
+
+
+def _compile(stack, operators):
+    """
+    Fold a parsed expression stack into a tree of closures which will
+    evaluate it in the same manner as ``Calculator.evaluate``, without
+    needing the grammar.
+    """
+    try:
+        token = stack.pop()
+    except IndexError:
+        return lambda instance: None
+    if token in operators:
+        func = operators.get(token)
+        rhs = _compile(stack, operators)
+        lhs = _compile(stack, operators)
+        return lambda instance: func(lhs(instance), rhs(instance))
+    elif Identifier.re.match(token):
+        return lambda instance: getattr(instance, token, Zero)
+    try:
+        value = decimal.Decimal(token)
+    except decimal.InvalidOperation:
+        value = Zero
+    return lambda instance: value
+
+
+@functools.lru_cache(maxsize=128)
+def compile_points_formula(formula):
+    """
+    Parse a ``points_formula`` once and return a function which will
+    evaluate it for a ``LadderEntry``.
+
+        >>> compile_points_formula("3*win + 1*draw")(LadderEntry(win=1))
+        Decimal('3')
+    """
+    calculator = Calculator(None)
+    calculator.parse(formula)
+    return _compile(calculator.stack, calculator.Operators)
+
+
+@functools.lru_cache(maxsize=128)
+def compile_bonus_points_formula(formula):
+    """
+    Parse a ``bonus_points_formula`` once and return a function which will
+    evaluate it for a ``LadderEntry``.
+    """
+    calculator = BonusPointCalculator(None)
+    calculator.parse(formula)
+    return _compile(calculator.stack, calculator.Operators)
+
+
+def clear_formula_cache():
+    """
+    Discard all compiled formulas.
+    """
+    compile_points_formula.cache_clear()
+    compile_bonus_points_formula.cache_clear()
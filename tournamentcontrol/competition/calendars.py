@@ -0,0 +1,321 @@
+"""
+iCalendar feeds of matches for a season, or a club, division or team in it.
+
+Subscribed calendars are polled indefinitely, so every feed carries a cheap
+validator (see ``calendar_validator``) and is generated as a stream of
+VEVENT blocks rather than one large ``icalendar.Calendar``.
+
+The rendered ``.ics`` for each ``(season, scope, object)`` is also kept in the
+cache, sharded by tenant and rendered for each scheme and host it is served
+from, so that identical polls become cache reads. An artifact is first
+rendered after a feed has been requested, and re-rendered in
+the background by ``tasks.render_calendars`` whenever a match in its scope is
+saved or deleted, or anything else shown in its events changes; see
+``schedule_calendar_render``.
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+from urllib.parse import urljoin, urlsplit
+
+from asgiref.local import Local
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q
+from django.urls import reverse
+from django.urls.exceptions import NoReverseMatch
+from django.utils.html import strip_tags
+from icalendar import Calendar, Event
+
+from touchtechnology.common.utils import cache_version_kwargs
+from tournamentcontrol.competition.models import Match
+
+LOG = logging.getLogger(__name__)
+
+CALENDAR_KEY = "calendar:{season}:{scope}:{pk}"
+CALENDAR_TIMEOUT = 60 * 60 * 24
+CALENDAR_RENDER_LOCK_KEY = "calendar_render:{season}:{scope}:{pk}:{base_url}"
+CALENDAR_RENDER_LOCK_TIMEOUT = 60 * 5
+
+_pending = Local()
+
+
+def calendar_scope(season, club=None, division=None, team=None):
+    """
+    Return the ``(scope, pk)`` of the feed for the given objects.
+    """
+    if team is not None:
+        return "team", team.pk
+    if division is not None:
+        return "division", division.pk
+    if club is not None:
+        return "club", club.pk
+    return "season", season.pk
+
+
+def calendar_cache_key(season_id, scope, pk):
+    return CALENDAR_KEY.format(season=season_id, scope=scope, pk=pk)
+
+
+def calendar_render_lock_key(season_id, scope, pk, base_url):
+    return CALENDAR_RENDER_LOCK_KEY.format(
+        season=season_id, scope=scope, pk=pk, base_url=base_url
+    )
+
+
+def get_calendar_artifacts(season_id, scope, pk):
+    """
+    Return the artifacts rendered for ``scope`` for the current tenant, keyed
+    by the base URL each was rendered for.
+    """
+    v_kw = cache_version_kwargs(getattr(connection, "tenant", None))
+    return cache.get(calendar_cache_key(season_id, scope, pk), {}, **v_kw)
+
+
+def get_calendar_artifact(season_id, scope, pk, base_url):
+    """
+    Return the artifact rendered for ``scope`` as served from ``base_url`` for
+    the current tenant, or ``None`` if there is not one.
+    """
+    return get_calendar_artifacts(season_id, scope, pk).get(base_url)
+
+
+def calendar_matches(season_id, scope, pk, drafts=False):
+    """
+    Return the scheduled matches that appear in the feed for ``scope``.
+    Matches in draft divisions are only included when ``drafts`` is set.
+    """
+    if scope == "team":
+        matches = Match.objects.filter(Q(home_team=pk) | Q(away_team=pk))
+    elif scope == "division":
+        matches = Match.objects.filter(stage__division=pk)
+    elif scope == "club":
+        matches = Match.objects.filter(
+            Q(home_team__club=pk) | Q(away_team__club=pk),
+            stage__division__season=season_id,
+        )
+    else:
+        matches = Match.objects.filter(stage__division__season=season_id)
+
+    # Do not include matches which have not had the time scheduled
+    matches = matches.exclude(datetime__isnull=True)
+
+    # Remove any matches that are part of a draft division unless asked to
+    # include them.
+    if not drafts:
+        matches = matches.exclude(stage__division__draft=True)
+
+    return matches
+
+
+def calendar_validator(matches, host, secure, drafts=False):
+    """
+    Return the ``(etag, last_modified)`` pair for a feed of ``matches``. A
+    match being added, removed or saved will change the validator.
+    """
+    validator = matches.aggregate(count=Count("pk"), last_modified=Max("last_modified"))
+    last_modified = validator["last_modified"]
+    etag = hashlib.md5(
+        "{}:{}:{}:{}:{}".format(
+            validator["count"],
+            last_modified.isoformat() if last_modified else "",
+            drafts,
+            host,
+            secure,
+        ).encode()
+    ).hexdigest()
+    if last_modified is not None:
+        last_modified = int(last_modified.timestamp())
+    return etag, last_modified
+
+
+def generate_calendar(matches, host, build_absolute_uri):
+    """
+    Yield the iCalendar representation of ``matches`` in chunks; the calendar
+    properties, then one VEVENT at a time, and the end of the calendar last.
+    """
+    cal = Calendar()
+    cal.add("prodid", "-//Tournament Control//%s//" % host)
+    cal.add("version", "2.0")
+
+    header, footer = cal.to_ical().split(b"END:VCALENDAR")
+    yield header
+
+    # Fetch only the fields needed for calendar event generation.
+    # Team titles are stored on the match (home_team_title, away_team_title),
+    # so we don't need to select_related the team objects or use match.title
+    # (which triggers per-match template rendering and potential N+1 queries).
+    matches = matches.select_related(
+        "stage__division__season__competition",
+    ).only(
+        "uuid",
+        "datetime",
+        "last_modified",
+        "home_team_title",
+        "away_team_title",
+        "stage__title",
+        "stage__division__title",
+        "stage__division__slug",
+        "stage__division__season__slug",
+        "stage__division__season__competition__slug",
+    )
+
+    # Cache reverse() URL templates per division to avoid calling it for
+    # every match. All matches in the same division produce URLs that
+    # differ only in the match pk.
+    _url_templates = {}
+
+    for match in matches.order_by("datetime", "play_at").iterator():
+        event = Event()
+        event["uid"] = match.uuid.hex
+
+        # Use the stored team titles instead of match.title to
+        # avoid per-match template rendering and N+1 queries for
+        # undecided teams. strip_tags handles bye matches which include
+        # HTML in the annotation.
+        home = strip_tags(match.home_team_title or "")
+        away = strip_tags(match.away_team_title or "")
+        if home and away:
+            summary = f"{home} vs {away}"
+        elif home or away:
+            summary = home or away
+        else:
+            summary = "TBD"
+        event.add("summary", summary)
+
+        event.add("location", f"{match.stage.division.title} ({match.stage.title})")
+        event.add("dtstart", match.datetime)
+
+        # FIXME match duration should not be hardcoded
+        event.add("dtend", match.datetime + timedelta(minutes=45))
+        event.add("dtstamp", match.last_modified)
+
+        # Determine the resource uri to the detailed match view.
+        # Cache the URL pattern per division to avoid repeated reverse().
+        div_id = match.stage.division_id
+        if div_id not in _url_templates:
+            try:
+                uri = reverse(
+                    "competition:match",
+                    kwargs={
+                        "match": match.pk,
+                        "division": match.stage.division.slug,
+                        "season": match.stage.division.season.slug,
+                        "competition": match.stage.division.season.competition.slug,
+                    },
+                )
+                _url_templates[div_id] = uri.replace(f"match:{match.pk}/", "match:{}/")
+            except NoReverseMatch:
+                LOG.exception("Unable to resolve url for %r", match)
+                _url_templates[div_id] = None
+
+        url_template = _url_templates[div_id]
+        if url_template is not None:
+            uri = url_template.format(match.pk)
+            event.add("description", build_absolute_uri(uri))
+
+        yield event.to_ical()
+
+    yield b"END:VCALENDAR" + footer
+
+
+def render_calendar(season_id, scope, pk, base_url):
+    """
+    Render the public feed for ``scope`` as it would be served from
+    ``base_url`` and store it in the cache. Returns the stored artifact.
+    """
+    host = urlsplit(base_url).netloc
+    secure = base_url.startswith("https:")
+    matches = calendar_matches(season_id, scope, pk)
+    etag, last_modified = calendar_validator(matches, host, secure)
+    artifact = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "content": b"".join(
+            generate_calendar(matches, host, lambda uri: urljoin(base_url, uri))
+        ),
+    }
+    artifacts = get_calendar_artifacts(season_id, scope, pk)
+    artifacts[base_url] = artifact
+    v_kw = cache_version_kwargs(getattr(connection, "tenant", None))
+    cache.set(
+        calendar_cache_key(season_id, scope, pk),
+        artifacts,
+        timeout=CALENDAR_TIMEOUT,
+        **v_kw,
+    )
+    # Let the next request that misses queue the feed again.
+    cache.delete(calendar_render_lock_key(season_id, scope, pk, base_url), **v_kw)
+    return artifact
+
+
+def request_calendar_render(season_id, scope, pk, base_url):
+    """
+    Queue the feed for ``scope`` to be rendered for ``base_url``, unless it
+    has been queued already and not yet rendered; a burst of polls for a
+    feed that is not in the cache queues a single render.
+    """
+    v_kw = cache_version_kwargs(getattr(connection, "tenant", None))
+    if cache.add(
+        calendar_render_lock_key(season_id, scope, pk, base_url),
+        True,
+        timeout=CALENDAR_RENDER_LOCK_TIMEOUT,
+        **v_kw,
+    ):
+        schedule_calendar_render(keys=[(season_id, scope, pk)], base_url=base_url)
+
+
+def schedule_calendar_render(match_ids=(), team_ids=(), keys=(), base_url=None):
+    """
+    Queue the calendars affected by the given matches, teams and
+    ``(season, scope, pk)`` keys to be rendered again once the current
+    transaction commits. Everything queued during one transaction is handled
+    by a single task.
+    """
+    from tournamentcontrol.competition.tasks import render_calendars
+
+    # Join the work already queued for this transaction, unless its callback
+    # has gone (the transaction committed or was rolled back).
+    pending = getattr(_pending, "value", None)
+    if pending is not None and not any(
+        func is pending["flush"]
+        for __, func, __ in transaction.get_connection().run_on_commit
+    ):
+        pending = None
+
+    if pending is None:
+
+        def flush():
+            if _pending.value is pending:
+                _pending.value = None
+            kw = {
+                "match_ids": sorted(pending["match_ids"]),
+                "team_ids": sorted(pending["team_ids"]),
+                "keys": sorted(pending["keys"]),
+                "base_url": pending["base_url"],
+            }
+            # Render into the cache of the tenant the changes were made in.
+            tenant = getattr(connection, "tenant", None)
+            if tenant is not None:
+                kw["_schema_name"] = tenant.schema_name
+            render_calendars.s(**kw).apply_async()
+
+        pending = _pending.value = {
+            "match_ids": set(),
+            "team_ids": set(),
+            "keys": set(),
+            "base_url": None,
+            "flush": flush,
+        }
+        register = True
+    else:
+        register = False
+
+    pending["match_ids"].update(match_ids)
+    pending["team_ids"].update(team_id for team_id in team_ids if team_id)
+    pending["keys"].update(tuple(key) for key in keys)
+    pending["base_url"] = base_url or pending["base_url"]
+
+    if register:
+        transaction.on_commit(pending["flush"])
@@ -6,7 +6,8 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from touchtechnology.admin.base import DashboardWidget
-from tournamentcontrol.competition.models import Match, Stage, Team
+from tournamentcontrol.competition.models import Match, Stage
+from tournamentcontrol.competition.progression import ProgressionResolver
 from tournamentcontrol.competition.utils import (
     legitimate_bye_match,
     team_needs_progressing,
@@ -98,54 +99,42 @@ def matches_require_progression():
 
 
 def matches_progression_possible():
-    matches = matches_require_progression()
-
-    # cache which stages have all their matches played or byes marked played
-    stages = Stage.objects.filter(matches__in=matches).distinct()
-    score_entered = Q(home_team_score__isnull=False, away_team_score__isnull=False)
-    played_bye = Q(is_bye=True, bye_processed=True)
-    is_washout = Q(is_washout=True)
-    _stage_cache = {}
-    for stage in stages:
-        f = stage.comes_after
-        try:
-            _stage_cache[stage.pk] = f.matches.exclude(
-                score_entered | played_bye | is_washout
-            ).count()
-        except AttributeError:
-            _stage_cache[stage.pk] = 0
+    matches = matches_require_progression().select_related(
+        "home_team_undecided", "away_team_undecided"
+    )
+
+    # Load the standings and results the matches refer to just once.
+    resolver = ProgressionResolver(matches)
 
     def _can_evaluate(match):
         """
         If we can actually evaluate a Team instance for assignment into
         the `home_team` OR `away_team` field, then this is a match we
         want to know about. Not possible to do directly in a QuerySet as
-        there is too much logic on the models, so we need to attempt this
-        for every match that could possibly be progressed.
+        there is too much logic on the models, so the resolver works out
+        the teams for every match that could possibly be progressed.
         """
         # If there are any unplayed or unprocessed matches in the preceding
         # stage, then we do not want to consider this match as viable for
         # progression.
-        if _stage_cache[match.stage_id]:
+        if resolver.unplayed(match):
             return False
 
         # If the home or away team can be determined we would want to progress
         # the match. This should only catch Px, GxPx, Wx, Lx - for
         # UndecidedTeam cases we need to catch them all together.
-        home_team, away_team = match.eval(lazy=True)
-        if match.home_team is None and isinstance(home_team, Team):
+        home_team, away_team = resolver.resolve(match)
+        if match.home_team is None and home_team is not None:
             return True
-        elif match.away_team is None and isinstance(away_team, Team):
+        elif match.away_team is None and away_team is not None:
             return True
 
-        if match.stage.undecided_teams.exists() and _stage_cache[match.stage_id] == 0:
+        if resolver.has_undecided_teams(match):
             return True
 
         return False
 
-    matches = [m for m in matches if _can_evaluate(m)]
-
-    return matches
+    return [m for m in resolver.matches if _can_evaluate(m)]
 
 
 def stages_require_progression():
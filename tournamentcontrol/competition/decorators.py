@@ -398,9 +398,11 @@ def competition_by_slug(f, *a, **kw):
             kwargs["club"] = club
             season = kwargs.get("season")
             if season:
-                kwargs["teams"] = club.teams.filter(
-                    division__season=season
-                ).prefetch_related("division", "stage_group")
+                kwargs["teams"] = (
+                    club.teams.filter(division__season=season)
+                    .prefetch_related("division", "stage_group")
+                    .with_next_and_last_match()
+                )
 
         if datestr:
             kwargs["date"] = parse(datestr).date()
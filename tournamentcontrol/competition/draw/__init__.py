@@ -15,5 +15,5 @@ Import from specific submodules:
     from .schemas import DivisionStructure, PoolFixture, StageFixture
     from .algorithms import optimum_tournament_pool_count, seeded_tournament
     from .generators import DrawGenerator, MatchCollection
-    from .builders import build, cleanup_season_structure
+    from .builders import build, bulk_build, cleanup_season_structure
 """
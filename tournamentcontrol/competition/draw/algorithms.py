@@ -12,7 +12,7 @@ from tournamentcontrol.competition.utils import (
     ceiling,
     final_series_rounds,
     grouper,
-    round_robin_format,
+    round_robin_rounds,
     single_elimination_final_format,
 )
 
@@ -165,7 +165,7 @@ def seeded_tournament(seeded_team_list, days_available, max_per_day=1, min_per_d
     draw_formats = [
         {
             "label": "Round Robin (%d/%d teams)" % (size - 1, size),
-            "format": round_robin_format(range(1, size + 1)),
+            "format": round_robin_rounds(size),
         }
         # unique set of pool sizes requiring individual draw formats
         for size in sorted(
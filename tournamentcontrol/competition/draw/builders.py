@@ -1,9 +1,14 @@
 import itertools
 import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
 
 from django.db import transaction
 from django.utils.text import slugify
 
+from touchtechnology.content.utils import invalidate_sitemapnode_urlpatterns
+
 from tournamentcontrol.competition.models import (
     Division,
     Season,
@@ -12,8 +17,8 @@ from tournamentcontrol.competition.models import (
     Team,
 )
 
-from .generators import DrawGenerator
-from .schemas import CompetitionExecutionError
+from .generators import DrawGenerator, MatchCollection
+from .schemas import WIN_LOSE_RE, CompetitionExecutionError
 
 logger = logging.getLogger(__name__)
 
@@ -162,7 +167,9 @@ def _generate_matches_from_draw_format(
 
         logger.debug(f"DrawGenerator produced {len(matches)} matches")
         if len(matches) == 0:
-            logger.warning(f"No matches generated from draw format: {draw_format[:100]}...")
+            logger.warning(
+                f"No matches generated from draw format: {draw_format[:100]}..."
+            )
 
         # Update stage_group for pool matches
         if stage_group:
@@ -170,7 +177,7 @@ def _generate_matches_from_draw_format(
                 match.stage_group = stage_group
 
         # Save all matches
-        matches.save()
+        matches.bulk_create()
 
         logger.debug(
             f"Generated {len(matches)} matches from draw format for {'pool ' + stage_group.title if stage_group else 'stage ' + stage.title}"
@@ -181,6 +188,264 @@ def _generate_matches_from_draw_format(
         raise
 
 
+def validate_structures(season: Season, specs) -> None:
+    """
+    Check a batch of DivisionStructure specifications before anything is
+    written to the database.
+
+    Raises:
+        CompetitionExecutionError: Listing every problem that was found
+    """
+    errors = []
+
+    titles = Counter(spec.title for spec in specs)
+    errors.extend(
+        f"Division '{title}' is included more than once."
+        for title, count in titles.items()
+        if count > 1
+    )
+    errors.extend(
+        f"Division '{title}' already exists in this season."
+        for title in season.divisions.filter(title__in=titles).values_list(
+            "title", flat=True
+        )
+    )
+
+    for spec in specs:
+        for kind, values in (
+            ("team", spec.teams),
+            ("stage", [stage.title for stage in spec.stages]),
+        ):
+            errors.extend(
+                f"Division '{spec.title}' has more than one {kind} '{title}'."
+                for title, count in Counter(values).items()
+                if count > 1
+            )
+
+        for ref, draw_format in spec.draw_formats.items():
+            errors.extend(
+                f"Division '{spec.title}' format '{ref}': {error}"
+                for error in _draw_format_errors(draw_format)
+            )
+
+        for stage_spec in spec.stages:
+            refs = [stage_spec.draw_format_ref]
+            for pool_spec in stage_spec.pools or []:
+                refs.append(pool_spec.draw_format_ref)
+                errors.extend(
+                    f"Division '{spec.title}' pool '{pool_spec.title}' "
+                    f"refers to team {index} which does not exist."
+                    for index in pool_spec.teams or []
+                    if not 0 <= index < len(spec.teams)
+                )
+            errors.extend(
+                f"Division '{spec.title}' stage '{stage_spec.title}' "
+                f"refers to unknown draw format '{ref}'."
+                for ref in refs
+                if ref is not None and ref not in spec.draw_formats
+            )
+
+    if errors:
+        raise CompetitionExecutionError(" ".join(errors))
+
+
+def _draw_format_errors(text):
+    """
+    Yield the problems in a draw format which would stop ``DrawGenerator``
+    from producing its matches. Lines which are not understood are ignored,
+    as they are when the draw format is parsed.
+    """
+    in_round = False
+    match_ids = set()
+    for line in DrawGenerator.regex.finditer(text):
+        data = line.groupdict()
+        if data["round"]:
+            in_round = True
+            continue
+        match_id = data["match_id"]
+        if not in_round:
+            yield f"match {match_id} is not in a ROUND."
+        if match_id in match_ids:
+            yield f"match {match_id} is used more than once."
+        for team in (data["home_team"], data["away_team"]):
+            result = WIN_LOSE_RE.match(team)
+            if result and result.group("match_id") not in match_ids:
+                yield f"match {match_id} refers to {team} before it is played."
+        match_ids.add(match_id)
+
+
+@contextmanager
+def _phase(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        logger.debug(f"Bulk build phase '{name}' took {timings[name]:.3f}s")
+
+
+@transaction.atomic
+def bulk_build(season: Season, specs, timings: dict = None) -> list[Division]:
+    """
+    Build several Divisions at once from a list of DivisionStructure specs.
+
+    Produces the same structure as calling ``build`` for each spec, but the
+    whole batch is validated before anything is written and each model is
+    then inserted with a single ``bulk_create``. Unlike ``build`` the
+    divisions must not already exist.
+
+    Args:
+        season: The Season to create the divisions in
+        specs: DivisionStructure specifications
+        timings: Optional dict which is populated with the seconds spent in
+            each phase of the build
+
+    Returns:
+        The created Division instances, in the order of ``specs``
+
+    Raises:
+        CompetitionExecutionError: If the specs are invalid or building fails
+    """
+    if timings is None:
+        timings = {}
+
+    with _phase(timings, "validate"):
+        validate_structures(season, specs)
+
+    try:
+        with _phase(timings, "divisions"):
+            next_division_order = (
+                max(season.divisions.values_list("order", flat=True), default=0) + 1
+            )
+            divisions = Division.objects.bulk_create(
+                [
+                    Division(
+                        season=season,
+                        title=spec.title,
+                        slug=slugify(spec.title),
+                        order=order,
+                    )
+                    for order, spec in enumerate(specs, next_division_order)
+                ]
+            )
+
+        with _phase(timings, "stages"):
+            stages = {
+                (division, stage_order): Stage(
+                    division=division,
+                    title=stage_spec.title,
+                    slug=slugify(stage_spec.title),
+                    order=stage_order,
+                )
+                for division, spec in zip(divisions, specs)
+                for stage_order, stage_spec in enumerate(spec.stages, 1)
+            }
+            Stage.objects.bulk_create(stages.values())
+
+        with _phase(timings, "pools"):
+            pools = {
+                (division, stage_order, pool_order): StageGroup(
+                    stage=stages[division, stage_order],
+                    title=pool_spec.title,
+                    slug=slugify(pool_spec.title),
+                    order=pool_order,
+                )
+                for division, spec in zip(divisions, specs)
+                for stage_order, stage_spec in enumerate(spec.stages, 1)
+                for pool_order, pool_spec in enumerate(stage_spec.pools or [], 1)
+            }
+            StageGroup.objects.bulk_create(pools.values())
+
+        with _phase(timings, "teams"):
+            teams = {}
+            for division, spec in zip(divisions, specs):
+                teams[division] = [
+                    Team(
+                        division=division,
+                        title=team_name,
+                        slug=slugify(team_name),
+                        order=i + 1,
+                    )
+                    for i, team_name in enumerate(spec.teams)
+                ]
+                # A team belongs to the last pool that lists it, as it would
+                # after successive ``pool.teams.add`` calls.
+                for stage_order, stage_spec in enumerate(spec.stages, 1):
+                    for pool_order, pool_spec in enumerate(stage_spec.pools or [], 1):
+                        for team_index in pool_spec.teams or []:
+                            teams[division][team_index].stage_group = pools[
+                                division, stage_order, pool_order
+                            ]
+            Team.objects.bulk_create(itertools.chain.from_iterable(teams.values()))
+
+        with _phase(timings, "generate"):
+            matches = MatchCollection()
+            for division, spec in zip(divisions, specs):
+                # Rounds carry on from the highest round of the stage before.
+                initial = 1
+                for stage_order, stage_spec in enumerate(spec.stages, 1):
+                    stage = stages[division, stage_order]
+
+                    draws = []
+                    if stage_spec.draw_format_ref and not stage_spec.pools:
+                        draws.append(
+                            (stage_spec.draw_format_ref, None, teams[division])
+                        )
+                    for pool_order, pool_spec in enumerate(stage_spec.pools or [], 1):
+                        if pool_spec.draw_format_ref:
+                            pool_teams = [
+                                teams[division][i] for i in pool_spec.teams or []
+                            ]
+                            # Without teams of its own, a pool in the first
+                            # stage draws on the whole division; later stages
+                            # rely on progression.
+                            if not pool_teams and stage_order == 1:
+                                pool_teams = teams[division]
+                            draws.append(
+                                (
+                                    pool_spec.draw_format_ref,
+                                    pools[division, stage_order, pool_order],
+                                    pool_teams,
+                                )
+                            )
+
+                    rounds = [0]
+                    for ref, pool, draw_teams in draws:
+                        generator = DrawGenerator(
+                            stage, teams=dict(enumerate(draw_teams))
+                        )
+                        generator.parse(spec.get_draw_format(ref))
+                        generated = generator.generate(
+                            custom_date_generator=_no_date_generator, initial=initial
+                        )
+                        for match in generated:
+                            match.stage_group = pool
+                            rounds.append(match.round)
+                        matches.iterable.extend(generated)
+                    initial = max(rounds) + 1
+
+        with _phase(timings, "matches"):
+            matches.bulk_create()
+
+    except Exception as e:
+        logger.error(f"Error bulk building divisions: {e}")
+        raise CompetitionExecutionError(f"Failed to build divisions: {e}")
+
+    # Stands in for the post_save signal each Division and Team would send.
+    invalidate_sitemapnode_urlpatterns(sender=Division, instance=None)
+
+    logger.info(
+        f"Bulk built {len(divisions)} divisions with {len(matches)} matches for "
+        f"season {season.pk} in {sum(timings.values()):.3f}s: "
+        + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items())
+    )
+    return divisions
+
+
+def _no_date_generator(stage, start_date):
+    return itertools.cycle([None])
+
+
 def cleanup_season_structure(season: Season):
     """
     Clean up existing competition structure for a season.
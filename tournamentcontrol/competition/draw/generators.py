@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import itertools
 import logging
 import re
@@ -6,6 +7,7 @@ from collections import defaultdict
 from typing import Optional
 
 from dateutil.rrule import DAILY, WEEKLY, rrule, rruleset
+from django.db import transaction
 from django.db.models import Max
 
 from tournamentcontrol.competition.draw.algorithms import coerce_datetime
@@ -14,10 +16,17 @@ from tournamentcontrol.competition.draw.schemas import (
     MatchDescriptor,
     RoundDescriptor,
 )
-from tournamentcontrol.competition.models import Stage, StageGroup
+from tournamentcontrol.competition.ladders import ladder_context
+from tournamentcontrol.competition.models import Match, Stage, StageGroup
+from tournamentcontrol.competition.pagecache import invalidate_matches
+from tournamentcontrol.competition.signals import invalidate_placeholder_labels
 
 logger = logging.getLogger(__name__)
 
+# Compiled draw formats, see ``compile_draw_format``.
+DRAW_FORMAT_CACHE_SIZE = 256
+_compiled_draw_formats = {}
+
 
 def weekly_date_generator(stage, start_date=None):
     if start_date is None:
@@ -125,6 +134,56 @@ class MatchCollection(object):
                 match.away_team_eval_related = match.away_team_eval_related
             match.save()
 
+    def bulk_create(self, batch_size=None):
+        """
+        Insert the whole collection with ``bulk_create`` instead of saving
+        each match in turn.
+
+        Matches are inserted in the order they were generated with their
+        ``home_team_eval_related`` and ``away_team_eval_related`` detached,
+        and those references are then resolved in a second pass with a
+        single ``bulk_update``.
+
+        No ``post_save`` signals are sent. Generated matches have neither a
+        result nor a ``datetime``, so there are no ladder entries to build
+        and they do not appear in any calendar feed. The team titles are
+        stored with one more query, and the placeholder labels of their
+        stages are invalidated directly.
+        """
+        related = []
+        for match in self.iterable:
+            home, away = match.home_team_eval_related, match.away_team_eval_related
+            if home is not None or away is not None:
+                related.append((match, home, away))
+                match.home_team_eval_related = None
+                match.away_team_eval_related = None
+
+        with transaction.atomic():
+            Match._base_manager.bulk_create(self.iterable, batch_size=batch_size)
+
+            # Every match now has a primary key, so the references between
+            # them can be stored.
+            for match, home, away in related:
+                match.home_team_eval_related = home
+                match.away_team_eval_related = away
+            Match._base_manager.bulk_update(
+                [match for match, __, __ in related],
+                ["home_team_eval_related", "away_team_eval_related"],
+                batch_size=batch_size,
+            )
+            Match.objects.filter(
+                pk__in=[match.pk for match in self.iterable]
+            ).refresh_team_titles()
+            invalidate_matches(self.iterable)
+
+        stages = {match.stage_id: match.stage for match in self.iterable}
+        for stage in stages.values():
+            invalidate_placeholder_labels(sender=Stage, instance=stage)
+
+        for match in self.iterable:
+            match._ladder_context = ladder_context(match)
+        return self.iterable
+
 
 class DrawGenerator(object):
     """
@@ -200,23 +259,31 @@ class DrawGenerator(object):
         re.VERBOSE,
     )
 
-    def __init__(self, stage: Stage, start_date: Optional[datetime.date] = None):
+    def __init__(
+        self,
+        stage: Stage,
+        start_date: Optional[datetime.date] = None,
+        teams: Optional[dict] = None,
+    ):
         self.rounds = []
         self.stage = stage
         self.start_date = start_date
         self.teams = defaultdict(lambda: None)
-        if isinstance(stage, Stage):
-            if stage.order > 1:
-                queryset = stage.undecided_teams.all()
-            else:
-                queryset = stage.division.teams.all()
-            teams = dict(enumerate(queryset))
-        elif isinstance(stage, StageGroup):
-            if stage.stage.order > 1:
-                queryset = stage.undecided_teams.all()
-            else:
-                queryset = stage.teams.all()
-            teams = dict(enumerate(queryset))
+        # Unless the caller already knows them, look up the teams which are
+        # referred to by their 1-based position in the draw format.
+        if teams is None:
+            if isinstance(stage, Stage):
+                if stage.order > 1:
+                    queryset = stage.undecided_teams.all()
+                else:
+                    queryset = stage.division.teams.all()
+                teams = dict(enumerate(queryset))
+            elif isinstance(stage, StageGroup):
+                if stage.stage.order > 1:
+                    queryset = stage.undecided_teams.all()
+                else:
+                    queryset = stage.teams.all()
+                teams = dict(enumerate(queryset))
         self.teams.update(teams)
 
     def team(self, text):
@@ -224,23 +291,33 @@ class DrawGenerator(object):
             return self.teams[int(text) - 1]
         return text
 
-    def parse(self, text):
+    def parse(self, text, pk=None):
+        self.rounds.extend(compile_draw_format(text, pk))
+
+    @classmethod
+    def compile(cls, text):
+        rounds = []
         round = None
         count = 1
 
-        for line in self.regex.finditer(text):
+        for line in cls.regex.finditer(text):
             data = line.groupdict()
 
             if data.get("round"):
                 round = RoundDescriptor(count=count, **data)
-                self.rounds.append(round)
+                rounds.append(round)
                 count += 1
                 continue
 
             match = MatchDescriptor(**data)
             round.add(match)
 
-    def generate(self, n=None, offset=0, custom_date_generator=None):
+        # The descriptors are shared by every generator using this text.
+        for round in rounds:
+            round.matches = tuple(round.matches)
+        return tuple(rounds)
+
+    def generate(self, n=None, offset=0, custom_date_generator=None, initial=None):
         # if n is not specified generate one complete round
         if n is None:
             n = len(self.rounds)
@@ -274,20 +351,24 @@ class DrawGenerator(object):
         matches = MatchCollection()
 
         # Work out what stage we come after, could be with reference to a
-        # Stage or a StageGroup so introspect the type.
-        try:
+        # Stage or a StageGroup so introspect the type. Callers which have
+        # not saved the earlier stage yet must tell us where to start.
+        if initial is None:
             initial = 1
-            if isinstance(self.stage, Stage):
-                follows = self.stage.comes_after
-            elif isinstance(self.stage, StageGroup):
-                follows = self.stage.stage.comes_after
-        except Stage.DoesNotExist:
-            pass
-        else:
-            # Set our initial round number, if we're following another stage,
-            # keep the number ticking over from that point.
-            if follows is not None:
-                initial += follows.matches.aggregate(max=Max("round")).get("max") or 0
+            try:
+                if isinstance(self.stage, Stage):
+                    follows = self.stage.comes_after
+                elif isinstance(self.stage, StageGroup):
+                    follows = self.stage.stage.comes_after
+            except Stage.DoesNotExist:
+                pass
+            else:
+                # Set our initial round number, if we're following another
+                # stage, keep the number ticking over from that point.
+                if follows is not None:
+                    initial += (
+                        follows.matches.aggregate(max=Max("round")).get("max") or 0
+                    )
 
         for i in range(offset + initial, offset + n + initial):
             date = next(dates)
@@ -332,3 +413,36 @@ class DrawGenerator(object):
                 "in the correct format." % ", ".join([str(e) for e in errors])
             )
         return True
+
+
+def compile_draw_format(text, pk=None):
+    """
+    Return the draw format ``text`` as a tuple of ``RoundDescriptor``
+    templates, parsing it only the first time it is seen.
+
+    A ``DrawFormat`` is keyed by its ``pk`` along with a hash of the text, so
+    editing it replaces the compiled version; other text is keyed by the hash
+    alone. The templates are shared and must not be modified.
+    """
+    digest = hashlib.sha1(text.encode()).hexdigest()
+    key = digest if pk is None else pk
+    try:
+        compiled_digest, rounds = _compiled_draw_formats[key]
+    except KeyError:
+        pass
+    else:
+        if compiled_digest == digest:
+            return rounds
+
+    rounds = DrawGenerator.compile(text)
+    if len(_compiled_draw_formats) >= DRAW_FORMAT_CACHE_SIZE:
+        _compiled_draw_formats.clear()
+    _compiled_draw_formats[key] = (digest, rounds)
+    return rounds
+
+
+def clear_draw_format_cache():
+    """
+    Discard all compiled draw formats.
+    """
+    _compiled_draw_formats.clear()
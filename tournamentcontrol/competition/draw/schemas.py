@@ -76,9 +76,11 @@ class RoundDescriptor(object):
         return [m.generate(generator, stage, self, date) for m in self.matches]
 
     def __str__(self):
-        return "\n".join(
-            ["ROUND %s" % self.round_label] + [str(m) for m in self.matches]
-        )
+        if self.round_label:
+            heading = "ROUND %s" % self.round_label
+        else:
+            heading = "ROUND"
+        return "\n".join([heading] + [str(m) for m in self.matches])
 
 
 class MatchDescriptor(object):
@@ -52,16 +52,29 @@ from touchtechnology.common.forms.widgets import (
     SelectDateTimeWidget as SelectDateTimeWidgetBase,
 )
 from touchtechnology.content.forms import PlaceholderConfigurationBase
-from tournamentcontrol.competition.calc import BonusPointCalculator, Calculator
+from tournamentcontrol.competition.calc import (
+    BonusPointCalculator,
+    Calculator,
+    compile_points_formula,
+)
+from tournamentcontrol.competition.calendars import schedule_calendar_render
 from tournamentcontrol.competition.draw.algorithms import seeded_tournament
-from tournamentcontrol.competition.draw.builders import build
+from tournamentcontrol.competition.draw.builders import (
+    build,
+    bulk_build,
+    validate_structures,
+)
 from tournamentcontrol.competition.draw.generators import DrawGenerator
-from tournamentcontrol.competition.draw.schemas import DivisionStructure
+from tournamentcontrol.competition.draw.schemas import (
+    CompetitionExecutionError,
+    DivisionStructure,
+)
 from tournamentcontrol.competition.exceptions import (
     LiveStreamError,
     LiveStreamTransitionWarning,
 )
 from tournamentcontrol.competition.fields import URLField
+from tournamentcontrol.competition.ladders import defer_ladder_updates
 from tournamentcontrol.competition.models import (
     ByeTeam,
     Club,
@@ -92,6 +105,7 @@ from tournamentcontrol.competition.models import (
     Venue,
     stage_group_position_re,
 )
+from tournamentcontrol.competition.pagecache import invalidate_matches
 from tournamentcontrol.competition.signals.custom import score_updated
 from tournamentcontrol.competition.utils import (
     FauxQueryset,
@@ -141,12 +155,11 @@ class LadderPointsWidget(forms.MultiWidget):
     def decompress(self, value):
         if not value:
             return ""
+        evaluate = compile_points_formula(value)
         values = []
         for i in valid_ladder_identifiers:
             ladder_entry = LadderEntry(**{i: 1})
-            calc = Calculator(ladder_entry)
-            calc.parse(value)
-            values.append(calc.evaluate() or None)
+            values.append(evaluate(ladder_entry) or None)
         return values
 
     def format_output(self, rendered_widgets):
@@ -1463,7 +1476,15 @@ class MatchResultForm(BootstrapFormControlMixin, ModelForm):
         )
 
 
-MatchResultFormSet = modelformset_factory(Match, extra=0, form=MatchResultForm)
+BaseMatchResultFormSet = modelformset_factory(Match, extra=0, form=MatchResultForm)
+
+
+class MatchResultFormSet(BaseMatchResultFormSet):
+    def save(self, *args, **kwargs):
+        # Teams will often appear more than once in a set of results; only
+        # recalculate their ladder once all the matches have been saved.
+        with defer_ladder_updates():
+            return super().save(*args, **kwargs)
 
 
 class MatchWashoutForm(BootstrapFormControlMixin, ModelForm):
@@ -1622,7 +1643,7 @@ class MatchScheduleManagementForm(ManagementForm):
     example when it will be impossible to save the form otherwise.
     """
 
-    ignore_clashes = forms.BooleanField(initial=0)
+    ignore_clashes = forms.BooleanField(initial=0, required=False)
 
 
 BaseMatchScheduleFormSet = modelformset_factory(Match, extra=0, form=MatchScheduleForm)
@@ -1688,42 +1709,86 @@ class MatchScheduleFormSet(BaseMatchScheduleFormSet):
         if any(self.errors):
             return
 
+        matches = [form.cleaned_data.get("id") for form in self.forms]
+
+        # Load the teams that each of our teams must not play at the same time
+        # as, all at once.
+        team_ids = {
+            team_id
+            for match in matches
+            for team_id in (match.home_team_id, match.away_team_id)
+            if team_id is not None
+        }
+        clashes = {}
+        for team_id, other_id, other_title in Team.team_clashes.through.objects.filter(
+            from_team__in=team_ids
+        ).values_list("from_team_id", "to_team_id", "to_team__title"):
+            clashes.setdefault(team_id, {})[other_id] = other_title
+
+        # Build up an index of all possible conflicts on the dates in question;
+        # other matches at any of the places we are using, and any match for a
+        # team that one of ours must not clash with.
         teams = {}
-        scheduled = {}
-
-        # Build up a table of all possible conflicts
-        dates = self.queryset.dates("date", "day")
-        for m in self.queryset.model._default_manager.exclude(
-            pk__in=self.queryset
-        ).exclude(play_at=None, time=None):
-            if m.date in dates:
-                teams.setdefault(m.home_team, []).append(m.time)
-                teams.setdefault(m.away_team, []).append(m.time)
-                scheduled.setdefault((m.play_at, m.time), []).append(m)
-
-        for i in range(0, self.total_form_count()):
-            match = self.forms[i].cleaned_data.get("id")
-            play_at = self.forms[i].cleaned_data.get("play_at")
-            time = self.forms[i].cleaned_data.get("time")
+        scheduled = set()
+
+        dates = {match.date for match in matches}
+        place_ids = {
+            form.cleaned_data["play_at"].pk
+            for form in self.forms
+            if form.cleaned_data.get("play_at")
+        }
+        clashing_ids = set().union(*clashes.values())
+        others = (
+            self.queryset.model._base_manager.filter(date__in=dates)
+            .filter(
+                Q(play_at__in=place_ids)
+                | Q(home_team__in=clashing_ids)
+                | Q(away_team__in=clashing_ids)
+            )
+            .exclude(pk__in=[match.pk for match in matches])
+            .exclude(play_at=None, time=None)
+        )
+        for date, time, play_at_id, home_team_id, away_team_id in others.values_list(
+            "date", "time", "play_at", "home_team", "away_team"
+        ):
+            teams.setdefault((date, home_team_id), set()).add(time)
+            teams.setdefault((date, away_team_id), set()).add(time)
+            scheduled.add((date, time, play_at_id))
+
+        for form, match in zip(self.forms, matches):
+            play_at = form.cleaned_data.get("play_at")
+            time = form.cleaned_data.get("time")
 
             if play_at and time:
-                key = (play_at, time)
-                if scheduled.get(key):
+                key = (match.date, time, play_at.pk)
+                if key in scheduled:
                     err = _("Another match is already scheduled for this time & place.")
-                    self.forms[i].add_error("play_at", err)
-                scheduled.setdefault(key, []).append(match)
+                    form.add_error("play_at", err)
+                scheduled.add(key)
+
+            for team_id in (match.home_team_id, match.away_team_id):
+                if team_id and time:
+                    for other_id, other_title in clashes.get(team_id, {}).items():
+                        if time in teams.get((match.date, other_id), ()):
+                            form.add_error("time", other_title)
+                    teams.setdefault((match.date, team_id), set()).add(time)
 
-            if match.home_team and time:
-                for t in match.home_team.team_clashes.all():
-                    if time in teams.get(t, []):
-                        self.forms[i].add_error("time", t)
-                teams.setdefault(match.home_team, []).append(time)
 
-            if match.away_team and time:
-                for t in match.away_team.team_clashes.all():
-                    if time in teams.get(t, []):
-                        self.forms[i].add_error("time", t)
-                teams.setdefault(match.away_team, []).append(time)
+class AutoScheduleForm(forms.Form):
+    min_gap = forms.IntegerField(
+        label=_("Minimum gap"),
+        min_value=0,
+        initial=0,
+        required=False,
+        help_text=_(
+            "The least number of minutes between the start of one match for a "
+            "team and the next."
+        ),
+    )
+    preview = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean_min_gap(self):
+        return self.cleaned_data.get("min_gap") or 0
 
 
 class RescheduleDateForm(forms.Form):
@@ -1873,8 +1938,17 @@ class ProgressTeamsForm(ModelForm):
 
     def save(self, *args, **kwargs):
         team = self.cleaned_data.get("team")
-        self.instance.home_games.update(home_team=team)
-        self.instance.away_games.update(away_team=team)
+        # The update bypasses auto_now, which calendar validators rely on.
+        now = timezone.now()
+        self.instance.home_games.update(home_team=team, last_modified=now)
+        self.instance.away_games.update(away_team=team, last_modified=now)
+        matches = Match.objects.filter(
+            Q(home_team_undecided=self.instance) | Q(away_team_undecided=self.instance)
+        )
+        matches.refresh_team_titles()
+        match_ids = list(matches.values_list("pk", flat=True))
+        invalidate_matches(match_ids)
+        schedule_calendar_render(match_ids=match_ids)
         return self.instance
 
     class Meta:
@@ -1976,7 +2050,7 @@ class DrawGenerationForm(BootstrapFormControlMixin, forms.Form):
         start_date = self.cleaned_data.get("start_date")
 
         generator = DrawGenerator(self.instance, start_date)
-        generator.parse(format.text)
+        generator.parse(format.text, format.pk)
         return generator
 
     def clean_start_date(self):
@@ -2538,19 +2612,30 @@ class DivisionStructureJSONFormSet(forms.BaseFormSet):
             for form, structure in valid_forms:
                 if structure.title in duplicate_titles:
                     form.add_error("json_data", "Division names must be unique.")
+            return
+
+        # Check the whole batch will build before anything is saved
+        try:
+            validate_structures(
+                self._season, [structure for form, structure in valid_forms]
+            )
+        except CompetitionExecutionError as e:
+            raise forms.ValidationError(str(e))
 
     def save(self, commit=True):
-        """Save all valid forms."""
-        divisions = []
-        for form in self.forms:
-            if (
-                form.is_valid()
-                and form.cleaned_data
-                and not form.cleaned_data.get("DELETE", False)
-            ):
-                division = form.save(commit=commit)
-                divisions.append(division)
-        return divisions
+        """Save all valid forms, building their divisions as one batch."""
+        valid_forms = [
+            form
+            for form in self.forms
+            if form.is_valid()
+            and form.cleaned_data
+            and not form.cleaned_data.get("DELETE", False)
+        ]
+        if not commit:
+            return [form.save(commit=False) for form in valid_forms]
+        return bulk_build(
+            self._season, [form.get_division_structure() for form in valid_forms]
+        )
 
 
 # Create the formset with proper configuration
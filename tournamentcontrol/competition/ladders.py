@@ -0,0 +1,478 @@
+"""
+Maintenance of ``LadderSummary`` rows as ``LadderEntry`` rows come and go.
+
+A ``LadderSummary`` is the sum of a team's ``LadderEntry`` rows for a stage,
+plus any statistics carried over from the preceding stage. Rather than
+re-aggregating every entry each time one changes, the delta of the entry
+being added or removed is applied to the existing summary with a single
+``UPDATE`` statement.
+
+Stages that carry a ladder forward or scale pool points derive their
+summaries from more than the entry itself, so these (and any summary that
+does not exist yet) fall back to ``rebuild_ladder_summary`` which performs
+the full recompute. It is also the repair path should a summary ever drift.
+
+When many results are being saved together, wrap the work in
+``defer_ladder_updates`` so each affected summary is recalculated just once
+when the block completes. When a division's points formula changes, use
+``recalculate_ladder_points`` to re-score every entry in one pass.
+
+Whenever the summaries of a stage change a new ``ladder_version_key`` stamp is
+issued for it, which the ``{% ladder %}`` tag keeps its output under.
+"""
+
+import functools
+import logging
+import operator
+from contextlib import contextmanager
+from decimal import Decimal, DivisionByZero, InvalidOperation
+
+from asgiref.local import Local
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from touchtechnology.common.utils import bump_version_stamps_on_commit
+from tournamentcontrol.competition.calc import (
+    compile_bonus_points_formula,
+    compile_points_formula,
+)
+from tournamentcontrol.competition.utils import SumDict
+
+logger = logging.getLogger(__name__)
+
+LADDER_FIELDS = (
+    "played",
+    "win",
+    "loss",
+    "draw",
+    "bye",
+    "forfeit_for",
+    "forfeit_against",
+    "score_for",
+    "score_against",
+    "bonus_points",
+    "points",
+)
+
+# The values a LadderEntry is scored on, ``points`` is derived from these.
+LADDER_RESULT_FIELDS = LADDER_FIELDS[:-2]
+
+aggregate_kw = {field: Sum(field) for field in LADDER_FIELDS}
+
+_deferred = Local()
+
+
+@contextmanager
+def defer_ladder_updates():
+    """
+    Collect the ``(team, stage)`` pairs touched by ``LadderEntry`` changes
+    and recalculate each ``LadderSummary`` once, as the block exits.
+
+    The block is run inside a transaction so the recalculated ladders are
+    committed along with the results that produced them. Nested blocks are
+    folded into the outermost one.
+
+        with defer_ladder_updates():
+            formset.save()
+    """
+    if getattr(_deferred, "pending", None) is not None:
+        yield
+        return
+
+    with transaction.atomic():
+        _deferred.pending = {}
+        try:
+            yield
+            pending, _deferred.pending = _deferred.pending, None
+            recalculate_ladder_summaries(pending)
+        finally:
+            _deferred.pending = None
+
+
+def ladder_version_key(stage_id):
+    return f"ladder_version:{stage_id}"
+
+
+def bump_ladder_versions(stage_ids):
+    """
+    Discard the rendered ladders of ``stage_ids`` as their summaries change.
+    """
+    bump_version_stamps_on_commit(
+        [ladder_version_key(pk) for pk in stage_ids if pk is not None],
+        getattr(connection, "tenant", None),
+    )
+
+
+def _defer(team_id, stage_id, stage_group_id):
+    """
+    Queue the summary for later if ladder updates are being deferred.
+    """
+    pending = getattr(_deferred, "pending", None)
+    if pending is None:
+        return False
+    pending[(team_id, stage_id)] = stage_group_id
+    return True
+
+
+def evaluate_ladder_points(entry, division):
+    """
+    Set ``points`` and ``bonus_points`` on ``entry`` according to the
+    formulas of the ``division``.
+    """
+    entry.points = compile_points_formula(division.points_formula)(entry)
+
+    if division.bonus_points_formula:
+        entry.bonus_points = compile_bonus_points_formula(
+            division.bonus_points_formula
+        )(entry)
+
+    entry.points += entry.bonus_points
+    return entry
+
+
+def recalculate_ladder_points(division, stage=None):
+    """
+    Re-score every ``LadderEntry`` in the ``division`` (or just one of its
+    stages) against the current formulas, then recalculate the affected
+    ladders.
+
+    Entries are read in a single query and the formulas are evaluated once
+    per distinct set of result values, rather than once per entry; only the
+    entries whose points change are written back, with ``bulk_update``.
+
+    :param division: the Division whose formulas should be applied
+    :param stage: optionally limit the recalculation to this Stage
+    :return: number of LadderEntry rows that were changed
+    """
+    LadderEntry = apps.get_model("competition", "LadderEntry")
+
+    entries = LadderEntry._base_manager.filter(match__stage__division=division)
+    if stage is not None:
+        entries = entries.filter(match__stage=stage)
+
+    scores, changed, pending = {}, [], {}
+    for (
+        pk,
+        team_id,
+        stage_id,
+        stage_group_id,
+        points,
+        bonus_points,
+        *values,
+    ) in entries.values_list(
+        "pk",
+        "team_id",
+        "match__stage_id",
+        "match__stage_group_id",
+        "points",
+        "bonus_points",
+        *LADDER_RESULT_FIELDS,
+    ).iterator():
+        key = tuple(values)
+        if key not in scores:
+            entry = LadderEntry(**dict(zip(LADDER_RESULT_FIELDS, values)))
+            evaluate_ladder_points(entry, division)
+            scores[key] = (entry.points, entry.bonus_points)
+        if scores[key] != (points, bonus_points):
+            changed.append(
+                LadderEntry(pk=pk, points=scores[key][0], bonus_points=scores[key][1])
+            )
+            pending[(team_id, stage_id)] = stage_group_id
+
+    with transaction.atomic():
+        LadderEntry.objects.bulk_update(
+            changed, ["points", "bonus_points"], batch_size=500
+        )
+        recalculate_ladder_summaries(pending)
+
+    return len(changed)
+
+
+def ladder_context(match):
+    """
+    Return the ``(stage_id, stage_group_id, include_in_ladder)`` triple that
+    determines which ``LadderSummary`` the match's entries contribute to.
+    """
+    return (match.stage_id, match.stage_group_id, match.include_in_ladder)
+
+
+def built_ladder_context(match):
+    """
+    Return the ladder context that the match's existing ``LadderEntry`` rows
+    were built under. This will differ from ``ladder_context`` when a match
+    has been moved or excluded from the ladder but not yet saved.
+    """
+    return getattr(match, "_ladder_context", None) or ladder_context(match)
+
+
+def is_incremental(stage, stage_group=None):
+    """
+    Can a ``LadderSummary`` for the stage be maintained from entry deltas
+    alone, or does it require a full recompute?
+    """
+    if stage.scale_group_points or stage.carry_ladder:
+        return False
+    if stage_group is not None and stage_group.carry_ladder:
+        return False
+    return True
+
+
+def apply_ladder_entry(entry, sign):
+    """
+    Add (``sign=1``) or remove (``sign=-1``) the values of ``entry`` from
+    the team's ``LadderSummary``.
+
+    :param entry: the LadderEntry being created or deleted
+    :param sign: 1 when the entry is being added, -1 when removed
+    """
+    Stage = apps.get_model("competition", "Stage")
+    StageGroup = apps.get_model("competition", "StageGroup")
+
+    match = entry.match
+
+    if sign > 0:
+        stage_id, stage_group_id, include = ladder_context(match)
+    else:
+        stage_id, stage_group_id, include = built_ladder_context(match)
+
+    if _defer(entry.team_id, stage_id, stage_group_id):
+        return
+
+    if stage_id == match.stage_id:
+        stage = match.stage
+    else:
+        stage = Stage.objects.get(pk=stage_id)
+
+    if stage_group_id is None:
+        stage_group = None
+    elif stage_group_id == match.stage_group_id:
+        stage_group = match.stage_group
+    else:
+        stage_group = StageGroup.objects.get(pk=stage_group_id)
+
+    if not is_incremental(stage, stage_group):
+        return rebuild_ladder_summary(entry.team, stage, stage_group)
+
+    values = dict.fromkeys(LADDER_FIELDS, 0)
+    if include:
+        values.update({field: sign * getattr(entry, field) for field in values})
+
+    summary = stage.ladder_summary.filter(team_id=entry.team_id)
+    if not summary.update(**ladder_summary_delta(values)):
+        # Nothing to apply the delta to, this must be the team's first entry
+        # in this stage (or the summary was removed); start from scratch.
+        return rebuild_ladder_summary(entry.team, stage, stage_group)
+
+
+def ladder_summary_delta(values):
+    """
+    Build the ``update`` keyword arguments that will apply ``values`` to a
+    ``LadderSummary`` row, recalculating ``difference`` and ``percentage``
+    from the adjusted scores within the same statement.
+    """
+    score_for = F("score_for") + values["score_for"]
+    score_against = F("score_against") + values["score_against"]
+    numeric = DecimalField(max_digits=20, decimal_places=10)
+
+    kw = {field: F(field) + value for field, value in values.items()}
+    kw["points"] = F("points") + Decimal(values["points"])
+    kw["difference"] = score_for - score_against
+    kw["percentage"] = Case(
+        When(Q(score_against=-values["score_against"]), then=Value(None)),
+        default=Cast(score_for, numeric) * 100 / Cast(score_against, numeric),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    return kw
+
+
+def rebuild_ladder_summary(team, stage, stage_group=None):
+    """
+    Recalculate the ``LadderSummary`` for ``team`` in ``stage`` from all of
+    the underlying ``LadderEntry`` rows.
+
+    :param team: the Team to rebuild
+    :param stage: the Stage whose ladder is being rebuilt
+    :param stage_group: the pool the team played in, if any
+    """
+    team.ladder_summary.filter(stage=stage).delete()
+
+    if not stage.keep_ladder:
+        logger.debug("Stage does not keep a ladder, skipping.")
+        return
+
+    # if we are carrying points from the previous stage then we'll need to add
+    # them here.
+
+    base = SumDict()
+    if stage_group is not None:
+        home_pks = stage_group.matches.values_list("home_team", flat=True)
+        away_pks = stage_group.matches.values_list("away_team", flat=True)
+        opponent_pks = set(home_pks).union(away_pks).difference([team.pk])
+
+        # when the Pool has carry_ladder set we want to only bring forward the
+        # statistics from matches played with other teams in the group.
+        if stage_group.carry_ladder:
+            logger.debug("Pool match, group statistics only.")
+            base += team.ladder_entries.filter(
+                match__include_in_ladder=True,
+                match__stage=stage.comes_after,
+                opponent__in=opponent_pks,
+            ).aggregate(**aggregate_kw)
+
+        # when the Stage has carry_ladder set but not the Pool we want to
+        # bring forward all the teams statistics from the preceding stage.
+        elif stage.carry_ladder:
+            logger.debug("Pool match, all stage statistics.")
+            base += team.ladder_entries.filter(
+                match__include_in_ladder=True,
+                match__stage=stage.comes_after,
+            ).aggregate(**aggregate_kw)
+
+    elif stage.carry_ladder:
+        # when the preceeding stage had Pools, this stage does not have any
+        # Pools, and carry_ladder is set, then we would bring forward the
+        # statistics from matches played with other teams in the stage.
+        if stage.comes_after.pools.count():
+            base += team.ladder_entries.filter(
+                match__include_in_ladder=True,
+                match__stage=stage.comes_after,
+                opponent__in=stage.teams,
+            ).aggregate(**aggregate_kw)
+
+        # when there are no Pools and the stage has carry_ladder set we bring
+        # forward the ladder_summary instead.
+        else:
+            base += team.ladder_summary.filter(stage=stage.comes_after).aggregate(
+                **aggregate_kw
+            )
+
+    aggregate = base + team.ladder_entries.filter(
+        match__include_in_ladder=True,
+        match__stage=stage,
+    ).aggregate(**aggregate_kw)
+
+    return team.ladder_summary.create(
+        stage=stage,
+        stage_group=team.stage_group,
+        **ladder_summary_values(aggregate),
+    )
+
+
+def ladder_summary_values(aggregate):
+    """
+    Add the derived ``difference`` and ``percentage`` to the aggregated
+    ``LadderEntry`` values for a ``LadderSummary``.
+    """
+    score_for = aggregate.get("score_for")
+    score_against = aggregate.get("score_against")
+
+    try:
+        difference = score_for - score_against
+    except TypeError:
+        difference = None
+
+    try:
+        percentage = Decimal(score_for) / Decimal(score_against) * Decimal(100)
+    except (DivisionByZero, InvalidOperation, TypeError):
+        percentage = None
+
+    aggregate.update({"difference": difference})
+    aggregate.update({"percentage": percentage})
+
+    return aggregate
+
+
+def recalculate_ladder_summaries(pending):
+    """
+    Recalculate the ``LadderSummary`` for many teams at once.
+
+    Summaries in stages which can be maintained incrementally are rebuilt from
+    a single grouped aggregate over their entries and inserted in bulk. Any
+    that depend on a preceding stage (or on ``scale_ladder_entry``) are
+    rebuilt one at a time afterwards, in stage order.
+
+    :param pending: mapping of ``(team_id, stage_id)`` to the pool the team
+                    played in, as collected by ``defer_ladder_updates``
+    """
+    if not pending:
+        return
+
+    bump_ladder_versions({stage_id for __, stage_id in pending})
+
+    LadderEntry = apps.get_model("competition", "LadderEntry")
+    LadderSummary = apps.get_model("competition", "LadderSummary")
+    Stage = apps.get_model("competition", "Stage")
+    StageGroup = apps.get_model("competition", "StageGroup")
+    Team = apps.get_model("competition", "Team")
+
+    stages = Stage.objects.in_bulk({stage_id for __, stage_id in pending})
+    stage_groups = StageGroup.objects.in_bulk(set(pending.values()) - {None})
+
+    bulk, individual = {}, []
+    for (team_id, stage_id), stage_group_id in pending.items():
+        stage = stages[stage_id]
+        stage_group = stage_groups.get(stage_group_id)
+        if not stage.keep_ladder or is_incremental(stage, stage_group):
+            bulk.setdefault(stage, set()).add(team_id)
+        else:
+            individual.append((team_id, stage, stage_group))
+
+    if bulk:
+        LadderSummary.objects.filter(
+            functools.reduce(
+                operator.or_,
+                [
+                    Q(stage=stage, team_id__in=team_ids)
+                    for stage, team_ids in bulk.items()
+                ],
+            )
+        ).delete()
+
+    ladder = {stage: team_ids for stage, team_ids in bulk.items() if stage.keep_ladder}
+    if ladder:
+        aggregates = (
+            LadderEntry.objects.filter(
+                functools.reduce(
+                    operator.or_,
+                    [
+                        Q(match__stage=stage, team_id__in=team_ids)
+                        for stage, team_ids in ladder.items()
+                    ],
+                ),
+                match__include_in_ladder=True,
+            )
+            .order_by()
+            .values_list("team_id", "match__stage_id")
+            .annotate(**aggregate_kw)
+        )
+        totals = {
+            (team_id, stage_id): dict(zip(aggregate_kw, values))
+            for team_id, stage_id, *values in aggregates
+        }
+        team_ids = set().union(*ladder.values())
+        stage_group_ids = dict(
+            Team.objects.filter(pk__in=team_ids).values_list("pk", "stage_group_id")
+        )
+        LadderSummary.objects.bulk_create(
+            [
+                LadderSummary(
+                    stage=stage,
+                    team_id=team_id,
+                    stage_group_id=stage_group_ids[team_id],
+                    **ladder_summary_values(
+                        SumDict()
+                        + totals.get((team_id, stage.pk), dict.fromkeys(aggregate_kw))
+                    ),
+                )
+                for stage, team_ids in ladder.items()
+                for team_id in team_ids
+            ]
+        )
+
+    teams = Team.objects.in_bulk({team_id for team_id, *__ in individual})
+    for team_id, stage, stage_group in sorted(
+        individual, key=lambda each: (each[1].division_id, each[1].order)
+    ):
+        rebuild_ladder_summary(teams[team_id], stage, stage_group)
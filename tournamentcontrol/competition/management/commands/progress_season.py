@@ -0,0 +1,42 @@
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournamentcontrol.competition.models import Season
+from tournamentcontrol.competition.progression import progress_season
+
+
+class Command(BaseCommand):
+    help = "Progress every team that can be decided across a season"
+
+    def add_arguments(self, parser: ArgumentParser):
+        parser.add_argument("season", type=int, help="Primary key of the season")
+        parser.add_argument(
+            "-n",
+            "--dry-run",
+            action="store_true",
+            help="Report the teams that would be progressed without saving them",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            season = Season.objects.select_related("competition").get(
+                pk=options["season"]
+            )
+        except Season.DoesNotExist:
+            raise CommandError(f"Season {options['season']} does not exist")
+
+        progression = progress_season(season)
+        for match, field, reference, team in progression:
+            self.stdout.write(
+                f"{match.stage.division.title} / {match.stage.title} "
+                f"#{match.pk} {field}: {reference} -> {team.title}"
+            )
+
+        if options["dry_run"]:
+            count = len(progression.matches)
+            self.stdout.write(f"{count} match(es) would be progressed")
+            return
+
+        count = len(progression.save())
+        self.stdout.write(self.style.SUCCESS(f"{count} match(es) progressed"))
@@ -12,5 +12,4 @@ class LadderEntryManager(models.Manager.from_queryset(LadderEntryQuerySet)):
 
 
 class MatchManager(models.Manager.from_queryset(MatchQuerySet)):
-    def get_queryset(self):
-        return super().get_queryset()._team_titles()
+    pass
@@ -0,0 +1,22 @@
+# Track when each match was last saved, for conditional calendar requests.
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("competition", "0061_live_stream_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="match",
+            name="last_modified",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
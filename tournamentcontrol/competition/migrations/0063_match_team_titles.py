@@ -0,0 +1,45 @@
+# Store the team titles of each match rather than calculating them in every
+# query.
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+from tournamentcontrol.competition.utils import team_title_case_clause
+
+
+def populate_team_titles(apps, schema_editor):
+    Match = apps.get_model("competition", "Match")
+    titles = Match.objects.filter(pk=OuterRef("pk"))
+    Match.objects.update(
+        home_team_title=Subquery(
+            titles.values(title=team_title_case_clause("home_team"))[:1]
+        ),
+        away_team_title=Subquery(
+            titles.values(title=team_title_case_clause("away_team"))[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("competition", "0062_match_last_modified"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="match",
+            name="home_team_title",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="match",
+            name="away_team_title",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, null=True
+            ),
+        ),
+        migrations.RunPython(populate_team_titles, migrations.RunPython.noop),
+    ]
@@ -19,7 +19,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.postgres import fields as PG
 from django.core import validators
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.http import Http404, HttpResponse
 from django.db.models import (
     Count,
@@ -29,6 +29,7 @@ from django.db.models import (
     Sum,
     TimeField,
     UniqueConstraint,
+    prefetch_related_objects,
 )
 from django.db.models.deletion import CASCADE, PROTECT, SET_NULL
 from django.template import Template
@@ -55,6 +56,7 @@ from touchtechnology.common.db.models import (
     ManyToManyField,
 )
 from touchtechnology.common.models import SitemapNodeBase
+from touchtechnology.common.utils import get_version_stamp
 from tournamentcontrol.competition._mediaupload import MediaMemoryUpload
 from tournamentcontrol.competition.constants import (
     GENDER_CHOICES,
@@ -82,6 +84,7 @@ from tournamentcontrol.competition.query import (
     DivisionQuerySet,
     StageQuerySet,
     StatisticQuerySet,
+    TeamQuerySet,
 )
 from tournamentcontrol.competition.signals import match_forfeit
 from tournamentcontrol.competition.utils import (
@@ -108,6 +111,33 @@ win_lose_team_tpl = lazy_get_template(
     "tournamentcontrol/competition/_win_lose_team.txt"
 )
 
+# Labels of the unresolved teams in each stage for this process, keyed by
+# tenant schema and stage, each stored with the version stamp of the division
+# they were built from. The least recently used are dropped beyond
+# PLACEHOLDER_LABELS_MAX_STAGES.
+_placeholder_labels = collections.OrderedDict()
+PLACEHOLDER_LABELS_MAX_STAGES = 1000
+
+# Fields of a Match which describe its teams, and so the stored team titles
+# and the placeholder labels of its stage.
+MATCH_TEAM_FIELDS = (
+    "stage_id",
+    "label",
+    "is_bye",
+    "home_team_id",
+    "home_team_undecided_id",
+    "home_team_eval",
+    "home_team_eval_related_id",
+    "away_team_id",
+    "away_team_undecided_id",
+    "away_team_eval",
+    "away_team_eval_related_id",
+)
+
+
+def placeholder_labels_version_key(division_id):
+    return f"placeholder_labels_version:{division_id}"
+
 
 def generate_random_color():
     """
@@ -1329,6 +1359,71 @@ class Stage(AdminUrlMixin, OrderedSitemapNode):
             return after.latest("order")
         raise Stage.DoesNotExist
 
+    @cached_property
+    def placeholder_labels(self):
+        """
+        Labels of the unresolved teams in the matches of this stage, keyed by
+        ``Match._placeholder_key``. They are built once per process and
+        rebuilt whenever anything in the division they are drawn from changes.
+        """
+        if self.pk is None:
+            return {}
+        tenant = getattr(connection, "tenant", None)
+        key = (getattr(tenant, "schema_name", None), self.pk)
+        version = get_version_stamp(
+            placeholder_labels_version_key(self.division_id), tenant
+        )
+        built_version, labels = _placeholder_labels.get(key, (None, None))
+        if built_version != version:
+            labels = self._build_placeholder_labels()
+            _placeholder_labels[key] = (version, labels)
+        try:
+            _placeholder_labels.move_to_end(key)
+            while len(_placeholder_labels) > PLACEHOLDER_LABELS_MAX_STAGES:
+                _placeholder_labels.popitem(last=False)
+        except KeyError:
+            # Another thread has dropped it in the meantime.
+            pass
+        return labels
+
+    def _build_placeholder_labels(self):
+        try:
+            stage = self.comes_after
+        except Stage.DoesNotExist:
+            previous = None
+        else:
+            prefetch_related_objects([stage], "preceeds", "pools")
+            previous = (stage, list(stage.pools.all()))
+
+        def comes_after():
+            if previous is None:
+                raise Stage.DoesNotExist
+            return previous
+
+        matches = self.matches.filter(
+            Q(home_team__isnull=True) | Q(away_team__isnull=True)
+        ).select_related(
+            "home_team_undecided__stage",
+            "away_team_undecided__stage",
+            "home_team_eval_related",
+            "away_team_eval_related",
+        )
+
+        labels = {}
+        for match in matches:
+            for field in ("home_team", "away_team"):
+                if getattr(match, f"{field}_id") is not None:
+                    continue
+                key = match._placeholder_key(field)
+                if key in labels:
+                    continue
+                try:
+                    labels[key] = match._placeholder_label(field, comes_after)
+                except Exception:
+                    # Leave it to ``Match._get_team`` to fail as it always has.
+                    logger.debug("Unable to label %r of %r", field, match)
+        return labels
+
     def ladders(self):
         res = collections.OrderedDict()
         if self.pools.count():
@@ -1535,6 +1630,8 @@ class Team(AdminUrlMixin, OrderedSitemapNode):
         help_text=_("Select any teams that must not play at the same time."),
     )
 
+    objects = TeamQuerySet.as_manager()
+
     class Meta:
         ordering = (
             "-division__season__start_date",
@@ -1624,6 +1721,8 @@ class Team(AdminUrlMixin, OrderedSitemapNode):
         return self.matches.filter((Q(date__exact=d) & Q(time__lte=t)) | Q(date__lt=d))
 
     def next_match(self):
+        if hasattr(self, "_next_and_last_match"):
+            return self._next_and_last_match[0]
         matches = self.future()
         if matches.count():
             match = matches[0]
@@ -1631,6 +1730,8 @@ class Team(AdminUrlMixin, OrderedSitemapNode):
             return match
 
     def last_match(self):
+        if hasattr(self, "_next_and_last_match"):
+            return self._next_and_last_match[1]
         matches = self.past()
         if matches.count():
             match = matches.reverse()[0]
@@ -1638,24 +1739,11 @@ class Team(AdminUrlMixin, OrderedSitemapNode):
             return match
 
     def ladders(self):
-        res = collections.OrderedDict()
-        for stage in self.division.stages.filter(
-            keep_ladder=True, ladder_summary__team=self
-        ).annotate(pool_count=Count("pools")):
-            if stage.pool_count:
-                for pool in stage.pools.filter(ladder_summary__team=self):
-                    summary = pool.ladder_summary.select_related(
-                        "team__club", "team__division"
-                    )
-                    res.setdefault(stage, collections.OrderedDict()).setdefault(
-                        pool, summary
-                    )
-            else:
-                summary = stage.ladder_summary.select_related(
-                    "team__club", "team__division"
-                )
-                res.setdefault(stage, summary)
-        return res
+        """
+        Build the ladder structure used by ``team.html``; see
+        ``StageQuerySet.team_ladders``.
+        """
+        return Stage.objects.team_ladders([self])[self]
 
     def matches_by_date(self):
         tzinfo = timezone.get_current_timezone()
@@ -2051,6 +2139,15 @@ class Match(AdminUrlMixin, models.Model):
 
     evaluated = models.BooleanField(null=True)
 
+    # Titles of the teams, or of the positions they will be progressed from,
+    # kept up to date by ``MatchQuerySet.refresh_team_titles``.
+    home_team_title = models.CharField(
+        max_length=255, blank=True, null=True, editable=False
+    )
+    away_team_title = models.CharField(
+        max_length=255, blank=True, null=True, editable=False
+    )
+
     is_washout = BooleanField(default=False)
 
     date = DateField(blank=True, null=True)
@@ -2101,6 +2198,8 @@ class Match(AdminUrlMixin, models.Model):
         help_text="Image to be used as thumbnail image on the YouTube platform",
     )
 
+    last_modified = DateTimeField(auto_now=True)
+
     objects = MatchManager()
 
     class Meta:
@@ -2116,6 +2215,44 @@ class Match(AdminUrlMixin, models.Model):
         )
         verbose_name_plural = "matches"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember which ladder the stored LadderEntry rows were built for, so
+        # they can be backed out of the right LadderSummary if the match is
+        # moved or excluded from the ladder before being saved again.
+        loaded = dict(zip(field_names, values))
+        try:
+            instance._ladder_context = (
+                loaded["stage_id"],
+                loaded["stage_group_id"],
+                loaded["include_in_ladder"],
+            )
+        except KeyError:
+            pass
+        # And the teams whose calendar feeds currently include it.
+        instance._calendar_team_ids = (
+            loaded.get("home_team_id"),
+            loaded.get("away_team_id"),
+        )
+        # And how its teams were described, see ``changed_team_fields``.
+        instance._team_fields = {
+            name: loaded[name] for name in MATCH_TEAM_FIELDS if name in loaded
+        }
+        return instance
+
+    def changed_team_fields(self):
+        """
+        Return the names in ``MATCH_TEAM_FIELDS`` whose values differ from
+        those loaded from the database; all of them for a new match.
+        """
+        loaded = getattr(self, "_team_fields", {})
+        return {
+            name
+            for name in MATCH_TEAM_FIELDS
+            if name not in loaded or loaded[name] != getattr(self, name)
+        }
+
     def _get_admin_namespace(self):
         return "admin:fixja:competition:season:division:stage:match"
 
@@ -2267,11 +2404,24 @@ class Match(AdminUrlMixin, models.Model):
         }
         return match_title_tpl.render(context)
 
-    def _get_team(self, field, plain=False):
-        team = getattr(self, field)
-        if team:
-            return team
+    def _placeholder_key(self, field):
+        return (
+            getattr(self, f"{field}_undecided_id"),
+            getattr(self, f"{field}_eval"),
+            getattr(self, f"{field}_eval_related_id"),
+            self.is_bye,
+        )
 
+    def _comes_after(self):
+        stage = self.stage.comes_after
+        return stage, list(stage.pools.all())
+
+    def _placeholder_label(self, field, comes_after):
+        """
+        Return the label of the unresolved team in ``field``, or ``ByeTeam``
+        when it is a bye. ``comes_after`` returns the preceding stage and its
+        pools, and is only called when the label refers to them.
+        """
         team_undecided = getattr(self, f"{field}_undecided")
         if team_undecided:
             team_eval = team_undecided.formula
@@ -2287,15 +2437,14 @@ class Match(AdminUrlMixin, models.Model):
             stage, group, position = match.groups()
         except (AttributeError, TypeError):
             if not team_undecided and self.is_bye:
-                return ByeTeam()
+                return ByeTeam
             stage = group = position = None
+            pools = []
         else:
-            stage = self.stage.comes_after
+            stage, pools = comes_after()
 
         if team_undecided and stage is None:
-            if plain:
-                return str(team_undecided)
-            return {"title": str(team_undecided)}
+            return str(team_undecided)
         elif team_eval in WIN_LOSE:
             context = {
                 "position": WIN_LOSE[team_eval],
@@ -2309,14 +2458,12 @@ class Match(AdminUrlMixin, models.Model):
             }
             template = stage_group_position_tpl
             if group is not None:
-                if stage.pools.count():
-                    try:
-                        context["group"] = stage.pools.all()[int(group) - 1]
-                    except IndexError:
+                if pools:
+                    index = int(group) - 1
+                    if not 0 <= index < len(pools):
                         # If there are ANY issues in evaluating a formula, return the formula itself
-                        if plain:
-                            return team_eval
-                        return {"title": team_eval}
+                        return team_eval
+                    context["group"] = pools[index]
                 else:
                     context["group"] = {
                         "title": "ERROR",
@@ -2324,14 +2471,29 @@ class Match(AdminUrlMixin, models.Model):
                     context.setdefault("errors", []).append("Invalid group.")
 
         try:
-            if plain:
-                return template.render(context).strip()
-            return {"title": template.render(context).strip()}
+            return template.render(context).strip()
         except Exception:
             # If there are ANY issues in evaluating a formula, return the formula itself
-            if plain:
-                return team_eval
-            return {"title": team_eval}
+            return team_eval
+
+    def _get_team(self, field, plain=False):
+        team = getattr(self, field)
+        if team:
+            return team
+
+        # Labels for the whole stage are built at once, so the common case is a
+        # dictionary lookup rather than queries and a template render.
+        labels = self.stage.placeholder_labels if self.stage_id else {}
+        try:
+            title = labels[self._placeholder_key(field)]
+        except KeyError:
+            title = self._placeholder_label(field, self._comes_after)
+
+        if title is ByeTeam:
+            return ByeTeam()
+        if plain:
+            return title
+        return {"title": title}
 
     def get_home_team(self):
         return self._get_team("home_team")
@@ -0,0 +1,177 @@
+"""
+Tag-invalidated cache for the public division, stage, pool and team pages.
+
+Everything cached for a page is stored under a key built from the tenant, the
+URL, the active language and time zone, and the version stamp of each tag the
+page depends on; ``season:<pk>``, ``division:<pk>``, ``stage:<pk>`` and
+``team:<pk>``, or ``matches:<season_pk>`` for anything that shows matches from
+across a season. Saving anything those pages show issues new stamps for exactly
+the tags affected (see ``signals.pages``), so stale entries are never read
+again and simply expire.
+
+The views use ``page_cache_key`` both for their own statistics and to hand the
+templates a ``page_cache_key`` for the ``{% pagecache %}`` tag to keep their
+ladders and fixtures under, so the page is rendered without a query for either
+when nothing has changed. The surrounding layout is left alone as it may vary
+by user.
+"""
+
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone, translation
+
+from touchtechnology.common.utils import (
+    bump_version_stamps_on_commit,
+    cache_version_kwargs,
+)
+from tournamentcontrol.competition.models import Division, Match, Stage, Team
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+TAG_VERSION_KEY = "page_tag_version:{}"
+
+
+def page_tags(season=None, division=None, stage=None, team=None):
+    """
+    Return the tags a page about the given objects depends on.
+    """
+    objects = (
+        ("season", season),
+        ("division", division),
+        ("stage", stage),
+        ("team", team),
+    )
+    return [f"{name}:{obj.pk}" for name, obj in objects if obj is not None]
+
+
+def tagged_key(name, tags, *parts):
+    """
+    Return a key for ``name`` that varies on the tenant, ``parts`` and the
+    current version of ``tags``. Tags without a version are given one.
+    """
+    tenant = getattr(connection, "tenant", None)
+    v_kw = cache_version_kwargs(tenant)
+    keys = [TAG_VERSION_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys, **v_kw)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None, **v_kw)
+            versions[key] = cache.get(key, **v_kw)
+
+    parts = [getattr(tenant, "schema_name", ""), *map(str, parts)]
+    parts.extend(f"{tag}={versions[key]}" for tag, key in zip(tags, keys))
+    return f"{name}:" + hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def page_cache_key(request, tags):
+    """
+    Return the key to cache the page for ``request`` under at the current
+    version of ``tags``.
+    """
+    return tagged_key(
+        "page",
+        tags,
+        request.get_host(),
+        request.path,
+        translation.get_language() or "",
+        timezone.get_current_timezone_name(),
+    )
+
+
+def cached_page_data(key, func, timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Return the value cached under ``key``, calling ``func`` to produce it
+    when there is none.
+    """
+    value = cache.get(key)
+    if value is None:
+        value = func()
+        cache.set(key, value, timeout=timeout)
+    return value
+
+
+def invalidate_tags(tags):
+    """
+    Issue new versions of ``tags``, so every page cached under them is
+    stale.
+    """
+    bump_version_stamps_on_commit(
+        [TAG_VERSION_KEY.format(tag) for tag in tags],
+        getattr(connection, "tenant", None),
+    )
+
+
+def division_tags(division_id):
+    """
+    Tags of every page in a division, for changes to anything that all of
+    them show such as the titles of its teams.
+    """
+    tags = {f"division:{division_id}"}
+    tags.update(
+        f"matches:{pk}"
+        for pk in Division.objects.filter(pk=division_id).values_list(
+            "season", flat=True
+        )
+    )
+    tags.update(
+        f"stage:{pk}"
+        for pk in Stage.objects.filter(division=division_id).values_list(
+            "pk", flat=True
+        )
+    )
+    tags.update(
+        f"team:{pk}"
+        for pk in Team.objects.filter(division=division_id).values_list("pk", flat=True)
+    )
+    return tags
+
+
+def match_tags(matches):
+    """
+    Tags of the pages that show ``matches``; either ``Match`` instances, whose
+    stage should already be loaded, or primary keys to look up.
+    """
+    rows, match_ids = [], []
+    for match in matches:
+        if isinstance(match, Match):
+            rows.append(
+                (
+                    match.stage_id,
+                    match.stage.division_id,
+                    match.stage.division.season_id,
+                    match.home_team_id,
+                    match.away_team_id,
+                )
+            )
+        else:
+            match_ids.append(match)
+    if match_ids:
+        rows.extend(
+            Match._base_manager.filter(pk__in=match_ids)
+            .order_by()
+            .values_list(
+                "stage",
+                "stage__division",
+                "stage__division__season",
+                "home_team",
+                "away_team",
+            )
+        )
+
+    tags = set()
+    for stage_id, division_id, season_id, home_team_id, away_team_id in rows:
+        tags.update(
+            (f"division:{division_id}", f"stage:{stage_id}", f"matches:{season_id}")
+        )
+        tags.update(f"team:{pk}" for pk in (home_team_id, away_team_id) if pk)
+    return tags
+
+
+def invalidate_matches(matches):
+    """
+    For writes that do not send signals, invalidate the pages that show
+    ``matches``, given as for ``match_tags``.
+    """
+    invalidate_tags(match_tags(matches))
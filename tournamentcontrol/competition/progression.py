@@ -0,0 +1,300 @@
+"""
+Resolution of the teams that progress into matches of later stages.
+
+``Match.eval`` works one match at a time, loading the standings of the
+preceding stage and each of its pools every time it is called. When many
+matches are to be considered together, such as on the admin dashboard, a
+``ProgressionResolver`` loads everything the matches refer to up front; the
+preceding stages, the standings of those stages and their pools, the matches
+whose winner or loser is referred to, and which stages have undecided teams.
+Each match is then resolved from memory.
+
+``progress_season`` uses a resolver to work out every team that can be
+progressed across a season at once, and returns the changes as a report that
+can be reviewed before it is saved in a single transaction.
+"""
+
+import logging
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from tournamentcontrol.competition.calendars import schedule_calendar_render
+from tournamentcontrol.competition.constants import WIN_LOSE
+from tournamentcontrol.competition.models import (
+    LadderSummary,
+    Match,
+    Stage,
+    StageGroup,
+    UndecidedTeam,
+)
+from tournamentcontrol.competition.pagecache import invalidate_matches
+from tournamentcontrol.competition.utils import (
+    legitimate_bye_match,
+    stage_group_position_re,
+    team_needs_progressing,
+)
+
+logger = logging.getLogger(__name__)
+
+# A match in a preceding stage still to be played holds up progression.
+match_outstanding = ~(
+    Q(home_team_score__isnull=False, away_team_score__isnull=False)
+    | Q(is_bye=True, bye_processed=True)
+    | Q(is_washout=True)
+)
+
+Progression = namedtuple("Progression", "match field reference team")
+
+
+class ProgressionResolver(object):
+    """
+    Resolve the ``W``, ``L``, ``P``, ``GxPy`` and ``SxGyPz`` references of
+    ``matches`` with a fixed number of queries, however many matches there
+    are. ``resolve`` gives the same teams as ``Match.eval(lazy=True)``, but
+    ``None`` for any team that can not be determined yet.
+    """
+
+    def __init__(self, matches):
+        self.matches = matches = list(matches)
+        stage_ids = {match.stage_id for match in matches}
+        division_ids = {match.stage.division_id for match in matches}
+
+        # Work out the stage each match progresses from without asking every
+        # stage for the one it comes after.
+        divisions = {}
+        for stage in Stage.objects.filter(division__in=division_ids).order_by(
+            "division", "order"
+        ):
+            divisions.setdefault(stage.division_id, []).append(stage)
+        self.comes_after = {}
+        for stages in divisions.values():
+            by_pk = {stage.pk: stage for stage in stages}
+            for stage in stages:
+                if stage.follows_id is not None:
+                    self.comes_after[stage.pk] = by_pk.get(stage.follows_id)
+                    continue
+                earlier = [each for each in stages if each.order < stage.order]
+                self.comes_after[stage.pk] = earlier[-1] if earlier else None
+
+        related_ids = {
+            pk
+            for match in matches
+            for pk in (match.home_team_eval_related_id, match.away_team_eval_related_id)
+            if pk is not None
+        }
+        self.related = Match._base_manager.select_related(
+            "home_team", "away_team", "forfeit_winner"
+        ).in_bulk(related_ids)
+
+        # Standings of every stage that a match draws its teams from.
+        sources = {self.source_id(match) for match in matches if self.source_id(match)}
+        self.positions = {pk: [] for pk in sources}
+        for summary in LadderSummary.objects.filter(stage__in=sources).select_related(
+            "team"
+        ):
+            self.positions[summary.stage_id].append(summary.team)
+
+        self.group_positions = {pk: {} for pk in sources}
+        for stage_id, group_id in StageGroup.objects.filter(
+            stage__in=sources
+        ).values_list("stage", "pk"):
+            groups = self.group_positions[stage_id]
+            groups[len(groups) + 1] = [
+                team
+                for team in self.positions[stage_id]
+                if team.stage_group_id == group_id
+            ]
+
+        # Matches still to be played in the stage before each of ours.
+        preceding = {
+            self.comes_after[pk].pk for pk in stage_ids if self.comes_after.get(pk)
+        }
+        self.outstanding = dict(
+            Match._base_manager.filter(match_outstanding, stage__in=preceding)
+            .order_by()
+            .values("stage")
+            .annotate(count=Count("pk"))
+            .values_list("stage", "count")
+        )
+
+        self.undecided_stage_ids = set(
+            UndecidedTeam.objects.filter(stage__in=stage_ids)
+            .order_by()
+            .values_list("stage", flat=True)
+            .distinct()
+        )
+
+    def source_id(self, match):
+        """
+        Return the pk of the stage whose standings decide the teams of
+        ``match``, or ``None`` if it is in the first stage and does not
+        depend on other matches.
+        """
+        stage = self.comes_after.get(match.stage_id)
+        if stage is not None:
+            return stage.pk
+        if match.home_team_eval_related_id or match.away_team_eval_related_id:
+            return match.stage_id
+        return None
+
+    def unplayed(self, match):
+        """
+        Number of matches not yet played in the stage before that of
+        ``match``.
+        """
+        stage = self.comes_after.get(match.stage_id)
+        if stage is None:
+            return 0
+        return self.outstanding.get(stage.pk, 0)
+
+    def has_undecided_teams(self, match):
+        return match.stage_id in self.undecided_stage_ids
+
+    def _resolve(self, match, field, source_id):
+        team = getattr(match, field)
+        if team is not None:
+            return team
+
+        team_undecided = getattr(match, f"{field}_undecided")
+        if team_undecided is not None:
+            team_eval = team_undecided.formula
+            related_id = None
+        else:
+            team_eval = getattr(match, f"{field}_eval")
+            related_id = getattr(match, f"{field}_eval_related_id")
+
+        if team_eval in WIN_LOSE:
+            related = self.related.get(related_id)
+            if related is None:
+                return None
+            return related._winner_loser(team_eval)
+
+        found = stage_group_position_re.match(team_eval or "")
+        if not found or source_id is None:
+            logger.debug("Unable to resolve %r for %r", team_eval, match)
+            return None
+
+        __, group, position = found.groups()
+        position = int(position)
+        if position < 1:
+            return None
+        try:
+            if group is None:
+                return self.positions[source_id][position - 1]
+            return self.group_positions[source_id][int(group)][position - 1]
+        except (IndexError, KeyError):
+            return None
+
+    def resolve(self, match):
+        """
+        Return the ``(home_team, away_team)`` of ``match`` as far as they can
+        be determined.
+        """
+        source_id = self.source_id(match)
+        return (
+            self._resolve(match, "home_team", source_id),
+            self._resolve(match, "away_team", source_id),
+        )
+
+
+class SeasonProgression:
+    """
+    The outcome of ``progress_season``; nothing is written until ``save``.
+    Each change is a ``Progression`` of the ``match`` whose ``field`` (either
+    ``home_team`` or ``away_team``) will be set from ``reference`` to ``team``.
+    """
+
+    def __init__(self, season, changes):
+        self.season = season
+        self.changes = changes
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    @property
+    def matches(self):
+        return list({change.match.pk: change.match for change in self}.values())
+
+    @transaction.atomic
+    def save(self):
+        """
+        Write the progressed teams, mark the matches as needing to be printed
+        again, and queue the affected calendars to be rendered. Returns the
+        matches updated.
+        """
+        now = timezone.now()
+        matches = self.matches
+        for change in self:
+            setattr(change.match, change.field, change.team)
+        for match in matches:
+            match.evaluated = True
+            match.last_modified = now
+
+        Match._base_manager.bulk_update(
+            matches, ["home_team", "away_team", "evaluated", "last_modified"]
+        )
+        Match.objects.filter(
+            pk__in=[match.pk for match in matches]
+        ).refresh_team_titles()
+        invalidate_matches(matches)
+
+        through = Stage.matches_needing_printing.through
+        through.objects.bulk_create(
+            [through(stage_id=match.stage_id, match_id=match.pk) for match in matches],
+            ignore_conflicts=True,
+        )
+
+        schedule_calendar_render(
+            match_ids=[match.pk for match in matches],
+            team_ids={change.team.pk for change in self},
+        )
+        return matches
+
+
+def progress_season(season):
+    """
+    Work out the team for every unfilled position in ``season`` that can be
+    decided from the final standings of the preceding stage or the result of
+    a ``W`` or ``L`` match. Stages whose preceding stage has matches still to
+    be played are left alone. Returns an unsaved ``SeasonProgression``.
+    """
+    matches = (
+        Match._base_manager.filter(
+            team_needs_progressing, stage__division__season=season
+        )
+        .exclude(legitimate_bye_match)
+        .select_related(
+            "stage__division",
+            "home_team",
+            "away_team",
+            "home_team_undecided",
+            "away_team_undecided",
+        )
+        .order_by("stage__division__order", "stage__order", "round", "pk")
+    )
+    resolver = ProgressionResolver(matches)
+
+    changes = []
+    for match in resolver.matches:
+        if resolver.unplayed(match):
+            continue
+        for field, team in zip(("home_team", "away_team"), resolver.resolve(match)):
+            if getattr(match, f"{field}_id") is not None or team is None:
+                continue
+            undecided = getattr(match, f"{field}_undecided")
+            if undecided is not None:
+                reference = undecided.formula
+            else:
+                reference = getattr(match, f"{field}_eval")
+                related_id = getattr(match, f"{field}_eval_related_id")
+                if related_id is not None:
+                    reference = f"{reference}{related_id}"
+            changes.append(Progression(match, field, reference, team))
+
+    return SeasonProgression(season, changes)
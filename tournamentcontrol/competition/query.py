@@ -1,5 +1,10 @@
+import collections
+from datetime import datetime, timedelta
+from itertools import islice
+
 from django.apps import apps
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import (
     Case,
     Count,
@@ -7,10 +12,15 @@ from django.db.models import (
     F,
     FloatField,
     Func,
+    OuterRef,
     Prefetch,
+    Q,
+    Subquery,
+    Value,
     When,
 )
-from django.db.models.query import QuerySet
+from django.db.models.functions import Coalesce
+from django.db.models.query import ModelIterable, QuerySet
 from django.utils import timezone
 
 from tournamentcontrol.competition.utils import team_title_case_clause
@@ -57,6 +67,182 @@ class StageQuerySet(QuerySet):
             )
         )
 
+    def team_ladders(self, teams):
+        """
+        Build the ladder structure used by ``team.html`` for each of
+        ``teams``; ``{team: {stage: summary}}`` for stages without pools and
+        ``{team: {stage: {pool: summary}}}`` for the pools the team is in.
+
+        The ladders of every team are loaded together by ``with_ladder_data``
+        and grouped in Python, so the number of queries does not depend on
+        the number of teams, stages or pools. Each stage has its division,
+        which the ladder templates refer to.
+        """
+        LadderSummary = apps.get_model("competition", "LadderSummary")
+        teams = list(teams)
+        by_pk = {team.pk: team for team in teams}
+        stages = (
+            self.filter(
+                keep_ladder=True,
+                pk__in=LadderSummary.objects.filter(team__in=teams).values("stage"),
+            )
+            .select_related("division")
+            .with_ladder_data()
+            .order_by("division__order", "division", "order")
+        )
+        res = collections.OrderedDict(
+            (team, collections.OrderedDict()) for team in teams
+        )
+        for stage in stages:
+            if stage.pool_count:
+                for pool in stage.pools.all():
+                    summary = list(pool.ladder_summary.all())
+                    for ladder in summary:
+                        if ladder.team_id in by_pk:
+                            res[by_pk[ladder.team_id]].setdefault(
+                                stage, collections.OrderedDict()
+                            )[pool] = summary
+            else:
+                summary = list(stage.ladder_summary.all())
+                for ladder in summary:
+                    if ladder.team_id in by_pk:
+                        res[by_pk[ladder.team_id]][stage] = summary
+        return res
+
+
+class NextAndLastMatchIterable(ModelIterable):
+    """
+    Yield teams with what ``Team.next_match`` and ``Team.last_match`` return
+    already loaded; all at once when the queryset is evaluated, or a chunk at
+    a time from ``iterator()``.
+    """
+
+    def __iter__(self):
+        queryset = self.queryset
+        teams = super().__iter__()
+        chunk_size = self.chunk_size if self.chunked_fetch else None
+        while chunk := list(islice(teams, chunk_size)):
+            matches = queryset._next_and_last_matches(
+                sorted(team.pk for team in chunk), *queryset._next_and_last_match
+            )
+            for team in chunk:
+                team._next_and_last_match = matches[team.pk]
+            yield from chunk
+
+
+class TeamQuerySet(QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._next_and_last_match = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._next_and_last_match = self._next_and_last_match
+        return clone
+
+    def with_next_and_last_match(self, now=None, offset=None):
+        """
+        Load what ``Team.next_match`` and ``Team.last_match`` return for
+        every team along with the teams, rather than with two queries per
+        team. See ``next_and_last_matches``.
+        """
+        if self._fields is not None:
+            raise TypeError(
+                "Cannot call with_next_and_last_match() after .values() or "
+                ".values_list()"
+            )
+        clone = self._chain()
+        clone._next_and_last_match = (now, offset)
+        clone._iterable_class = NextAndLastMatchIterable
+        return clone
+
+    def next_and_last_matches(self, now=None, offset=None):
+        """
+        Return ``{team_pk: (next_match, last_match)}`` for the teams in the
+        queryset, as ``Team.next_match`` and ``Team.last_match`` would give
+        them ``offset`` minutes after ``now``.
+
+        Both matches of every team are picked by a single query, and the
+        result is cached until the earliest of the next matches starts or a
+        match of any of the teams changes.
+        """
+        if self._result_cache is not None:
+            team_ids = sorted(team.pk for team in self._result_cache)
+        else:
+            team_ids = sorted(self.values_list("pk", flat=True))
+        return self._next_and_last_matches(team_ids, now, offset)
+
+    def _next_and_last_matches(self, team_ids, now=None, offset=None):
+        from tournamentcontrol.competition.pagecache import (
+            PAGE_CACHE_TIMEOUT,
+            tagged_key,
+        )
+
+        Match = apps.get_model("competition", "Match")
+        if now is None:
+            now = timezone.now()
+        if offset is None:
+            offset = 15  # FIXME add a value on a season, as Team.future
+        dt = now - timedelta(minutes=offset)
+        d, t = dt.date(), dt.time()
+
+        if not team_ids:
+            return {}
+
+        def build():
+            ordering = Match._meta.ordering
+            matches = Match._base_manager.filter(
+                Q(home_team=OuterRef("pk")) | Q(away_team=OuterRef("pk"))
+            )
+            upcoming = matches.filter(
+                Q(date__exact=d, time__gte=t) | Q(date__gt=d)
+            ).order_by(*ordering)
+            played = matches.filter(
+                Q(date__exact=d, time__lte=t) | Q(date__lt=d)
+            ).order_by(*[f"-{field}" for field in ordering])
+            rows = list(
+                self.model._base_manager.filter(pk__in=team_ids)
+                .order_by()
+                .annotate(
+                    next_match=Subquery(upcoming.values("pk")[:1]),
+                    last_match=Subquery(played.values("pk")[:1]),
+                )
+                .values_list("pk", "next_match", "last_match")
+            )
+            related = Match.objects.select_related(
+                "stage__division",
+                "stage_group",
+                "home_team__club",
+                "away_team__club",
+                "home_team__division",
+                "away_team__division",
+            ).in_bulk({pk for row in rows for pk in row[1:] if pk is not None})
+            res = {}
+            for pk, next_pk, last_pk in rows:
+                next_match, last_match = related.get(next_pk), related.get(last_pk)
+                if next_match is not None:
+                    next_match.next = True
+                if last_match is not None:
+                    last_match.last = True
+                res[pk] = (next_match, last_match)
+            return res
+
+        key = tagged_key("team_matches", [f"team:{pk}" for pk in team_ids], d, offset)
+        res = cache.get(key)
+        if res is None:
+            res = build()
+            # Once the first of the next matches starts, it is the last one.
+            timeout = PAGE_CACHE_TIMEOUT
+            for next_match, __ in res.values():
+                if next_match is not None and next_match.time is not None:
+                    kickoff = datetime.combine(
+                        next_match.date, next_match.time, tzinfo=dt.tzinfo
+                    )
+                    seconds = (kickoff - dt).total_seconds()
+                    timeout = max(1, min(timeout, int(seconds) + 1))
+            cache.set(key, res, timeout=timeout)
+        return res
+
 
 class MatchQuerySet(QuerySet):
     def future(self, date=None):
@@ -73,10 +259,42 @@ class MatchQuerySet(QuerySet):
     def _team_titles(self):
         """
         Calculate a placeholder title for teams that will require progression.
+        The result is stored in ``home_team_title`` and ``away_team_title``
+        by ``refresh_team_titles``, so this is only needed to compare them.
         """
         return self.annotate(
-            home_team_title=team_title_case_clause("home_team"),
-            away_team_title=team_title_case_clause("away_team"),
+            computed_home_team_title=team_title_case_clause("home_team"),
+            computed_away_team_title=team_title_case_clause("away_team"),
+        )
+
+    def stale_team_titles(self):
+        """
+        Matches in the queryset whose stored team titles differ from those
+        calculated by ``_team_titles``.
+        """
+        return self.alias(
+            stored_home=Coalesce("home_team_title", Value("")),
+            stored_away=Coalesce("away_team_title", Value("")),
+            home=Coalesce(team_title_case_clause("home_team"), Value("")),
+            away=Coalesce(team_title_case_clause("away_team"), Value("")),
+        ).exclude(stored_home=F("home"), stored_away=F("away"))
+
+    def refresh_team_titles(self):
+        """
+        Store the team titles calculated by ``_team_titles`` for every match
+        in the queryset whose stored titles are out of date, and mark those
+        matches modified, with a single ``UPDATE``.
+        """
+        titles = self.model._base_manager.filter(pk=OuterRef("pk"))
+        stale = self.stale_team_titles().order_by().values("pk")
+        return self.model._base_manager.filter(pk__in=stale).update(
+            home_team_title=Subquery(
+                titles.values(title=team_title_case_clause("home_team"))[:1]
+            ),
+            away_team_title=Subquery(
+                titles.values(title=team_title_case_clause("away_team"))[:1]
+            ),
+            last_modified=timezone.now(),
         )
 
 
@@ -0,0 +1,388 @@
+"""
+Automatic allocation of a day's matches to timeslots and places.
+
+``auto_schedule`` collects the matches on a season date which do not yet have
+a time or place, and hands them to a ``Scheduler`` along with the timeslots
+and places available that day. The scheduler honours the same rules as
+``MatchScheduleFormSet``, plus a minimum gap between the matches of a team:
+
+* only one match is played at each place at any time;
+* a team plays at most once in each timeslot, and its matches start at least
+  ``min_gap`` minutes apart;
+* a team never plays at the same time as one of its ``team_clashes``;
+* a team only plays between its ``timeslots_after`` and ``timeslots_before``;
+* a match whose teams are decided by another match on the day starts after
+  it, again by at least ``min_gap`` minutes.
+
+Matches already scheduled on the date are left where they are and constrain
+the rest, and those with a time but no place keep their time and are only
+given a place. The returned ``Schedule`` is a preview until it is saved.
+"""
+
+import hashlib
+import logging
+from collections import namedtuple
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from tournamentcontrol.competition.calendars import schedule_calendar_render
+from tournamentcontrol.competition.models import Match, Team
+from tournamentcontrol.competition.pagecache import invalidate_matches
+
+LOG = logging.getLogger(__name__)
+
+# How many times the scheduler may step back to an earlier match to free up a
+# slot, before settling for leaving a match unplaced.
+MAX_BACKTRACKS = 500
+
+Allocation = namedtuple("Allocation", "match time place")
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class Scheduler:
+    """
+    Place matches into ``times`` and ``places`` using a greedy depth-first
+    search with bounded backtracking.
+
+    Matches are taken in order of precedence, most constrained first, and
+    each is given the earliest timeslot it can legally use at the first free
+    place. When a match cannot be placed the search steps back and tries the
+    next option for the match before it; after ``max_backtracks`` attempts
+    the match is left unplaced and the search carries on from there.
+    """
+
+    def __init__(
+        self, times, places, min_gap=0, clashes=None, max_backtracks=MAX_BACKTRACKS
+    ):
+        self.times = sorted({_minutes(value) for value in times})
+        self.places = list(places)
+        self.min_gap = max(min_gap, 1)
+        self.clashes = clashes or {}
+        self.max_backtracks = max_backtracks
+
+        self.taken = set()
+        self.playing = {}
+        self.starts = {}
+
+    def block(self, match):
+        """
+        Record a match which is already scheduled and is not to be moved.
+        """
+        start = _minutes(match.time)
+        if match.play_at_id is not None:
+            self.taken.add((start, match.play_at_id))
+        for team_id in (match.home_team_id, match.away_team_id):
+            if team_id is not None:
+                self.playing.setdefault(team_id, []).append(start)
+        self.starts[match.pk] = start
+
+    def _assign(self, match, start, place):
+        self.taken.add((start, place.pk))
+        for team_id in (match.home_team_id, match.away_team_id):
+            if team_id is not None:
+                self.playing.setdefault(team_id, []).append(start)
+        self.starts[match.pk] = start
+
+    def _release(self, match, start, place):
+        self.taken.discard((start, place.pk))
+        for team_id in (match.home_team_id, match.away_team_id):
+            if team_id is not None:
+                self.playing[team_id].remove(start)
+        del self.starts[match.pk]
+
+    def _window(self, match):
+        """
+        Return the ``(earliest, latest)`` start allowed by team preferences.
+        """
+        earliest, latest = 0, 24 * 60
+        for field in ("home_team", "away_team"):
+            if getattr(match, f"{field}_id") is None:
+                continue
+            team = getattr(match, field)
+            if team.timeslots_after is not None:
+                earliest = max(earliest, _minutes(team.timeslots_after))
+            if team.timeslots_before is not None:
+                latest = min(latest, _minutes(team.timeslots_before))
+        return earliest, latest
+
+    def _related(self, match):
+        return [
+            pk
+            for pk in (
+                match.home_team_eval_related_id,
+                match.away_team_eval_related_id,
+            )
+            if pk is not None
+        ]
+
+    def _free(self, team_id, start):
+        for other in self.playing.get(team_id, ()):
+            if abs(start - other) < self.min_gap:
+                return False
+        for clash_id in self.clashes.get(team_id, ()):
+            if start in self.playing.get(clash_id, ()):
+                return False
+        return True
+
+    def _candidates(self, match, window, pending):
+        """
+        Yield each ``(start, place)`` the match may use, given the matches
+        placed so far. Evaluated lazily, so each option is checked against
+        the state at the time it is reached.
+        """
+        if match.time is not None:
+            # The time has been chosen already, so only find it a place.
+            start = _minutes(match.time)
+            for place in self.places:
+                if (start, place.pk) not in self.taken:
+                    yield start, place
+                    break
+            return
+
+        earliest, latest = window
+        for pk in self._related(match):
+            if pk in self.starts:
+                earliest = max(earliest, self.starts[pk] + self.min_gap)
+            elif pk in pending:
+                # The deciding match could not be placed, so neither can this.
+                return
+
+        team_ids = [
+            team_id
+            for team_id in (match.home_team_id, match.away_team_id)
+            if team_id is not None
+        ]
+        for start in self.times:
+            if start < earliest or start > latest:
+                continue
+            if not all(self._free(team_id, start) for team_id in team_ids):
+                continue
+            # Places are interchangeable, so the first free one will do.
+            for place in self.places:
+                if (start, place.pk) not in self.taken:
+                    yield start, place
+                    break
+
+    def _order(self, matches):
+        """
+        Sort matches so that those with a time already are placed first, then
+        each comes after any match that decides one of its teams, and
+        otherwise the most constrained are placed first.
+        """
+        by_pk = {match.pk: match for match in matches}
+        depth = {}
+
+        def get_depth(match, seen=()):
+            if match.pk not in depth:
+                parents = [
+                    by_pk[pk]
+                    for pk in self._related(match)
+                    if pk in by_pk and pk not in seen
+                ]
+                depth[match.pk] = 1 + max(
+                    (get_depth(parent, seen + (match.pk,)) for parent in parents),
+                    default=-1,
+                )
+            return depth[match.pk]
+
+        windows = {match.pk: self._window(match) for match in matches}
+
+        def options(match):
+            earliest, latest = windows[match.pk]
+            return sum(1 for start in self.times if earliest <= start <= latest)
+
+        indexed = list(enumerate(matches))
+        indexed.sort(
+            key=lambda item: (
+                item[1].time is None,
+                get_depth(item[1]),
+                options(item[1]),
+                item[0],
+            )
+        )
+        return [match for __, match in indexed], windows
+
+    def solve(self, matches):
+        """
+        Place as many of ``matches`` as possible. Returns a list of
+        ``(match, start, place)`` allocations, with ``start`` in minutes past
+        midnight, and the list of matches that could not be placed.
+        """
+        matches, windows = self._order(list(matches))
+        pending = {match.pk for match in matches}
+
+        chosen = [None] * len(matches)
+        options = []
+        unplaced = []
+        backtracks = 0
+        floor = 0
+        index = 0
+
+        while index < len(matches):
+            match = matches[index]
+            if len(options) == index:
+                options.append(self._candidates(match, windows[match.pk], pending))
+
+            option = next(options[index], None)
+            if option is not None:
+                self._assign(match, *option)
+                chosen[index] = option
+                index += 1
+                continue
+
+            if index > floor and backtracks < self.max_backtracks:
+                # Step back and move the previous match to its next option.
+                backtracks += 1
+                options.pop()
+                index -= 1
+                self._release(matches[index], *chosen[index])
+                chosen[index] = None
+                continue
+
+            # Out of options; leave this match and never revisit the ones
+            # before it, so the search stays bounded.
+            LOG.debug("Unable to place %r after %d backtracks", match, backtracks)
+            unplaced.append(match)
+            index += 1
+            floor = index
+            backtracks = 0
+
+        allocations = [
+            (match, *option)
+            for match, option in zip(matches, chosen)
+            if option is not None
+        ]
+        return allocations, unplaced
+
+
+class Schedule:
+    """
+    The outcome of ``auto_schedule``; nothing is written until ``save``.
+    """
+
+    def __init__(self, season, date, allocations, unplaced):
+        self.season = season
+        self.date = date
+        self.allocations = allocations
+        self.unplaced = unplaced
+
+    def __iter__(self):
+        return iter(self.allocations)
+
+    def __len__(self):
+        return len(self.allocations)
+
+    @property
+    def digest(self):
+        """
+        Identify the allocations, so that a preview can be checked to still
+        hold when it is saved.
+        """
+        allocations = [
+            (match.pk, time.isoformat(), place.pk)
+            for match, time, place in self.allocations
+        ]
+        return hashlib.md5(repr(allocations).encode()).hexdigest()
+
+    @transaction.atomic
+    def save(self):
+        """
+        Write the allocated times and places, and queue the affected
+        calendars to be rendered again. Returns the matches updated.
+        """
+        now = timezone.now()
+        matches = []
+        for match, time, place in self.allocations:
+            match.time = time
+            match.play_at = place
+            match.datetime = timezone.make_aware(
+                datetime.combine(self.date, time),
+                place.timezone or self.season.timezone,
+            )
+            match.last_modified = now
+            matches.append(match)
+
+        Match._base_manager.bulk_update(
+            matches, ["time", "play_at", "datetime", "last_modified"]
+        )
+        invalidate_matches(matches)
+        schedule_calendar_render(match_ids=[match.pk for match in matches])
+        return matches
+
+
+def auto_schedule(season, date, min_gap=0, max_backtracks=MAX_BACKTRACKS):
+    """
+    Allocate a time and place to each match on ``date`` in ``season`` that
+    does not yet have both; a match with a time keeps it. ``min_gap`` is the least number of minutes
+    between the starts of two matches for a team. Returns an unsaved
+    ``Schedule``.
+    """
+    timeslots = season.get_timeslots(date)
+    places = list(season.get_places())
+
+    matches = list(
+        Match._base_manager.filter(
+            Q(time__isnull=True) | Q(play_at__isnull=True),
+            stage__division__season=season,
+            date=date,
+            is_bye=False,
+        )
+        .select_related("stage__division", "home_team", "away_team")
+        .order_by("stage__division__order", "stage__order", "round", "pk")
+    )
+
+    team_ids = {
+        team_id
+        for match in matches
+        for team_id in (match.home_team_id, match.away_team_id)
+        if team_id is not None
+    }
+    clashes = {}
+    for team_id, other_id in Team.team_clashes.through.objects.filter(
+        from_team__in=team_ids
+    ).values_list("from_team_id", "to_team_id"):
+        clashes.setdefault(team_id, set()).add(other_id)
+
+    scheduler = Scheduler(
+        timeslots,
+        places,
+        min_gap=min_gap,
+        clashes=clashes,
+        max_backtracks=max_backtracks,
+    )
+
+    # Matches already in place on the day stay where they are.
+    clashing_ids = set().union(*clashes.values())
+    fixed = (
+        Match._base_manager.filter(date=date, time__isnull=False)
+        .filter(
+            Q(stage__division__season=season)
+            | Q(home_team__in=clashing_ids)
+            | Q(away_team__in=clashing_ids)
+        )
+        .exclude(pk__in=[match.pk for match in matches])
+        .only("time", "play_at", "home_team", "away_team")
+        .order_by()
+    )
+    for match in fixed:
+        scheduler.block(match)
+
+    solved, unplaced = scheduler.solve(matches)
+    times = {
+        _minutes(value): value.replace(second=0, microsecond=0) for value in timeslots
+    }
+    allocations = [
+        Allocation(match, times[start] if match.time is None else match.time, place)
+        for match, start, place in solved
+    ]
+    order = {place.pk: index for index, place in enumerate(places)}
+    allocations.sort(
+        key=lambda allocation: (allocation.time, order[allocation.place.pk])
+    )
+    return Schedule(season, date, allocations, unplaced)
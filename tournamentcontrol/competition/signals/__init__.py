@@ -1,6 +1,9 @@
 from django.db import models
 
 from tournamentcontrol.competition.signals.custom import match_forfeit  # noqa
+from tournamentcontrol.competition.signals.labels import (  # noqa
+    invalidate_placeholder_labels,
+)
 from tournamentcontrol.competition.signals.ladders import (  # noqa
     changed_points_formula,
     scale_ladder_entry,
@@ -9,6 +12,7 @@ from tournamentcontrol.competition.signals.ladders import (  # noqa
 from tournamentcontrol.competition.signals.matches import (  # noqa
     match_saved_handler,
     notify_match_forfeit_email,
+    refresh_team_titles,
 )
 from tournamentcontrol.competition.signals.places import (  # noqa
     capture_timezone_before_save,
@@ -0,0 +1,91 @@
+from django.utils import timezone
+
+from tournamentcontrol.competition.calendars import schedule_calendar_render
+from tournamentcontrol.competition.models import Match
+from tournamentcontrol.competition.signals.decorators import (
+    disable_for_loaddata,
+)
+
+
+@disable_for_loaddata
+def render_match_calendars(sender, instance, created=None, **kwargs):
+    """
+    When a Match is saved or deleted, re-render the cached calendar feeds it
+    appears in, including those of any teams it was previously between.
+    """
+    team_ids = {instance.home_team_id, instance.away_team_id}
+    team_ids.update(getattr(instance, "_calendar_team_ids", ()))
+
+    if created is None:
+        # The match will be gone by the time the task runs, so name the
+        # season and division feeds explicitly.
+        division = instance.stage.division
+        keys = [
+            (division.season_id, "season", division.season_id),
+            (division.season_id, "division", division.pk),
+        ]
+        schedule_calendar_render(team_ids=team_ids, keys=keys)
+    else:
+        schedule_calendar_render(match_ids=[instance.pk], team_ids=team_ids)
+
+
+@disable_for_loaddata
+def render_division_calendars(sender, instance, created=False, **kwargs):
+    """
+    When a division is made a draft or published, its matches are removed from
+    or added to every public feed they would appear in.
+    """
+    if created or "draft" not in instance.changed_fields:
+        return
+    schedule_calendar_render(
+        team_ids=instance.teams.values_list("pk", flat=True),
+        keys=[
+            (instance.season_id, "season", instance.season_id),
+            (instance.season_id, "division", instance.pk),
+        ],
+    )
+
+
+# Fields of each model that are shown in the events of its matches, and the
+# lookup from ``Match`` to it.
+RENAMED_FIELDS = ("title", "slug")
+RENAMED_LOOKUPS = {
+    "competition": "stage__division__season__competition",
+    "season": "stage__division__season",
+    "division": "stage__division",
+    "stage": "stage",
+}
+
+
+def capture_calendar_fields(sender, instance, **kwargs):
+    """
+    Remember the stored title and slug of an instance being saved, so that
+    ``render_renamed_calendars`` can tell whether they have changed.
+    """
+    instance._calendar_fields = None
+    if instance.pk is not None:
+        instance._calendar_fields = (
+            sender._base_manager.filter(pk=instance.pk).values(*RENAMED_FIELDS).first()
+        )
+
+
+@disable_for_loaddata
+def render_renamed_calendars(sender, instance, created=False, **kwargs):
+    """
+    When a competition, season, division or stage is renamed, the events of
+    its matches change even though the match rows are not saved; mark them
+    modified and re-render the feeds they appear in.
+    """
+    previous = getattr(instance, "_calendar_fields", None)
+    if created or previous is None:
+        return
+    if all(previous[name] == getattr(instance, name) for name in RENAMED_FIELDS):
+        return
+
+    lookup = RENAMED_LOOKUPS[instance._meta.model_name]
+    match_ids = list(
+        Match.objects.filter(**{lookup: instance.pk}).values_list("pk", flat=True)
+    )
+    if match_ids:
+        Match.objects.filter(pk__in=match_ids).update(last_modified=timezone.now())
+        schedule_calendar_render(match_ids=match_ids)
@@ -0,0 +1,35 @@
+from django.db import connection
+
+from touchtechnology.common.utils import bump_version_stamps_on_commit
+
+
+def invalidate_placeholder_labels(sender, instance, *args, **kwargs):
+    """
+    When a ``Stage``, ``StageGroup``, ``UndecidedTeam`` or ``Match`` changes,
+    issue a new version of the placeholder labels of its division so that each
+    process rebuilds them on the next render.
+    """
+    # The key is defined alongside Stage.placeholder_labels, which reads it,
+    # and models can not be imported while it is still loading the signals.
+    from tournamentcontrol.competition.models import (
+        Match,
+        Stage,
+        placeholder_labels_version_key,
+    )
+
+    if isinstance(instance, Match) and "created" in kwargs:
+        # Saving a match only changes the labels when how its teams are
+        # described changes, not when its time or result does.
+        if not instance.changed_team_fields():
+            return
+
+    if isinstance(instance, Stage):
+        division_id = instance.division_id
+    elif instance.stage_id is not None:
+        division_id = instance.stage.division_id
+    else:
+        return
+    bump_version_stamps_on_commit(
+        [placeholder_labels_version_key(division_id)],
+        getattr(connection, "tenant", None),
+    )
@@ -1,40 +1,34 @@
 import logging
-from decimal import Decimal, DivisionByZero, InvalidOperation
-
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Count, Sum
-
+from decimal import Decimal
+
+from django.db.models import Count
+
+from tournamentcontrol.competition.calc import clear_formula_cache
+from tournamentcontrol.competition.ladders import (  # noqa: F401
+    aggregate_kw,
+    apply_ladder_entry,
+    built_ladder_context,
+    bump_ladder_versions,
+    rebuild_ladder_summary,
+    recalculate_ladder_points,
+)
 from tournamentcontrol.competition.signals.decorators import (
     disable_for_loaddata,
 )
-from tournamentcontrol.competition.utils import SumDict
 
 logger = logging.getLogger(__name__)
 
-aggregate_kw = dict(
-    played=Sum("played"),
-    win=Sum("win"),
-    loss=Sum("loss"),
-    draw=Sum("draw"),
-    bye=Sum("bye"),
-    forfeit_for=Sum("forfeit_for"),
-    forfeit_against=Sum("forfeit_against"),
-    score_for=Sum("score_for"),
-    score_against=Sum("score_against"),
-    bonus_points=Sum("bonus_points"),
-    points=Sum("points"),
-)
-
 
 @disable_for_loaddata
 def changed_points_formula(sender, instance, *args, **kwargs):
     """
-    When the ``points_formula`` is edited, we need to trigger a rebuild of all
-    matches that have results and are related to the updated instance.
+    When the ``points_formula`` or ``bonus_points_formula`` is edited, we need
+    to re-score all the ladder entries for matches related to the updated
+    instance.
     """
-    if "points_formula" in instance.changed_fields:
-        for m in instance.matches.filter(ladder_entries__isnull=False):
-            m.save()
+    if {"points_formula", "bonus_points_formula"}.intersection(instance.changed_fields):
+        clear_formula_cache()
+        recalculate_ladder_points(instance)
 
 
 @disable_for_loaddata
@@ -95,97 +89,26 @@ def scale_ladder_entry(sender, instance, *args, **kwargs):
 @disable_for_loaddata
 def team_ladder_entry_aggregation(sender, instance, created=None, *args, **kwargs):
     """
-    Function to be called following a LadderEntry being saved.
+    Function to be called following a LadderEntry being saved or deleted.
 
-    The should recalculate the LadderSummary for a particular team in a
-    particular division so that we don't have to do too many database hits and
+    The should update the LadderSummary for a particular team in a particular
+    division so that we don't have to do too many database hits and
     calculations for ladders.
 
     We can also sort a ladder for a division easily this way without need to
     calculate and then compare.
-    """
-    try:
-        instance.team.ladder_summary.filter(stage=instance.match.stage).delete()
-    except ObjectDoesNotExist as e:
-        logger.debug(e)
 
-    if not instance.match.stage.keep_ladder:
-        logger.debug("Stage does not keep a ladder, skipping.")
-        return
-
-    # if we are carrying points from the previous stage then we'll need to add
-    # them here.
-
-    base = SumDict()
-    if instance.match and instance.match.stage_group:
-        home_pks = instance.match.stage_group.matches.values_list(
-            "home_team", flat=True
-        )
-        away_pks = instance.match.stage_group.matches.values_list(
-            "away_team", flat=True
+    New and deleted entries are applied to the summary as a delta; an entry
+    which has been changed in place can not be, so the summary is rebuilt.
+    """
+    match = instance.match
+    bump_ladder_versions({match.stage_id, built_ladder_context(match)[0]})
+
+    if created is None:
+        apply_ladder_entry(instance, -1)
+    elif created:
+        apply_ladder_entry(instance, 1)
+    else:
+        rebuild_ladder_summary(
+            instance.team, instance.match.stage, instance.match.stage_group
         )
-        opponent_pks = set(home_pks).union(away_pks).difference([instance.team_id])
-
-        # when the Pool has carry_ladder set we want to only bring forward the
-        # statistics from matches played with other teams in the group.
-        if instance.match.stage_group.carry_ladder:
-            logger.debug("Pool match, group statistics only.")
-            base += instance.team.ladder_entries.filter(
-                match__include_in_ladder=True,
-                match__stage=instance.match.stage.comes_after,
-                opponent__in=opponent_pks,
-            ).aggregate(**aggregate_kw)
-
-        # when the Stage has carry_ladder set but not the Pool we want to
-        # bring forward all the teams statistics from the preceding stage.
-        elif instance.match.stage.carry_ladder:
-            logger.debug("Pool match, all stage statistics.")
-            base += instance.team.ladder_entries.filter(
-                match__include_in_ladder=True,
-                match__stage=instance.match.stage.comes_after,
-            ).aggregate(**aggregate_kw)
-
-    elif instance.match.stage.carry_ladder:
-        # when the preceeding stage had Pools, this stage does not have any
-        # Pools, and carry_ladder is set, then we would bring forward the
-        # statistics from matches played with other teams in the stage.
-        if instance.match.stage.comes_after.pools.count():
-            base += instance.team.ladder_entries.filter(
-                match__include_in_ladder=True,
-                match__stage=instance.match.stage.comes_after,
-                opponent__in=instance.match.stage.teams,
-            ).aggregate(**aggregate_kw)
-
-        # when there are no Pools and the stage has carry_ladder set we bring
-        # forward the ladder_summary instead.
-        else:
-            base += instance.team.ladder_summary.filter(
-                stage=instance.match.stage.comes_after
-            ).aggregate(**aggregate_kw)
-
-    aggregate = base + instance.team.ladder_entries.filter(
-        match__include_in_ladder=True,
-        match__stage=instance.match.stage,
-    ).aggregate(**aggregate_kw)
-
-    score_for = aggregate.get("score_for")
-    score_against = aggregate.get("score_against")
-
-    try:
-        difference = score_for - score_against
-    except TypeError:
-        difference = None
-
-    try:
-        percentage = Decimal(score_for) / Decimal(score_against) * Decimal(100)
-    except (DivisionByZero, InvalidOperation, TypeError):
-        percentage = None
-
-    aggregate.update({"difference": difference})
-    aggregate.update({"percentage": percentage})
-
-    instance.team.ladder_summary.create(
-        stage=instance.match.stage,
-        stage_group=instance.team.stage_group,
-        **aggregate,
-    )
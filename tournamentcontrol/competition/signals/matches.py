@@ -1,11 +1,16 @@
 import logging
 from email.utils import formataddr
 
+from django.apps import apps
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db.models import Q
 from django.template import Context, Template
 
-from tournamentcontrol.competition.calc import BonusPointCalculator, Calculator
+from tournamentcontrol.competition.ladders import (
+    evaluate_ladder_points,
+    ladder_context,
+)
 from tournamentcontrol.competition.signals.decorators import (
     disable_for_loaddata,
 )
@@ -25,6 +30,9 @@ def match_saved_handler(sender, instance, created, *args, **kwargs):
     for ladder_entry in instance.ladder_entries.all():
         ladder_entry.delete()
 
+    # Any entries created from here on are built for the match as it is now.
+    instance._ladder_context = ladder_context(instance)
+
     if instance.is_bye and instance.bye_processed:
         logger.debug("BYE: Match #%s", instance.pk)
         return create_match_ladder_entries(instance)
@@ -40,6 +48,47 @@ def match_saved_handler(sender, instance, created, *args, **kwargs):
     logger.debug("SKIPPED: Match #%s", instance.pk)
 
 
+@disable_for_loaddata
+def refresh_team_titles(sender, instance, *args, **kwargs):
+    """
+    When a ``Match``, ``Team`` or ``UndecidedTeam`` is saved, store the team
+    titles of every match that displays it. Matches whose titles change are
+    shown differently in calendar feeds and pages, so those are refreshed too.
+    """
+    from tournamentcontrol.competition.calendars import schedule_calendar_render
+    from tournamentcontrol.competition.pagecache import invalidate_matches
+
+    Match = apps.get_model("competition", "Match")
+    Team = apps.get_model("competition", "Team")
+    UndecidedTeam = apps.get_model("competition", "UndecidedTeam")
+
+    if isinstance(instance, Match):
+        if not instance.changed_team_fields():
+            # Nothing the titles are built from has changed.
+            return
+        matches = (
+            Q(pk=instance.pk)
+            | Q(home_team_eval_related=instance.pk)
+            | Q(away_team_eval_related=instance.pk)
+        )
+    elif isinstance(instance, Team):
+        matches = Q(home_team=instance.pk) | Q(away_team=instance.pk)
+    elif isinstance(instance, UndecidedTeam):
+        matches = Q(home_team_undecided=instance.pk) | Q(
+            away_team_undecided=instance.pk
+        )
+    else:
+        return
+
+    changed = list(
+        Match.objects.filter(matches).stale_team_titles().values_list("pk", flat=True)
+    )
+    if changed:
+        Match.objects.filter(pk__in=changed).refresh_team_titles()
+        invalidate_matches(changed)
+        schedule_calendar_render(match_ids=changed)
+
+
 def match_deleted_handler(sender, instance, *args, **kwargs):
     """
     Function to be called prior to a Match being saved.
@@ -70,7 +119,7 @@ def create_team_ladder_entry(instance, home_or_away):
     opponent_score = getattr(instance, opponent + "_team_score") or 0
 
     ladder_kwargs = dict(
-        match_id=instance.pk,
+        match=instance,
         played=1,
         score_for=team_score,
         score_against=opponent_score,
@@ -98,17 +147,7 @@ def create_team_ladder_entry(instance, home_or_away):
 
     if team is not None:
         ladder = LadderEntry(**ladder_kwargs)
-
-        calculator = Calculator(ladder)
-        calculator.parse(instance.stage.division.points_formula)
-        ladder.points = calculator.evaluate()
-
-        if instance.stage.division.bonus_points_formula:
-            bonus_calculator = BonusPointCalculator(ladder)
-            bonus_calculator.parse(instance.stage.division.bonus_points_formula)
-            ladder.bonus_points = bonus_calculator.evaluate()
-
-        ladder.points += ladder.bonus_points
+        evaluate_ladder_points(ladder, instance.stage.division)
         ladder.save()
 
         return ladder
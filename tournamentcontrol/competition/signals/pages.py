@@ -0,0 +1,75 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+from tournamentcontrol.competition.models import (
+    Division,
+    Ground,
+    LadderSummary,
+    Match,
+    MatchStatisticBase,
+    Season,
+    Stage,
+    StageGroup,
+    Team,
+    UndecidedTeam,
+    Venue,
+)
+from tournamentcontrol.competition.pagecache import (
+    division_tags,
+    invalidate_tags,
+    match_tags,
+)
+from tournamentcontrol.competition.signals.decorators import (
+    disable_for_loaddata,
+)
+
+
+@disable_for_loaddata
+def invalidate_pages(sender, instance, **kwargs):
+    """
+    When anything shown on the public division, stage, pool or team pages is
+    saved or deleted, invalidate the cached pages that show it.
+    """
+    if isinstance(instance, Match):
+        team_ids = {instance.home_team_id, instance.away_team_id}
+        team_ids.update(getattr(instance, "_calendar_team_ids", ()))
+        tags = {f"team:{pk}" for pk in team_ids if pk}
+        if instance.stage_id is not None:
+            division = instance.stage.division
+            tags.add(f"stage:{instance.stage_id}")
+            tags.add(f"division:{division.pk}")
+            tags.add(f"matches:{division.season_id}")
+    elif isinstance(instance, MatchStatisticBase):
+        tags = match_tags([instance.match_id])
+    elif isinstance(instance, (LadderSummary, StageGroup, UndecidedTeam)):
+        tags = {f"stage:{instance.stage_id}"}
+        try:
+            stage = instance.stage
+            tags.add(f"division:{stage.division_id}")
+            if not isinstance(instance, LadderSummary):
+                # Pool titles and placeholder teams are shown with matches
+                # across the season.
+                tags.add(f"matches:{stage.division.season_id}")
+        except ObjectDoesNotExist:
+            # Deleted along with the stage, which invalidates the division.
+            pass
+    elif isinstance(instance, Stage):
+        tags = {f"stage:{instance.pk}", f"division:{instance.division_id}"}
+        try:
+            # Stage titles are shown with matches across the season.
+            tags.add(f"matches:{instance.division.season_id}")
+        except ObjectDoesNotExist:
+            pass
+    elif isinstance(instance, Division):
+        tags = division_tags(instance.pk)
+    elif isinstance(instance, Team):
+        # Team titles appear on every page of the division.
+        tags = division_tags(instance.division_id)
+    elif isinstance(instance, Season):
+        tags = {f"season:{instance.pk}", f"matches:{instance.pk}"}
+    elif isinstance(instance, (Venue, Ground)):
+        # Where a match is played is shown on every page of the season.
+        venue = instance.venue if isinstance(instance, Ground) else instance
+        tags = {f"season:{venue.season_id}", f"matches:{venue.season_id}"}
+    else:
+        return
+    invalidate_tags(tags)
@@ -2,7 +2,7 @@ import collections
 import functools
 import logging
 import operator
-from datetime import date, timedelta
+from datetime import date
 from operator import or_
 
 from dateutil.relativedelta import relativedelta
@@ -11,22 +11,33 @@ from django.contrib import messages
 from django.contrib.sitemaps import views as sitemaps_views
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Case, Count, F, Prefetch, Q, Sum, When
-from django.http import Http404, HttpResponse, HttpResponseGone
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseGone,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from django.urls import include, path, re_path, reverse
-from django.urls.exceptions import NoReverseMatch
 from django.utils import timezone
-from django.utils.html import strip_tags
-from django.utils.http import urlencode
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
 from django.utils.module_loading import import_string
 from django.utils.translation import gettext, gettext_lazy as _
 from django.views.decorators.cache import cache_page
 from guardian.utils import get_40x_or_None
-from icalendar import Calendar, Event
 
 from touchtechnology.common.decorators import login_required_m
 from touchtechnology.common.sites import Application
 from touchtechnology.common.utils import get_perms_for_model
+from tournamentcontrol.competition.calendars import (
+    calendar_matches,
+    calendar_scope,
+    calendar_validator,
+    generate_calendar,
+    get_calendar_artifact,
+    request_calendar_render,
+)
 from tournamentcontrol.competition.dashboard import (
     matches_require_basic_results,
     matches_require_details_results,
@@ -42,6 +53,7 @@ from tournamentcontrol.competition.forms import (
     ProgressTeamsFormSet,
     StreamControlForm,
 )
+from tournamentcontrol.competition.ladders import defer_ladder_updates
 from tournamentcontrol.competition.models import (
     Competition,
     Ground,
@@ -52,6 +64,11 @@ from tournamentcontrol.competition.models import (
     Team,
     Venue,
 )
+from tournamentcontrol.competition.pagecache import (
+    cached_page_data,
+    page_cache_key,
+    page_tags,
+)
 from tournamentcontrol.competition.utils import (
     FauxQueryset,
     legitimate_bye_match,
@@ -171,8 +188,9 @@ class CompetitionAdminMixin(object):
             )
 
             if match_formset.is_valid() and bye_formset.is_valid():
-                match_formset.save()
-                bye_formset.save()
+                with defer_ladder_updates():
+                    match_formset.save()
+                    bye_formset.save()
                 messages.success(request, _("Your changes have been saved."))
                 return self.redirect(redirect_to)
         else:
@@ -795,8 +813,9 @@ class CompetitionSite(CompetitionAdminMixin, Application):
         templates = self.template_path(
             "division.html", competition.slug, season.slug, division.slug
         )
-        extra_context.update(
-            division.matches.exclude(is_bye=True).aggregate(
+
+        def statistics():
+            return division.matches.exclude(is_bye=True).aggregate(
                 timeslot_count=Count("datetime", distinct=True),
                 match_count=Count("pk", distinct=True),
                 points_scored=Sum(
@@ -816,7 +835,11 @@ class CompetitionSite(CompetitionAdminMixin, Application):
                     )
                 ),
             )
-        )
+
+        key = page_cache_key(request, page_tags(season, division=division))
+        extra_context.update(cached_page_data(f"{key}:statistics", statistics))
+        extra_context["page_cache_key"] = key
+
         return self.generic_detail(
             request,
             season.divisions,
@@ -833,8 +856,9 @@ class CompetitionSite(CompetitionAdminMixin, Application):
             "stage.html", competition.slug, season.slug, division.slug, stage.slug
         )
         extra_context["parent"] = stage
-        extra_context.update(
-            stage.matches.exclude(is_bye=True).aggregate(
+
+        def statistics():
+            return stage.matches.exclude(is_bye=True).aggregate(
                 timeslot_count=Count("datetime", distinct=True),
                 match_count=Count("pk", distinct=True),
                 points_scored=Sum(
@@ -852,7 +876,11 @@ class CompetitionSite(CompetitionAdminMixin, Application):
                     )
                 ),
             )
-        )
+
+        key = page_cache_key(request, page_tags(season, stage=stage))
+        extra_context.update(cached_page_data(f"{key}:statistics", statistics))
+        extra_context["page_cache_key"] = key
+
         return self.generic_detail(
             request,
             division.stages,
@@ -883,8 +911,9 @@ class CompetitionSite(CompetitionAdminMixin, Application):
             stage.slug,
             pool.slug,
         )
-        extra_context.update(
-            pool.matches.exclude(is_bye=True).aggregate(
+
+        def statistics():
+            return pool.matches.exclude(is_bye=True).aggregate(
                 timeslot_count=Count("datetime", distinct=True),
                 match_count=Count("pk", distinct=True),
                 points_scored=Sum(
@@ -904,7 +933,11 @@ class CompetitionSite(CompetitionAdminMixin, Application):
                     )
                 ),
             )
-        )
+
+        key = page_cache_key(request, page_tags(season, stage=stage))
+        extra_context.update(cached_page_data(f"{key}:statistics", statistics))
+        extra_context["page_cache_key"] = key
+
         return self.generic_detail(
             request,
             stage.pools,
@@ -921,8 +954,8 @@ class CompetitionSite(CompetitionAdminMixin, Application):
             "team.html", competition.slug, season.slug, division.slug, team.slug
         )
 
-        extra_context.update(
-            team.matches.exclude(is_bye=True).aggregate(
+        def statistics():
+            return team.matches.exclude(is_bye=True).aggregate(
                 timeslot_count=Count("datetime", distinct=True),
                 match_count=Count("pk", distinct=True),
                 points_scored=Sum(
@@ -942,7 +975,11 @@ class CompetitionSite(CompetitionAdminMixin, Application):
                     )
                 ),
             )
-        )
+
+        key = page_cache_key(request, page_tags(season, division, team=team))
+        extra_context.update(cached_page_data(f"{key}:statistics", statistics))
+        extra_context["page_cache_key"] = key
+
         return self.generic_detail(
             request,
             division.teams,
@@ -1207,117 +1244,63 @@ class CompetitionSite(CompetitionAdminMixin, Application):
             # Try to influence a cleanup of clients.
             return HttpResponseGone()
 
-        if team is not None:
-            matches = Match.objects.filter(
-                Q(home_team=team) | Q(away_team=team)
-            )
-        elif division is not None:
-            matches = Match.objects.filter(stage__division=division)
-        elif club is not None:
-            matches = Match.objects.filter(
-                Q(home_team__club=club) | Q(away_team__club=club),
-                stage__division__season=season,
-            )
-        else:
-            matches = Match.objects.filter(stage__division__season=season)
-
-        # Do not include matches which have not had the time scheduled
-        matches = matches.exclude(datetime__isnull=True)
-
-        # Fetch only the fields needed for calendar event generation.
-        # Team titles are provided by MatchManager's _team_titles() SQL
-        # annotations (home_team_title, away_team_title), so we don't need
-        # to select_related the team objects or use match.title (which
-        # triggers per-match template rendering and potential N+1 queries).
-        matches = matches.select_related(
-            "stage__division__season__competition",
-        ).only(
-            "uuid",
-            "datetime",
-            "stage__title",
-            "stage__division__title",
-            "stage__division__slug",
-            "stage__division__season__slug",
-            "stage__division__season__competition__slug",
-        )
-
-        # Remove any matches that are part of a draft division unless being
-        # viewed by a superuser.
-        if not request.user.is_superuser:
-            matches = matches.exclude(stage__division__draft=True)
-
         # For development server turn back plain text to make debugging easier
         if settings.DEBUG:
             content_type = "text/plain"
         else:
             content_type = "text/calendar"
 
-        response = HttpResponse(content_type=content_type)
-
-        cal = Calendar()
-        cal.add("prodid", "-//Tournament Control//%s//" % request.get_host())
-        cal.add("version", "2.0")
-
-        # Cache reverse() URL templates per division to avoid calling it for
-        # every match. All matches in the same division produce URLs that
-        # differ only in the match pk.
-        _url_templates = {}
-
-        for match in matches.order_by("datetime", "play_at"):
-            event = Event()
-            event["uid"] = match.uuid.hex
-
-            # Use SQL-computed title annotations instead of match.title to
-            # avoid per-match template rendering and N+1 queries for
-            # undecided teams. strip_tags handles bye matches which include
-            # HTML in the annotation.
-            home = strip_tags(match.home_team_title or "")
-            away = strip_tags(match.away_team_title or "")
-            if home and away:
-                summary = f"{home} vs {away}"
-            elif home or away:
-                summary = home or away
-            else:
-                summary = "TBD"
-            event.add("summary", summary)
-
-            event.add("location", f"{match.stage.division.title} ({match.stage.title})")
-            event.add("dtstart", match.datetime)
-
-            # FIXME match duration should not be hardcoded
-            event.add("dtend", match.datetime + timedelta(minutes=45))
-            # FIXME should be the last modified time of the match
-            event.add("dtstamp", timezone.now())
-
-            # Determine the resource uri to the detailed match view.
-            # Cache the URL pattern per division to avoid repeated reverse().
-            div_id = match.stage.division_id
-            if div_id not in _url_templates:
-                try:
-                    uri = reverse(
-                        "competition:match",
-                        kwargs={
-                            "match": match.pk,
-                            "division": match.stage.division.slug,
-                            "season": match.stage.division.season.slug,
-                            "competition": match.stage.division.season.competition.slug,
-                        },
-                    )
-                    _url_templates[div_id] = uri.replace(
-                        f"match:{match.pk}/", "match:{}/"
+        # Superusers can see draft divisions, everybody else is served the
+        # same public feed.
+        drafts = request.user.is_superuser
+        scope, pk = calendar_scope(season, club, division, team)
+        base_url = request.build_absolute_uri("/")
+
+        # Serve the pre-rendered feed when we have one for this site.
+        if not drafts:
+            artifact = get_calendar_artifact(season.pk, scope, pk, base_url)
+            if artifact is not None:
+                response = get_conditional_response(
+                    request,
+                    etag=quote_etag(artifact["etag"]),
+                    last_modified=artifact["last_modified"],
+                )
+                if response is None:
+                    response = HttpResponse(
+                        artifact["content"], content_type=content_type
                     )
-                except NoReverseMatch:
-                    LOG.exception("Unable to resolve url for %r", match)
-                    _url_templates[div_id] = None
+                return self._calendar_headers(
+                    response, artifact["etag"], artifact["last_modified"]
+                )
 
-            url_template = _url_templates[div_id]
-            if url_template is not None:
-                uri = url_template.format(match.pk)
-                event.add("description", request.build_absolute_uri(uri))
+            # Otherwise fall through to generating the feed on demand, and
+            # have it rendered for subsequent requests.
+            request_calendar_render(season.pk, scope, pk, base_url)
 
-            cal.add_component(event)
+        matches = calendar_matches(season.pk, scope, pk, drafts=drafts)
+
+        # Subscribed calendars are polled indefinitely, so answer with a 304
+        # when nothing in scope has changed.
+        etag, last_modified = calendar_validator(
+            matches, request.get_host(), request.is_secure(), drafts=drafts
+        )
+        response = get_conditional_response(
+            request, etag=quote_etag(etag), last_modified=last_modified
+        )
+        if response is None:
+            response = StreamingHttpResponse(
+                generate_calendar(
+                    matches, request.get_host(), request.build_absolute_uri
+                ),
+                content_type=content_type,
+            )
+        return self._calendar_headers(response, etag, last_modified)
 
-        response.write(cal.to_ical())
+    @staticmethod
+    def _calendar_headers(response, etag, last_modified):
+        response["ETag"] = quote_etag(etag)
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
         return response
 
     @competition_by_slug_m
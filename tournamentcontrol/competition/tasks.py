@@ -5,15 +5,22 @@ from zoneinfo import ZoneInfo
 from celery import shared_task
 from dateutil.relativedelta import relativedelta
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
 from django.template.loader import render_to_string
-from django.urls import NoReverseMatch, reverse
+from django.urls import NoReverseMatch, reverse, set_urlconf
 from googleapiclient.errors import HttpError
 
+from touchtechnology.content.middleware import get_urlconf
+from tournamentcontrol.competition.calendars import (
+    get_calendar_artifacts,
+    render_calendar,
+)
 from tournamentcontrol.competition.models import (
     LiveStreamEvent,
     Match,
     Season,
     Stage,
+    Team,
 )
 from tournamentcontrol.competition.utils import (
     generate_fixture_grid,
@@ -570,3 +577,50 @@ def set_youtube_thumbnail(match_pk):
         videoId=obj.external_identifier,
         media_body=media_body,
     ).execute()
+
+
+@shared_task
+def render_calendars(match_ids=(), team_ids=(), keys=(), base_url=None):
+    """
+    Re-render the cached calendar feeds that include any of the given matches
+    or teams, along with the ``(season, scope, pk)`` keys listed explicitly.
+
+    Each feed is rendered again for every base URL it has been served from,
+    and for ``base_url`` when given; feeds that nobody has requested are not in
+    the cache and are skipped.
+    Run with the ``_schema_name`` of the tenant the feeds belong to, as
+    ``schedule_calendar_render`` does.
+    """
+    keys = {tuple(key) for key in keys}
+
+    team_ids = set(team_ids)
+    matches = Match._base_manager.filter(pk__in=match_ids).values_list(
+        "stage__division__season", "stage__division", "home_team", "away_team"
+    )
+    for season_id, division_id, home_team_id, away_team_id in matches:
+        keys.add((season_id, "season", season_id))
+        keys.add((season_id, "division", division_id))
+        team_ids.update((home_team_id, away_team_id))
+
+    teams = Team.objects.filter(pk__in=team_ids).values_list(
+        "pk", "division__season", "club"
+    )
+    for team_id, season_id, club_id in teams:
+        keys.add((season_id, "team", team_id))
+        if club_id is not None:
+            keys.add((season_id, "club", club_id))
+
+    if not keys:
+        return
+
+    # Match URLs are only resolvable through the sitemap's urlconf.
+    set_urlconf(get_urlconf(getattr(connection, "tenant", None)))
+    try:
+        for season_id, scope, pk in sorted(keys):
+            base_urls = set(get_calendar_artifacts(season_id, scope, pk))
+            if base_url is not None:
+                base_urls.add(base_url)
+            for url in sorted(base_urls):
+                render_calendar(season_id, scope, pk, url)
+    finally:
+        set_urlconf(None)
@@ -1,15 +1,21 @@
-from datetime import timedelta
+import collections
+from datetime import datetime, timedelta
 from itertools import zip_longest
 
 from dateutil.parser import parse
 from dateutil.rrule import DAILY, WEEKLY
 from django import template
 from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
 from django.db.models import Case, F, Q, Sum, When
 from django.template.loader import get_template
-from django.utils import timezone
+from django.utils import timezone, translation
+from django.utils.safestring import mark_safe
 from first import first
 
+from touchtechnology.common.utils import get_version_stamp
+
 register = template.Library()
 
 
@@ -30,23 +36,12 @@ def opponent(match, team):
         return None
 
 
-@register.inclusion_tag(
-    "tournamentcontrol/competition/next_date.html", takes_context=True
-)
-def next_date(context, season, offset=0, datestr=None):
-    from tournamentcontrol.competition.models import Match, Season
-
-    if isinstance(season, str):
-        season = Season.objects.get(pk=season)
-
-    # TODO make the offset a value stored on the competition
-    if datestr is None:
-        now = timezone.now() - timedelta(minutes=offset)
-    else:
-        now = parse(datestr) - timedelta(minutes=offset)
-
-    # drop any signifigance less than the minute
-    now = now.replace(second=0, microsecond=0)
+def upcoming_matches(season, now):
+    """
+    Return the matches ``next_date`` shows at ``now``, and the time of the
+    next timeslot when they could change.
+    """
+    from tournamentcontrol.competition.models import Match
 
     # start with just matches for this season (and by definition competition)
     matches = Match.objects.filter(
@@ -58,6 +53,7 @@ def next_date(context, season, offset=0, datestr=None):
         "home_team__division__season__competition",
         "away_team__division__season__competition",
         "stage__division__season__competition",
+        "stage_group",
     )
 
     # restrict to matches starting after "now"
@@ -91,37 +87,141 @@ def next_date(context, season, offset=0, datestr=None):
         # week and sorted by division.
         matches = matches.order_by("stage__division", *Match._meta.ordering)
 
-    context.update(
-        {
-            "matches": matches,
-            "next_game_date": next_game_date,
-            "next_round": next_round,
-            "competition": season.competition,
-            "season": season,
-        }
-    )
+    matches = list(matches)
 
-    return context
+    # The matches shown change as each timeslot of the day passes, and at
+    # midnight; results being entered are taken care of by invalidation.
+    boundaries = set(season.get_timeslots(now.date()))
+    boundaries.update(
+        match.time
+        for match in matches
+        if match.date == now.date() and match.time is not None
+    )
+    boundaries = [time for time in boundaries if time > now.time()]
+    if boundaries:
+        boundary = datetime.combine(now.date(), min(boundaries), tzinfo=now.tzinfo)
+    else:
+        boundary = datetime.combine(
+            now.date() + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo
+        )
+
+    data = {
+        "matches": matches,
+        "next_game_date": next_game_date,
+        "next_round": next_round,
+    }
+    return data, boundary
 
 
 @register.simple_tag(takes_context=True)
-def ladder(context, stage):
-    if stage.pools.count():
-        ordering = stage.ladder_summary.model._meta.ordering
-        summary = stage.ladder_summary.order_by("stage_group", *ordering)
-        template_name = "tournamentcontrol/competition/ladder/pool.html"
+def next_date(context, season, offset=0, datestr=None):
+    """
+    Render the matches of ``season`` starting next. The matches are cached
+    until the next timeslot or a change to the season's matches, and the
+    rendered fragment along with them.
+    """
+    from tournamentcontrol.competition.models import Season
+    from tournamentcontrol.competition.pagecache import tagged_key
+
+    if isinstance(season, str):
+        season = Season.objects.get(pk=season)
+
+    # TODO make the offset a value stored on the competition
+    if datestr is None:
+        now = timezone.now() - timedelta(minutes=offset)
     else:
-        summary = stage.ladder_summary.all()
-        template_name = "tournamentcontrol/competition/ladder/standard.html"
+        now = parse(datestr) - timedelta(minutes=offset)
+
+    # drop any signifigance less than the minute
+    now = now.replace(second=0, microsecond=0)
 
-    context.update(
-        {
-            "summary": summary,
-        }
+    # The matches are shared by every page of the season, the fragment
+    # also depends on the site it is linked to and the language.
+    data_key = tagged_key(
+        "next_date", [f"matches:{season.pk}"], season.pk, offset, datestr or ""
     )
+    html_key = tagged_key(
+        data_key,
+        [],
+        getattr(context.get("application"), "name", ""),
+        translation.get_language() or "",
+        timezone.get_current_timezone_name(),
+    )
+    cached = cache.get_many([data_key, html_key])
+    if html_key in cached:
+        return mark_safe(cached[html_key])
 
-    tpl = get_template(template_name)
-    return tpl.render(context)
+    if data_key in cached:
+        data, boundary = cached[data_key]
+    else:
+        data, boundary = upcoming_matches(season, now)
+    timeout = max(1, int((boundary - now).total_seconds()))
+
+    values = context.flatten()
+    values.update(data, competition=season.competition, season=season)
+    html = get_template("tournamentcontrol/competition/next_date.html").render(values)
+    cache.set_many({data_key: (data, boundary), html_key: html}, timeout)
+    return html
+
+
+@register.simple_tag(takes_context=True)
+def ladder(context, stage, template_name=None):
+    """
+    Render the ladder of ``stage``, by pool if it has any. The output is
+    cached until the ladder, or anything else it shows, changes.
+
+    Use the second argument to specify an alternative template file name.
+    """
+    from tournamentcontrol.competition.ladders import ladder_version_key
+    from tournamentcontrol.competition.models import Stage
+    from tournamentcontrol.competition.pagecache import (
+        PAGE_CACHE_TIMEOUT,
+        tagged_key,
+    )
+
+    tenant = getattr(connection, "tenant", None)
+    forloop = context.get("forloop") or {}
+    key = tagged_key(
+        "ladder",
+        [f"stage:{stage.pk}"],
+        stage.pk,
+        template_name or "",
+        get_version_stamp(ladder_version_key(stage.pk), tenant),
+        getattr(context.get("application"), "name", ""),
+        translation.get_language() or "",
+        # the templates link to and highlight these
+        *[
+            getattr(context.get(name), "slug", "")
+            for name in ("competition", "season", "division")
+        ],
+        getattr(context.get("team"), "pk", ""),
+        forloop.get("first"),
+        forloop.get("last"),
+    )
+    html = cache.get(key)
+    if html is not None:
+        return mark_safe(html)
+
+    stage = Stage.objects.with_ladder_data().get(pk=stage.pk)
+    if stage.pool_count:
+        pools = collections.OrderedDict(
+            (pool, list(pool.ladder_summary.all())) for pool in stage.pools.all()
+        )
+        summary = [each for ladder in pools.values() for each in ladder]
+        template_name = (
+            template_name or "tournamentcontrol/competition/ladder/pool.html"
+        )
+    else:
+        pools = summary = list(stage.ladder_summary.all())
+        template_name = (
+            template_name or "tournamentcontrol/competition/ladder/standard.html"
+        )
+
+    values = context.flatten()
+    values.update(stage=stage, pools=pools, summary=summary)
+    html = get_template(template_name).render(values)
+    cache.set(key, html, timeout=PAGE_CACHE_TIMEOUT)
+    return html
 
 
 @register.simple_tag
@@ -262,3 +362,39 @@ def preview(match):
     }
 
     return context
+
+
+class PageCacheNode(template.Node):
+    def __init__(self, nodelist, fragment):
+        self.nodelist = nodelist
+        self.fragment = fragment
+
+    def render(self, context):
+        from tournamentcontrol.competition.pagecache import cached_page_data
+
+        key = context.get("page_cache_key")
+        if not key:
+            return self.nodelist.render(context)
+        fragment = self.fragment.resolve(context)
+        return cached_page_data(
+            f"{key}:{fragment}", lambda: self.nodelist.render(context)
+        )
+
+
+@register.tag
+def pagecache(parser, token):
+    """
+    Cache the enclosed fragment of a page under the ``page_cache_key`` the
+    view provided, until anything it depends on changes. Without a
+    ``page_cache_key`` the fragment is rendered as usual.
+
+        {% pagecache "fixtures" %}
+            ...
+        {% endpagecache %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"{bits[0]!r} takes a fragment name.")
+    nodelist = parser.parse(("endpagecache",))
+    parser.delete_first_token()
+    return PageCacheNode(nodelist, parser.compile_filter(bits[1]))
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from tournamentcontrol.competition.calc import (
+    BonusPointCalculator,
+    Calculator,
+    clear_formula_cache,
+    compile_bonus_points_formula,
+    compile_points_formula,
+)
+from tournamentcontrol.competition.models import LadderEntry
+
+POINTS_FORMULAS = (
+    "3*win + 2*draw + 1*loss",
+    "4*win + 2*draw + 2*bye - 2*forfeit_against",
+    "(win + draw) * 2 - loss / 2",
+    "score_for - score_against",
+    "10",
+)
+
+BONUS_POINTS_FORMULAS = (
+    "[win=1, score_against=0, forfeit_for=0: 1] + [loss=1, margin<=2: 1]",
+    "[score_for>=4: 1] + [loss=1, score_against<=7: 1]",
+    "[draw=1: 2]",
+)
+
+ENTRIES = (
+    dict(played=1, win=1, score_for=5, score_against=0),
+    dict(played=1, loss=1, score_for=3, score_against=5),
+    dict(played=1, draw=1, score_for=2, score_against=2),
+    dict(played=0, bye=1),
+    dict(played=1, forfeit_against=1, loss=1),
+)
+
+
+class FormulaCompilationTests(SimpleTestCase):
+    def test_points_formula(self):
+        for formula in POINTS_FORMULAS:
+            evaluate = compile_points_formula(formula)
+            for kwargs in ENTRIES:
+                with self.subTest(formula=formula, **kwargs):
+                    entry = LadderEntry(**kwargs)
+                    calculator = Calculator(entry)
+                    calculator.parse(formula)
+                    self.assertEqual(calculator.evaluate(), evaluate(entry))
+
+    def test_bonus_points_formula(self):
+        for formula in BONUS_POINTS_FORMULAS:
+            evaluate = compile_bonus_points_formula(formula)
+            for kwargs in ENTRIES:
+                with self.subTest(formula=formula, **kwargs):
+                    entry = LadderEntry(**kwargs)
+                    calculator = BonusPointCalculator(entry)
+                    calculator.parse(formula)
+                    self.assertEqual(calculator.evaluate(), evaluate(entry))
+
+    def test_empty_bonus_points_formula(self):
+        self.assertIsNone(compile_bonus_points_formula("  ")(LadderEntry()))
+
+    def test_compiled_once(self):
+        clear_formula_cache()
+        evaluate = compile_points_formula("3*win")
+        self.assertIs(evaluate, compile_points_formula("3*win"))
+        self.assertEqual(Decimal(6), evaluate(LadderEntry(win=2)))
+
+        clear_formula_cache()
+        self.assertIsNot(evaluate, compile_points_formula("3*win"))
@@ -0,0 +1,227 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from test_plus import TestCase
+
+from tournamentcontrol.competition.calendars import (
+    calendar_cache_key,
+    get_calendar_artifact,
+    render_calendar,
+)
+from tournamentcontrol.competition.forms import ProgressTeamsForm
+from tournamentcontrol.competition.models import Match
+from tournamentcontrol.competition.tests import factories
+
+
+@override_settings(ROOT_URLCONF="tournamentcontrol.competition.tests.urls")
+class CalendarArtifactTests(TestCase):
+    """Pre-rendered calendar feeds are served from the cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Nothing has been requested yet, so there is nothing to render.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.stage = factories.StageFactory.create()
+            cls.division = cls.stage.division
+            cls.season = cls.division.season
+            cls.team = factories.TeamFactory.create(division=cls.division)
+            cls.opponent = factories.TeamFactory.create(division=cls.division)
+            cls.match = factories.MatchFactory.create(
+                stage=cls.stage, home_team=cls.team, away_team=cls.opponent
+            )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_calendar(self, **kwargs):
+        return self.get(
+            "competition:calendar",
+            competition=self.season.competition.slug,
+            season=self.season.slug,
+            division=self.division.slug,
+            team=self.team.slug,
+            **kwargs,
+        )
+
+    def team_key(self, team=None):
+        return calendar_cache_key(self.season.pk, "team", (team or self.team).pk)
+
+    def artifact(self, team=None, base_url="http://testserver/"):
+        return get_calendar_artifact(
+            self.season.pk, "team", (team or self.team).pk, base_url
+        )
+
+    def test_rendered_after_first_request(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_calendar()
+        content = response.getvalue()
+
+        artifact = self.artifact()
+        self.assertEqual(content, artifact["content"])
+        self.assertEqual(response["ETag"], f'"{artifact["etag"]}"')
+
+        # Served straight from the cache; only the slugs are resolved.
+        with self.assertNumQueries(1):
+            response = self.get_calendar()
+        self.response_200(response)
+        self.assertEqual(content, response.content)
+
+        self.get_calendar(extra={"HTTP_IF_NONE_MATCH": response["ETag"]})
+        self.assertEqual(self.last_response.status_code, 304)
+
+    def test_rendered_when_match_saved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+        etag = self.artifact()["etag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.opponent.title = "Renamed Opponent"
+            self.opponent.save()
+            self.match.save()
+
+        artifact = self.artifact()
+        self.assertNotEqual(etag, artifact["etag"])
+        self.assertIn(b"Renamed Opponent", artifact["content"])
+
+    def test_rendered_when_team_removed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+        self.assertIn(b"BEGIN:VEVENT", self.artifact()["content"])
+
+        other = factories.TeamFactory.create(division=self.division)
+        match = Match.objects.get(pk=self.match.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            match.home_team = other
+            match.save()
+
+        self.assertNotIn(b"BEGIN:VEVENT", self.artifact()["content"])
+        # Feeds that have never been requested are not rendered.
+        self.assertIsNone(self.artifact(other))
+
+    def test_rendered_when_match_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.match.delete()
+
+        self.assertNotIn(b"BEGIN:VEVENT", self.artifact()["content"])
+
+    def test_rendered_for_each_base_url(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar(extra={"secure": True})
+        self.assertIn(
+            b"https://testserver/",
+            self.artifact(base_url="https://testserver/")["content"],
+        )
+
+        # Each is served from the cache without queueing another render.
+        path = "tournamentcontrol.competition.calendars.schedule_calendar_render"
+        with mock.patch(path) as schedule:
+            self.get_calendar()
+            self.get_calendar(extra={"secure": True})
+        schedule.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.opponent.title = "Renamed Opponent"
+            self.opponent.save()
+
+        for base_url in ("http://testserver/", "https://testserver/"):
+            self.assertIn(
+                b"Renamed Opponent", self.artifact(base_url=base_url)["content"]
+            )
+
+    def test_superuser_not_served_from_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+
+        draft = factories.DivisionFactory.create(season=self.season, draft=True)
+        factories.MatchFactory.create(
+            stage__division=draft, home_team=self.team, away_team=self.opponent
+        )
+        with self.login(factories.SuperUserFactory.create()):
+            response = self.get_calendar()
+        self.assertEqual(response.getvalue().count(b"BEGIN:VEVENT"), 2)
+
+    def test_rendered_when_team_renamed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.opponent.title = "Renamed Opponent"
+            self.opponent.save()
+
+        self.assertIn(b"Renamed Opponent", self.artifact()["content"])
+
+    def test_rendered_when_stage_renamed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stage.title = "Renamed Stage"
+            self.stage.save()
+
+        self.assertIn(b"Renamed Stage", self.artifact()["content"])
+
+    def test_rendered_when_division_drafted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.division.draft = True
+            self.division.save()
+
+        self.assertNotIn(b"BEGIN:VEVENT", self.artifact()["content"])
+
+    def test_rendered_when_teams_progressed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            undecided = factories.UndecidedTeamFactory.create(
+                stage=self.stage, label="Finalist"
+            )
+            factories.MatchFactory.create(
+                stage=self.stage,
+                home_team=None,
+                home_team_undecided=undecided,
+                away_team=self.opponent,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+        self.assertEqual(self.artifact()["content"].count(b"BEGIN:VEVENT"), 1)
+
+        form = ProgressTeamsForm(
+            instance=undecided, data={"id": undecided.pk, "team": self.team.pk}
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save()
+
+        self.assertEqual(self.artifact()["content"].count(b"BEGIN:VEVENT"), 2)
+
+    def test_render_queued_once(self):
+        path = "tournamentcontrol.competition.calendars.schedule_calendar_render"
+        with mock.patch(path) as schedule:
+            self.get_calendar()
+            self.get_calendar()
+        schedule.assert_called_once()
+
+        # Once rendered, a feed can be queued again.
+        render_calendar(self.season.pk, "team", self.team.pk, "http://testserver/")
+        cache.delete(self.team_key())
+        with mock.patch(path) as schedule:
+            self.get_calendar()
+        schedule.assert_called_once()
+
+    def test_sharded_by_tenant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_calendar()
+        self.assertIsNotNone(self.artifact())
+
+        tenant = SimpleNamespace(schema_name="other")
+        with mock.patch.object(connection, "tenant", tenant, create=True):
+            self.assertIsNone(self.artifact())
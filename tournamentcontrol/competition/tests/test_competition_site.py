@@ -2,7 +2,12 @@ import unittest
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+from dateutil.rrule import DAILY
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 from icalendar import Calendar
 from test_plus import TestCase
@@ -10,6 +15,9 @@ from test_plus import TestCase
 from touchtechnology.common.tests.factories import UserFactory
 from tournamentcontrol.competition.draw import schemas
 from tournamentcontrol.competition.draw.builders import build
+from tournamentcontrol.competition.forms import ProgressTeamsForm
+from tournamentcontrol.competition.models import Stage, Team
+from tournamentcontrol.competition.pagecache import invalidate_matches, tagged_key
 from tournamentcontrol.competition.tests import factories
 from tournamentcontrol.competition.utils import round_robin_format
 
@@ -283,9 +291,10 @@ class FrontEndTests(TestCase):
             team.division.slug,
             team.slug,
         )
+        content = self.last_response.getvalue().decode()
         for opponent in team.division.teams.exclude(pk=team.pk):
             subject = "{} vs {}".format(team.title, opponent.title)
-            self.assertResponseContains(subject, html=False)
+            self.assertIn(subject, content)
 
     @unittest.expectedFailure
     def test_team_calendar_disabled(self):
@@ -313,9 +322,10 @@ class FrontEndTests(TestCase):
             team.division.season.slug,
             team.division.slug,
         )
+        content = self.last_response.getvalue().decode()
         for opponent in team.division.teams.exclude(pk=team.pk):
             subject = "{} vs {}".format(team.title, opponent.title)
-            self.assertResponseContains(subject, html=False)
+            self.assertIn(subject, content)
 
     @unittest.expectedFailure
     def test_division_calendar_disabled(self):
@@ -341,9 +351,10 @@ class FrontEndTests(TestCase):
             team.division.season.competition.slug,
             team.division.season.slug,
         )
+        content = self.last_response.getvalue().decode()
         for opponent in team.division.teams.exclude(pk=team.pk):
             subject = "{} vs {}".format(team.title, opponent.title)
-            self.assertResponseContains(subject, html=False)
+            self.assertIn(subject, content)
 
     @unittest.expectedFailure
     def test_season_calendar_disabled(self):
@@ -381,7 +392,7 @@ class CalendarQueryTests(TestCase):
         )
 
     def test_team_calendar_query_count(self):
-        # Middleware redirect check (1) + slug resolution (1) + match query (1)
+        # Slug resolution (1) + validator (1) + match query (1)
         with self.assertNumQueries(3):
             response = self.get(
                 "competition:calendar",
@@ -390,10 +401,11 @@ class CalendarQueryTests(TestCase):
                 division=self.division.slug,
                 team=self.team_a.slug,
             )
+            response.getvalue()
         self.response_200(response)
 
     def test_division_calendar_query_count(self):
-        # Middleware redirect check (1) + slug resolution (1) + match query (1)
+        # Slug resolution (1) + validator (1) + match query (1)
         with self.assertNumQueries(3):
             response = self.get(
                 "competition:calendar",
@@ -401,24 +413,26 @@ class CalendarQueryTests(TestCase):
                 season=self.season.slug,
                 division=self.division.slug,
             )
+            response.getvalue()
         self.response_200(response)
 
     def test_season_calendar_query_count(self):
-        # Middleware redirect check (1) + slug resolution (1) + match query (1)
+        # Slug resolution (1) + validator (1) + match query (1)
         with self.assertNumQueries(3):
             response = self.get(
                 "competition:calendar",
                 competition=self.competition.slug,
                 season=self.season.slug,
             )
+            response.getvalue()
         self.response_200(response)
 
     def test_club_calendar_query_count(self):
         club = factories.ClubFactory.create()
         self.team_a.club = club
         self.team_a.save()
-        # Middleware (3) + season resolution (1) + club resolution (1)
-        # + match query (1)
+        # Middleware (2) + season resolution (1) + club resolution (1)
+        # + validator (1) + match query (1)
         with self.assertNumQueries(6):
             response = self.get(
                 "competition:calendar",
@@ -426,10 +440,11 @@ class CalendarQueryTests(TestCase):
                 season=self.season.slug,
                 club=club.slug,
             )
+            response.getvalue()
         self.response_200(response)
 
     def _parse_events(self, response):
-        cal = Calendar.from_ical(response.content)
+        cal = Calendar.from_ical(response.getvalue())
         return cal, [c for c in cal.walk() if c.name == "VEVENT"]
 
     @freeze_time("2025-06-01 10:00:00")
@@ -477,9 +492,7 @@ class CalendarQueryTests(TestCase):
             "{} ({})".format(self.division.title, self.stage.title),
         )
         self.assertEqual(event["dtstart"].dt, match_dt)
-        self.assertEqual(
-            event["dtend"].dt, match_dt + timedelta(minutes=45)
-        )
+        self.assertEqual(event["dtend"].dt, match_dt + timedelta(minutes=45))
         self.assertEqual(
             event["dtstamp"].dt,
             datetime(2025, 6, 1, 10, 0, 0, tzinfo=ZoneInfo("UTC")),
@@ -510,21 +523,15 @@ class CalendarQueryTests(TestCase):
         self.assertEqual(len(events), 10)
 
         uids = {e["uid"] for e in events}
-        expected_uids = set(
-            self.division.matches.values_list("uuid", flat=True)
-        )
-        self.assertCountEqual(
-            uids, {u.hex for u in expected_uids}
-        )
+        expected_uids = set(self.division.matches.values_list("uuid", flat=True))
+        self.assertCountEqual(uids, {u.hex for u in expected_uids})
 
     def test_disabled_calendar_returns_410(self):
         season = factories.SeasonFactory.create(disable_calendar=True)
         division = factories.DivisionFactory.create(season=season)
         team = factories.TeamFactory.create(division=division)
         stage = factories.StageFactory.create(division=division)
-        factories.MatchFactory.create_batch(
-            stage=stage, home_team=team, size=3
-        )
+        factories.MatchFactory.create_batch(stage=stage, home_team=team, size=3)
         self.get(
             "competition:calendar",
             competition=season.competition.slug,
@@ -539,9 +546,7 @@ class CalendarQueryTests(TestCase):
             season=self.season, draft=True
         )
         draft_stage = factories.StageFactory.create(division=draft_division)
-        factories.MatchFactory.create_batch(
-            stage=draft_stage, size=3
-        )
+        factories.MatchFactory.create_batch(stage=draft_stage, size=3)
         response = self.get(
             "competition:calendar",
             competition=self.competition.slug,
@@ -559,9 +564,7 @@ class CalendarQueryTests(TestCase):
             season=self.season, draft=True
         )
         draft_stage = factories.StageFactory.create(division=draft_division)
-        factories.MatchFactory.create_batch(
-            stage=draft_stage, size=3
-        )
+        factories.MatchFactory.create_batch(stage=draft_stage, size=3)
         with self.login(superuser):
             response = self.get(
                 "competition:calendar",
@@ -620,12 +623,8 @@ class CalendarQueryTests(TestCase):
         self.assertEqual(len(events), 10)
 
         uids = {e["uid"] for e in events}
-        expected_uids = set(
-            self.season.matches.values_list("uuid", flat=True)
-        )
-        self.assertCountEqual(
-            uids, {u.hex for u in expected_uids}
-        )
+        expected_uids = set(self.season.matches.values_list("uuid", flat=True))
+        self.assertCountEqual(uids, {u.hex for u in expected_uids})
 
     def test_calendar_with_bye_match(self):
         """Bye matches with a datetime should appear in the calendar."""
@@ -721,6 +720,124 @@ class CalendarQueryTests(TestCase):
         event = next(e for e in events if e["uid"] == match.uuid.hex)
         self.assertEqual(str(event["summary"]), "TBD")
 
+    def test_calendar_not_modified(self):
+        kwargs = dict(
+            competition=self.competition.slug,
+            season=self.season.slug,
+            division=self.division.slug,
+        )
+        response = self.get("competition:calendar", **kwargs)
+        self.response_200(response)
+        self.assertEqual(response.getvalue().count(b"BEGIN:VEVENT"), 10)
+
+        # Only the validator is computed when nothing has changed.
+        with self.assertNumQueries(2):
+            self.get(
+                "competition:calendar",
+                extra={"HTTP_IF_NONE_MATCH": response["ETag"]},
+                **kwargs,
+            )
+        self.assertEqual(self.last_response.status_code, 304)
+
+        self.get(
+            "competition:calendar",
+            extra={"HTTP_IF_MODIFIED_SINCE": response["Last-Modified"]},
+            **kwargs,
+        )
+        self.assertEqual(self.last_response.status_code, 304)
+
+    def test_calendar_modified(self):
+        kwargs = dict(
+            competition=self.competition.slug,
+            season=self.season.slug,
+            division=self.division.slug,
+        )
+        etag = self.get("competition:calendar", **kwargs)["ETag"]
+
+        match = self.stage.matches.first()
+        match.datetime += timedelta(hours=1)
+        match.save()
+
+        self.get("competition:calendar", extra={"HTTP_IF_NONE_MATCH": etag}, **kwargs)
+        self.response_200()
+        self.assertNotEqual(etag, self.last_response["ETag"])
+
+    def test_calendar_modified_by_team_rename(self):
+        kwargs = dict(
+            competition=self.competition.slug,
+            season=self.season.slug,
+            division=self.division.slug,
+        )
+        etag = self.get("competition:calendar", **kwargs)["ETag"]
+
+        self.team_a.title = "Renamed Team"
+        self.team_a.save()
+
+        self.get("competition:calendar", extra={"HTTP_IF_NONE_MATCH": etag}, **kwargs)
+        self.response_200()
+        self.assertIn(b"Renamed Team", self.last_response.getvalue())
+
+    def test_calendar_modified_by_stage_rename(self):
+        kwargs = dict(
+            competition=self.competition.slug,
+            season=self.season.slug,
+            division=self.division.slug,
+        )
+        etag = self.get("competition:calendar", **kwargs)["ETag"]
+
+        self.stage.title = "Renamed Stage"
+        self.stage.save()
+
+        self.get("competition:calendar", extra={"HTTP_IF_NONE_MATCH": etag}, **kwargs)
+        self.response_200()
+        self.assertIn(b"Renamed Stage", self.last_response.getvalue())
+
+    def test_calendar_modified_by_division_rename(self):
+        etag = self.get(
+            "competition:calendar",
+            competition=self.competition.slug,
+            season=self.season.slug,
+        )["ETag"]
+
+        self.division.title = "Renamed Division"
+        self.division.save()
+
+        self.get(
+            "competition:calendar",
+            competition=self.competition.slug,
+            season=self.season.slug,
+            extra={"HTTP_IF_NONE_MATCH": etag},
+        )
+        self.response_200()
+        self.assertIn(b"Renamed Division", self.last_response.getvalue())
+
+    def test_calendar_modified_by_progression(self):
+        kwargs = dict(
+            competition=self.competition.slug,
+            season=self.season.slug,
+            division=self.division.slug,
+        )
+        undecided = factories.UndecidedTeamFactory.create(
+            stage=self.stage, label="Finalist"
+        )
+        factories.MatchFactory.create(
+            stage=self.stage,
+            home_team=None,
+            home_team_undecided=undecided,
+            away_team=self.team_b,
+        )
+        etag = self.get("competition:calendar", **kwargs)["ETag"]
+
+        form = ProgressTeamsForm(
+            instance=undecided, data={"id": undecided.pk, "team": self.team_a.pk}
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        self.get("competition:calendar", extra={"HTTP_IF_NONE_MATCH": etag}, **kwargs)
+        self.response_200()
+        self.assertNotIn(b"Finalist", self.last_response.getvalue())
+
 
 @override_settings(ROOT_URLCONF="tournamentcontrol.competition.tests.urls")
 class DivisionViewQueryTests(TestCase):
@@ -774,9 +891,7 @@ class DivisionViewQueryTests(TestCase):
                 teams=["Alpha", "Beta", "Gamma", "Delta"],
                 draw_formats={"rr4": round_robin_format(4)},
                 stages=[
-                    schemas.StageFixture(
-                        title="Round Robin", draw_format_ref="rr4"
-                    ),
+                    schemas.StageFixture(title="Round Robin", draw_format_ref="rr4"),
                 ],
             )
         )
@@ -790,9 +905,7 @@ class DivisionViewQueryTests(TestCase):
                 teams=[f"Team {i}" for i in range(1, 9)],
                 draw_formats={"rr8": round_robin_format(8)},
                 stages=[
-                    schemas.StageFixture(
-                        title=f"Stage {i}", draw_format_ref="rr8"
-                    )
+                    schemas.StageFixture(title=f"Stage {i}", draw_format_ref="rr8")
                     for i in range(1, 4)
                 ],
             )
@@ -817,6 +930,388 @@ class DivisionViewQueryTests(TestCase):
         )
 
 
+class TeamLaddersTests(TestCase):
+    """
+    ``Stage.objects.team_ladders`` loads the ladders of every team
+    together, rather than once per stage and pool.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.club = factories.ClubFactory.create()
+        cls.division = factories.DivisionFactory.create()
+        cls.season = cls.division.season
+        cls.teams = factories.TeamFactory.create_batch(
+            4, division=cls.division, club=cls.club
+        )
+        cls.stage = factories.StageFactory.create(division=cls.division)
+        cls.pool_stage = factories.StageFactory.create(division=cls.division)
+        cls.pools = factories.StageGroupFactory.create_batch(2, stage=cls.pool_stage)
+        t1, t2, t3, t4 = cls.teams
+        for home, away in ((t1, t2), (t3, t4)):
+            factories.MatchFactory.create(
+                stage=cls.stage,
+                home_team=home,
+                away_team=away,
+                home_team_score=5,
+                away_team_score=3,
+            )
+        for team, pool in zip(cls.teams, cls.pools * 2):
+            team.stage_group = pool
+            team.save()
+        for pool, home, away in ((cls.pools[0], t1, t3), (cls.pools[1], t2, t4)):
+            factories.MatchFactory.create(
+                stage=cls.pool_stage,
+                stage_group=pool,
+                home_team=home,
+                away_team=away,
+                home_team_score=5,
+                away_team_score=3,
+            )
+
+    def test_team_ladders(self):
+        team = self.teams[0]
+        with self.assertNumQueries(4):
+            ladders = team.ladders()
+        self.assertEqual(list(ladders), [self.stage, self.pool_stage])
+        self.assertCountEqual(
+            [ladder.team for ladder in ladders[self.stage]], self.teams
+        )
+        self.assertEqual(list(ladders[self.pool_stage]), [self.pools[0]])
+        self.assertCountEqual(
+            [ladder.team for ladder in ladders[self.pool_stage][self.pools[0]]],
+            [self.teams[0], self.teams[2]],
+        )
+        # The ladder templates show the bonus points column per division.
+        with self.assertNumQueries(0):
+            for stage in ladders:
+                stage.division.bonus_points_formula
+
+    def test_many_team_ladders(self):
+        with self.assertNumQueries(4):
+            ladders = Stage.objects.team_ladders(self.teams)
+        self.assertEqual(list(ladders), self.teams)
+        for team in self.teams:
+            self.assertEqual(ladders[team], team.ladders())
+
+
+@freeze_time("2025-06-01 10:00:00")
+class NextAndLastMatchTests(TestCase):
+    """
+    ``Team.objects.with_next_and_last_match`` gives the same matches as
+    ``Team.next_match`` and ``Team.last_match`` for any number of teams.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.club = factories.ClubFactory.create()
+        cls.stage = factories.StageFactory.create()
+        cls.teams = factories.TeamFactory.create_batch(
+            3, club=cls.club, division=cls.stage.division
+        )
+        opponent = factories.TeamFactory.create(division=cls.stage.division)
+        for team in cls.teams:
+            for date, time in (
+                ("2025-05-25", "09:00"),
+                ("2025-06-01", "09:00"),
+                ("2025-06-01", "12:00"),
+                ("2025-06-08", "09:00"),
+            ):
+                factories.MatchFactory.create(
+                    stage=cls.stage,
+                    home_team=team,
+                    away_team=opponent,
+                    date=date,
+                    time=time,
+                    datetime=f"{date}T{time}Z",
+                )
+        # A team with no matches at all.
+        factories.TeamFactory.create(club=cls.club, division=cls.stage.division)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_teams(self):
+        return Team.objects.filter(club=self.club).with_next_and_last_match()
+
+    def test_same_as_team(self):
+        for team in self.get_teams():
+            fresh = Team.objects.get(pk=team.pk)
+            self.assertEqual(team.next_match(), fresh.next_match())
+            self.assertEqual(team.last_match(), fresh.last_match())
+            if team.next_match() is not None:
+                self.assertTrue(team.next_match().next)
+                self.assertEqual(team.next_match().time.hour, 12)
+                self.assertEqual(team.last_match().time.hour, 9)
+
+    def test_query_count(self):
+        with self.assertNumQueries(3):
+            teams = list(self.get_teams())
+        with self.assertNumQueries(0):
+            for team in teams:
+                team.next_match()
+                team.last_match()
+
+        # Cached until something changes.
+        with self.assertNumQueries(1):
+            list(self.get_teams())
+
+    def test_iterator(self):
+        teams = list(self.get_teams().iterator(chunk_size=2))
+        self.assertEqual(4, len(teams))
+        with self.assertNumQueries(0):
+            for team in teams:
+                team.next_match()
+                team.last_match()
+        self.assertEqual(
+            Team.objects.get(pk=teams[0].pk).next_match(), teams[0].next_match()
+        )
+
+    def test_values(self):
+        pks = sorted(team.pk for team in self.teams)
+        teams = self.get_teams().filter(pk__in=pks).order_by("pk")
+        self.assertEqual(pks, list(teams.values_list("pk", flat=True)))
+        self.assertEqual(pks, [row["pk"] for row in teams.values("pk")])
+        with self.assertRaises(TypeError):
+            Team.objects.values("pk").with_next_and_last_match()
+
+    def test_invalidated(self):
+        team = self.get_teams()[0]
+        match = team.next_match()
+        match.date = match.datetime = None
+        match.time = None
+        match.save()
+
+        team = self.get_teams()[0]
+        self.assertNotEqual(team.next_match(), match)
+        self.assertEqual(team.next_match().date.isoformat(), "2025-06-08")
+
+
+@override_settings(ROOT_URLCONF="tournamentcontrol.competition.tests.urls")
+class NextDateTests(TestCase):
+    """
+    The ``next_date`` upcoming matches on the season page are cached until
+    the next timeslot, or until a result is entered.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stage = factories.StageFactory.create(
+            division__season__mode=DAILY, division__season__timezone="UTC"
+        )
+        cls.season = cls.stage.division.season
+        cls.early, __ = [
+            factories.MatchFactory.create(
+                stage=cls.stage,
+                date="2013-11-22",
+                time=time,
+                datetime=f"2013-11-22T{time}Z",
+            )
+            for time in ("09:00", "10:00")
+        ]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.get_check_200(
+                "competition:season", self.season.competition.slug, self.season.slug
+            ).content.decode()
+        return content, len(queries)
+
+    def assertShowsRound(self, content, time):
+        for each in ("9 a.m.", "10 a.m."):
+            with self.subTest(time=each):
+                shown = f'<td class="time">{each}</td>' in content
+                self.assertEqual(shown, each == time)
+
+    def test_cached_until_next_timeslot(self):
+        with freeze_time("2013-11-22 08:00") as frozen:
+            content, uncached = self.get_page()
+            self.assertShowsRound(content, "9 a.m.")
+            content, cached = self.get_page()
+            self.assertLess(cached, uncached)
+
+            # Offset by 15 minutes, so still the first round at 09:10
+            frozen.move_to("2013-11-22 09:10")
+            content, __ = self.get_page()
+            self.assertShowsRound(content, "9 a.m.")
+
+            frozen.move_to("2013-11-22 09:20")
+            content, __ = self.get_page()
+            self.assertShowsRound(content, "10 a.m.")
+
+    @freeze_time("2013-11-22 08:00")
+    def test_result_entered(self):
+        content, __ = self.get_page()
+        self.assertShowsRound(content, "9 a.m.")
+
+        self.early.home_team_score = 5
+        self.early.away_team_score = 3
+        self.early.save()
+
+        content, __ = self.get_page()
+        self.assertShowsRound(content, "10 a.m.")
+
+
+@override_settings(ROOT_URLCONF="tournamentcontrol.competition.tests.urls")
+class LadderTagTests(TestCase):
+    """
+    The ``{% ladder %}`` output is cached until the ladder of its stage
+    changes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stage = factories.StageFactory.create()
+        cls.home = factories.TeamFactory.create(division=cls.stage.division)
+        cls.away = factories.TeamFactory.create(division=cls.stage.division)
+        cls.match = factories.MatchFactory.create(
+            stage=cls.stage, home_team=cls.home, away_team=cls.away
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def render(self, stage):
+        template = Template("{% load competition %}{% ladder stage %}")
+        with CaptureQueriesContext(connection) as queries:
+            content = template.render(Context({"stage": stage}))
+        return content, len(queries)
+
+    def test_cached_until_result(self):
+        content, uncached = self.render(self.stage)
+        self.assertGreater(uncached, 0)
+        self.assertNotIn("<td>17</td>", content)
+        self.assertEqual(self.render(self.stage), (content, 0))
+
+        self.match.home_team_score = 17
+        self.match.away_team_score = 3
+        self.match.save()
+
+        content, __ = self.render(self.stage)
+        self.assertIn("<td>17</td>", content)
+        self.assertIn(self.home.title, content)
+
+    def test_pools(self):
+        pool = factories.StageGroupFactory.create(stage=self.stage)
+        self.home.stage_group = pool
+        self.home.save()
+        self.match.home_team_score = 17
+        self.match.away_team_score = 3
+        self.match.save()
+
+        content, __ = self.render(self.stage)
+        self.assertIn(pool.title, content)
+        self.assertIn("<td>17</td>", content)
+        self.assertEqual(self.render(self.stage), (content, 0))
+
+
+@override_settings(ROOT_URLCONF="tournamentcontrol.competition.tests.urls")
+class PageCacheTests(TestCase):
+    """
+    The ladders, fixtures and statistics of the division, stage and team
+    pages are cached until something they show is saved.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stage = factories.StageFactory.create()
+        cls.division = cls.stage.division
+        cls.season = cls.division.season
+        cls.competition = cls.season.competition
+        cls.home = factories.TeamFactory.create(division=cls.division)
+        cls.away = factories.TeamFactory.create(division=cls.division)
+        cls.match = factories.MatchFactory.create(
+            stage=cls.stage, home_team=cls.home, away_team=cls.away
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_page(self, name, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            content = self.get_check_200(
+                name,
+                competition=self.competition.slug,
+                season=self.season.slug,
+                division=self.division.slug,
+                **kwargs,
+            ).content.decode()
+        return content, len(queries)
+
+    def test_division(self):
+        __, uncached = self.get_page("competition:division")
+        content, cached = self.get_page("competition:division")
+        self.assertLess(cached, uncached)
+        score = '<td class="score center">17</td>'
+        self.assertNotIn(score, content)
+
+        self.match.home_team_score = 17
+        self.match.away_team_score = 3
+        self.match.save()
+
+        content, __ = self.get_page("competition:division")
+        self.assertIn(score, content)
+
+    def test_stage(self):
+        self.get_page("competition:stage", stage=self.stage.slug)
+        self.home.title = "Renamed Home"
+        self.home.save()
+        content, __ = self.get_page("competition:stage", stage=self.stage.slug)
+        self.assertIn("Renamed Home", content)
+
+    def test_team(self):
+        other = factories.MatchFactory.create(
+            stage=self.stage, home_team=self.away, away_team=self.home
+        )
+        __, uncached = self.get_page("competition:team", team=self.home.slug)
+        content, cached = self.get_page("competition:team", team=self.home.slug)
+        self.assertLess(cached, uncached)
+        self.assertEqual(content.count('<td class="date">'), 2)
+
+        other.delete()
+        content, __ = self.get_page("competition:team", team=self.home.slug)
+        self.assertEqual(content.count('<td class="date">'), 1)
+
+    def test_invalidate_matches(self):
+        self.get_page("competition:division")
+        # Bulk writes send no signals, so invalidate the pages explicitly.
+        type(self.match)._base_manager.filter(pk=self.match.pk).update(
+            label="Grand Final"
+        )
+        invalidate_matches([self.match.pk])
+        content, __ = self.get_page("competition:division")
+        self.assertIn("Grand Final", content)
+
+    def test_place_renamed(self):
+        ground = factories.GroundFactory.create(venue__season=self.season)
+        self.match.play_at = ground
+        self.match.save()
+        content, __ = self.get_page("competition:division")
+        self.assertIn(ground.title, content)
+
+        ground.title = "Renamed Ground"
+        ground.save()
+        content, __ = self.get_page("competition:division")
+        self.assertIn("Renamed Ground", content)
+
+    def test_pool_renamed(self):
+        pool = factories.StageGroupFactory.create(stage=self.stage)
+        tags = [f"matches:{self.season.pk}"]
+        key = tagged_key("test", tags)
+
+        # Matches across the season are shown with the title of their pool.
+        pool.title = "Renamed Pool"
+        pool.save()
+        self.assertNotEqual(key, tagged_key("test", tags))
+
+
 @override_settings(ROOT_URLCONF="tournamentcontrol.competition.tests.urls")
 class MatchDetailViewQueryTests(TestCase):
     """
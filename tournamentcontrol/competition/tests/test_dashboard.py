@@ -1,6 +1,8 @@
 import datetime
+from io import StringIO
 from zoneinfo import ZoneInfo
 
+from django.core.management import call_command
 from django.utils import timezone
 from freezegun import freeze_time
 from test_plus import TestCase
@@ -12,9 +14,16 @@ from tournamentcontrol.competition.dashboard import (
     matches_require_progression,
     stages_require_progression,
 )
+from tournamentcontrol.competition.models import LadderSummary, Match, Team
+from tournamentcontrol.competition.progression import (
+    ProgressionResolver,
+    progress_season,
+)
 from tournamentcontrol.competition.tests.factories import (
     MatchFactory,
+    SuperUserFactory,
     StageFactory,
+    StageGroupFactory,
     TeamFactory,
 )
 
@@ -152,3 +161,167 @@ class RequireProgression(TestCase):
         m3.save()
 
         self.assertProgression("before final", [], [], [], {})
+
+
+class ProgressionResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pools = StageFactory.create(order=1)
+        cls.division = cls.pools.division
+        cls.finals = StageFactory.create(division=cls.division, order=2)
+        cls.teams = []
+        for pool, points_table in zip(
+            StageGroupFactory.create_batch(2, stage=cls.pools), ((6, 4, 2), (5, 3, 1))
+        ):
+            for points in points_table:
+                team = TeamFactory.create(division=cls.division, stage_group=pool)
+                LadderSummary.objects.create(
+                    stage=cls.pools, stage_group=pool, team=team, points=points
+                )
+                cls.teams.append(team)
+
+    def create_finals(self, count=1):
+        for __ in range(count):
+            semi1 = MatchFactory.create(
+                stage=self.finals,
+                home_team=None,
+                away_team=None,
+                home_team_eval="G1P1",
+                away_team_eval="G2P2",
+            )
+            semi2 = MatchFactory.create(
+                stage=self.finals,
+                home_team=None,
+                away_team=None,
+                home_team_eval="G2P1",
+                away_team_eval="G1P2",
+                home_team_score=1,
+                away_team_score=2,
+            )
+            MatchFactory.create(
+                stage=self.finals,
+                home_team=None,
+                away_team=None,
+                home_team_eval="W",
+                home_team_eval_related=semi1,
+                away_team_eval="L",
+                away_team_eval_related=semi2,
+            )
+            MatchFactory.create(
+                stage=self.finals,
+                home_team=None,
+                away_team=None,
+                home_team_eval="P6",
+                away_team_eval="G3P1",
+            )
+
+    def test_same_teams_as_eval(self):
+        self.create_finals()
+        matches = Match.objects.filter(stage=self.finals).order_by("pk")
+        resolver = ProgressionResolver(matches)
+
+        def teams(pair):
+            return tuple(team if isinstance(team, Team) else None for team in pair)
+
+        resolved = [resolver.resolve(match) for match in resolver.matches]
+        self.assertEqual(
+            [teams(match.eval(lazy=True)) for match in matches[:3]], resolved[:3]
+        )
+
+        # The semi finals have not been progressed, so there is no loser yet.
+        # Unlike ``Match.eval``, a plain position resolves to the Team itself.
+        t1, t2, t3, t4, t5, t6 = self.teams
+        self.assertEqual(
+            [(t1, t5), (t4, t2), (None, None), (t6, None)],
+            resolved,
+        )
+
+    def test_queries_do_not_grow(self):
+        self.create_finals()
+        with self.assertNumQueries(7):
+            self.assertEqual(3, len(matches_progression_possible()))
+
+        self.create_finals(5)
+        with self.assertNumQueries(7):
+            self.assertEqual(18, len(matches_progression_possible()))
+
+    def test_progress_season(self):
+        self.create_finals()
+        season = self.division.season
+        t1, t2, t3, t4, t5, t6 = self.teams
+
+        progression = progress_season(season)
+        self.assertEqual(
+            [
+                ("home_team", "G1P1", t1),
+                ("away_team", "G2P2", t5),
+                ("home_team", "G2P1", t4),
+                ("away_team", "G1P2", t2),
+                ("home_team", "P6", t6),
+            ],
+            [(field, reference, team) for __, field, reference, team in progression],
+        )
+        self.assertEqual(3, len(progression.matches))
+        self.assertFalse(self.finals.matches_needing_printing.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            progression.save()
+
+        semi1, semi2, final, playoff = Match.objects.filter(stage=self.finals).order_by(
+            "pk"
+        )
+        self.assertEqual(
+            (t1, t5, True), (semi1.home_team, semi1.away_team, semi1.evaluated)
+        )
+        self.assertEqual((t4, t2), (semi2.home_team, semi2.away_team))
+        self.assertEqual((t6, None), (playoff.home_team, playoff.away_team))
+        self.assertCountEqual(
+            [semi1, semi2, playoff], self.finals.matches_needing_printing.all()
+        )
+
+        # Now the teams of the second semi final are known, so is its loser.
+        progression = progress_season(season)
+        self.assertEqual([(final, "away_team", f"L{semi2.pk}", t4)], list(progression))
+
+    def test_progress_season_queries_do_not_grow(self):
+        self.create_finals()
+        with self.assertNumQueries(7):
+            self.assertEqual(5, len(progress_season(self.division.season)))
+
+        self.create_finals(5)
+        with self.assertNumQueries(7):
+            progression = progress_season(self.division.season)
+        self.assertEqual(30, len(progression))
+
+        with self.assertNumQueries(5):
+            self.assertEqual(18, len(progression.save()))
+
+    def test_progress_season_command(self):
+        self.create_finals()
+        out = StringIO()
+        call_command(
+            "progress_season", self.division.season.pk, dry_run=True, stdout=out
+        )
+        self.assertIn("3 match(es) would be progressed", out.getvalue())
+        self.assertFalse(Match.objects.filter(evaluated=True).exists())
+
+        out = StringIO()
+        call_command("progress_season", self.division.season.pk, stdout=out)
+        self.assertIn("3 match(es) progressed", out.getvalue())
+        self.assertEqual(3, Match.objects.filter(evaluated=True).count())
+
+    def test_progress_season_admin(self):
+        self.create_finals()
+        season = self.division.season
+        args = (season.competition_id, season.pk)
+        self.assertLoginRequired("admin:fixja:competition:season:progress", *args)
+
+        with self.login(SuperUserFactory.create()):
+            self.assertGoodView("admin:fixja:competition:season:progress", *args)
+            self.assertEqual(5, len(self.get_context("progression")))
+            self.assertFalse(Match.objects.filter(evaluated=True).exists())
+
+            self.post("admin:fixja:competition:season:progress", *args)
+            self.response_302()
+
+        self.assertEqual(3, Match.objects.filter(evaluated=True).count())
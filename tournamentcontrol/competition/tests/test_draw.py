@@ -4,11 +4,41 @@ from zoneinfo import ZoneInfo
 
 from test_plus import TestCase
 
+from tournamentcontrol.competition.draw.builders import build, bulk_build
 from tournamentcontrol.competition.draw.generators import (
+    DrawGenerator,
+    clear_draw_format_cache,
+    compile_draw_format,
     tournament_date_generator,
     weekly_date_generator,
 )
-from tournamentcontrol.competition.tests.factories import StageFactory
+from tournamentcontrol.competition.draw.schemas import (
+    CompetitionExecutionError,
+    DivisionStructure,
+    PoolFixture,
+    StageFixture,
+)
+from tournamentcontrol.competition.models import LadderEntry, Match, Team
+from tournamentcontrol.competition.tests.factories import (
+    SeasonFactory,
+    StageFactory,
+    TeamFactory,
+)
+from tournamentcontrol.competition.utils import (
+    round_robin_format,
+    round_robin_rounds,
+    single_elimination_final_format,
+)
+
+KNOCKOUT = """
+ROUND
+1: 1 vs 2 Semi 1
+2: 3 vs 4 Semi 2
+ROUND
+3: L1 vs L2 Bronze
+ROUND
+4: W1 vs W2 Final
+"""
 
 
 class DrawGenerationUtilities(TestCase):
@@ -67,3 +97,248 @@ class DrawGenerationUtilities(TestCase):
                 f"Weekly date generator: '{self.stage.title}' (2022-08-02 00:00:00+00:00)",
             ],
         )
+
+
+class MatchCollectionTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.stage = StageFactory.create(order=1)
+        TeamFactory.create_batch(4, division=self.stage.division)
+
+    def generate(self):
+        generator = DrawGenerator(self.stage, date(2022, 8, 2))
+        generator.parse(KNOCKOUT)
+        return generator.generate()
+
+    def test_bulk_create(self):
+        matches = self.generate()
+        # One INSERT, one UPDATE for the W/L references and one UPDATE for
+        # the team titles inside a savepoint; no per-match signal handling.
+        with self.assertNumQueries(5):
+            matches.bulk_create()
+
+        semi1, semi2, bronze, final = self.stage.matches.order_by("pk")
+        self.assertEqual(
+            [semi1.label, semi2.label, bronze.label, final.label],
+            ["Semi 1", "Semi 2", "Bronze", "Final"],
+        )
+        self.assertEqual(
+            (bronze.home_team_eval, bronze.home_team_eval_related),
+            ("L", semi1),
+        )
+        self.assertEqual(
+            (final.away_team_eval, final.away_team_eval_related),
+            ("W", semi2),
+        )
+        self.assertFalse(LadderEntry.objects.exists())
+
+    def test_bulk_create_matches_save(self):
+        fields = (
+            "label",
+            "round",
+            "home_team",
+            "away_team",
+            "home_team_eval",
+            "home_team_eval_related__label",
+            "away_team_eval",
+            "away_team_eval_related__label",
+            "evaluated",
+        )
+        self.generate().save()
+        saved = list(Match.objects.order_by("pk").values_list(*fields))
+        Match.objects.update(home_team_eval_related=None, away_team_eval_related=None)
+        Match.objects.all().delete()
+
+        self.generate().bulk_create()
+        self.assertEqual(saved, list(Match.objects.order_by("pk").values_list(*fields)))
+
+
+def division_structures(count):
+    return [
+        DivisionStructure(
+            title=f"Division {i}",
+            teams=[f"Team {i}.{j}" for j in range(1, 9)],
+            draw_formats={
+                "Pool Play": round_robin_format(4),
+                "Finals": "\n".join(str(r) for r in single_elimination_final_format(2)),
+                "Knockout": KNOCKOUT.strip(),
+            },
+            stages=[
+                StageFixture(
+                    title="Pool Play",
+                    pools=[
+                        PoolFixture(
+                            title="Pool A",
+                            draw_format_ref="Pool Play",
+                            teams=[0, 1, 2, 3],
+                        ),
+                        PoolFixture(
+                            title="Pool B",
+                            draw_format_ref="Pool Play",
+                            teams=[4, 5, 6, 7],
+                        ),
+                    ],
+                ),
+                StageFixture(title="Finals", draw_format_ref="Finals"),
+                StageFixture(title="Plate", draw_format_ref="Knockout"),
+            ],
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+class DrawFormatCompileTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        clear_draw_format_cache()
+
+    def test_compiled_once(self):
+        rounds = compile_draw_format(KNOCKOUT, pk=1)
+        self.assertEqual(
+            [str(r) for r in rounds],
+            [
+                "ROUND\n1: 1 vs 2 Semi 1\n2: 3 vs 4 Semi 2",
+                "ROUND\n3: L1 vs L2 Bronze",
+                "ROUND\n4: W1 vs W2 Final",
+            ],
+        )
+        self.assertIs(rounds, compile_draw_format(KNOCKOUT, pk=1))
+        self.assertIsNot(rounds, compile_draw_format(KNOCKOUT, pk=2))
+        self.assertIsNot(rounds, compile_draw_format(KNOCKOUT))
+        self.assertIs(compile_draw_format(KNOCKOUT), compile_draw_format(KNOCKOUT))
+
+    def test_recompiled_when_edited(self):
+        rounds = compile_draw_format(KNOCKOUT, pk=1)
+        edited = compile_draw_format(KNOCKOUT.replace("Bronze", "Third"), pk=1)
+        self.assertIsNot(rounds, edited)
+        self.assertEqual(edited[1].matches[0].match_label, "Third")
+        self.assertIsNot(rounds, compile_draw_format(KNOCKOUT, pk=1))
+
+    def test_templates_are_immutable(self):
+        rounds = compile_draw_format(KNOCKOUT)
+        self.assertIsInstance(rounds, tuple)
+        with self.assertRaises(AttributeError):
+            rounds[0].add(rounds[1].matches[0])
+
+    def test_generated_from_shared_templates(self):
+        stage = StageFactory.create(order=1)
+        TeamFactory.create_batch(4, division=stage.division)
+
+        first, second = DrawGenerator(stage), DrawGenerator(stage)
+        first.parse(KNOCKOUT, pk=1)
+        second.parse(KNOCKOUT, pk=1)
+        self.assertEqual(first.rounds, second.rounds)
+
+        no_date = lambda stage, start_date: itertools.repeat(None)  # noqa: E731
+        matches = first.generate(custom_date_generator=no_date)
+        again = second.generate(custom_date_generator=no_date)
+        self.assertEqual(
+            [(m.label, m.home_team, m.away_team) for m in matches],
+            [(m.label, m.home_team, m.away_team) for m in again],
+        )
+        self.assertIs(again.get_latest("3").home_team_eval_related, again[0])
+
+    def test_round_robin_rounds_need_no_parsing(self):
+        stage = StageFactory.create(order=1)
+        TeamFactory.create_batch(5, division=stage.division)
+
+        parsed, built = DrawGenerator(stage), DrawGenerator(stage)
+        parsed.parse(round_robin_format(5, cycles=2))
+        built.rounds.extend(round_robin_rounds(5, cycles=2))
+
+        no_date = lambda stage, start_date: itertools.repeat(None)  # noqa: E731
+        self.assertEqual(
+            [
+                (m.round, m.home_team, m.away_team, m.is_bye)
+                for m in parsed.generate(custom_date_generator=no_date)
+            ],
+            [
+                (m.round, m.home_team, m.away_team, m.is_bye)
+                for m in built.generate(custom_date_generator=no_date)
+            ],
+        )
+
+
+class BulkBuildTests(TestCase):
+    def structure(self, season):
+        teams = Team.objects.filter(division__season=season).values_list(
+            "division__title", "title", "order", "stage_group__title"
+        )
+        matches = Match.objects.filter(stage__division__season=season).values_list(
+            "stage__division__title",
+            "stage__title",
+            "stage__order",
+            "stage_group__title",
+            "round",
+            "label",
+            "is_bye",
+            "home_team__title",
+            "away_team__title",
+            "home_team_eval",
+            "away_team_eval",
+            "home_team_eval_related__label",
+            "away_team_eval_related__label",
+            "evaluated",
+        )
+        return sorted(teams, key=str), sorted(matches, key=str)
+
+    def test_same_as_build(self):
+        specs = division_structures(2)
+
+        season = SeasonFactory.create()
+        for spec in specs:
+            build(season, spec)
+
+        bulk_season = SeasonFactory.create()
+        timings = {}
+        divisions = bulk_build(bulk_season, specs, timings)
+
+        self.assertEqual(
+            [(d.title, d.order) for d in divisions],
+            [("Division 1", 1), ("Division 2", 2)],
+        )
+        self.assertEqual(self.structure(season), self.structure(bulk_season))
+        self.assertCountEqual(
+            timings,
+            [
+                "validate",
+                "divisions",
+                "stages",
+                "pools",
+                "teams",
+                "generate",
+                "matches",
+            ],
+        )
+
+    def test_queries_do_not_scale(self):
+        season = SeasonFactory.create()
+        with self.assertNumQueries(13):
+            bulk_build(season, division_structures(1))
+        season = SeasonFactory.create()
+        with self.assertNumQueries(13):
+            bulk_build(season, division_structures(5))
+
+    def test_validation(self):
+        season = SeasonFactory.create()
+        bulk_build(season, division_structures(1))
+
+        specs = division_structures(2)
+        specs[1].teams[1] = specs[1].teams[0]
+        specs[1].stages[0].pools[1].teams = [4, 5, 6, 8]
+        specs[1].stages[1].draw_format_ref = "Missing"
+        specs[1].draw_formats["Knockout"] = "1: 1 vs 2\nROUND\n2: W3 vs 3"
+
+        with self.assertRaises(CompetitionExecutionError) as cm:
+            bulk_build(season, specs)
+
+        for error in (
+            "Division 'Division 1' already exists in this season.",
+            "Division 'Division 2' has more than one team 'Team 2.1'.",
+            "Division 'Division 2' pool 'Pool B' refers to team 8",
+            "Division 'Division 2' stage 'Finals' refers to unknown draw format",
+            "Division 'Division 2' format 'Knockout': match 1 is not in a ROUND.",
+            "Division 'Division 2' format 'Knockout': match 2 refers to W3",
+        ):
+            self.assertIn(error, str(cm.exception))
+        self.assertEqual(season.divisions.count(), 1)
@@ -1,9 +1,12 @@
+from datetime import date, time
+
 from test_plus import TestCase
 
 from touchtechnology.common.tests.factories import UserFactory
 from tournamentcontrol.competition.forms import (
     DrawGenerationForm,
     DrawGenerationFormSet,
+    MatchScheduleFormSet,
 )
 from tournamentcontrol.competition.models import Match
 from tournamentcontrol.competition.tests import factories
@@ -256,3 +259,73 @@ class DrawGenerationFormTest(TestCase):
         # This was failing in the template when trying to access {{ formset.empty_form.media }}
         media = empty_form.media
         self.assertIsNotNone(media)
+
+
+class MatchScheduleFormSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.stage = factories.StageFactory.create()
+        cls.season = cls.stage.division.season
+        cls.venue = factories.VenueFactory.create(season=cls.season)
+        cls.date = date(2024, 3, 2)
+        cls.match = factories.MatchFactory.create(
+            stage=cls.stage, date=cls.date, time=None
+        )
+
+    def formset(self, at="10:00", play_at=None):
+        queryset = Match.objects.filter(pk=self.match.pk)
+        data = {
+            "form-TOTAL_FORMS": "1",
+            "form-INITIAL_FORMS": "1",
+            "form-MIN_NUM_FORMS": "0",
+            "form-MAX_NUM_FORMS": "1000",
+            "form-0-id": str(self.match.pk),
+            "form-0-time": at,
+            "form-0-play_at": str((play_at or self.venue).pk),
+        }
+        return MatchScheduleFormSet(
+            places=None, timeslots=None, data=data, queryset=queryset
+        )
+
+    def test_no_clashes(self):
+        factories.MatchFactory.create(
+            stage=self.stage, date=self.date, time=None, play_at=self.venue
+        )
+        self.assertTrue(self.formset().is_valid())
+
+    def test_place_clash(self):
+        factories.MatchFactory.create(
+            stage=self.stage,
+            date=self.date,
+            time=time(10),
+            play_at=self.venue,
+        )
+        formset = self.formset()
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(
+            formset.forms[0].errors["play_at"],
+            ["Another match is already scheduled for this time & place."],
+        )
+
+    def test_place_clash_other_date(self):
+        factories.MatchFactory.create(
+            stage=self.stage,
+            date=date(2024, 3, 9),
+            time=time(10),
+            play_at=self.venue,
+        )
+        self.assertTrue(self.formset().is_valid())
+
+    def test_team_clash(self):
+        other = factories.TeamFactory.create()
+        self.match.home_team.team_clashes.add(other)
+        factories.MatchFactory.create(
+            stage=factories.StageFactory.create(division=other.division),
+            home_team=other,
+            date=self.date,
+            time=time(10),
+        )
+        formset = self.formset()
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(formset.forms[0].errors["time"], [other.title])
+        self.assertTrue(self.formset(at="11:00").is_valid())
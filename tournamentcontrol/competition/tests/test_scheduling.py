@@ -0,0 +1,253 @@
+from datetime import date, datetime, time
+from itertools import combinations
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase
+from test_plus import TestCase
+
+from tournamentcontrol.competition.models import Ground, Match, Team
+from tournamentcontrol.competition.scheduling import Scheduler, auto_schedule
+from tournamentcontrol.competition.tests import factories
+
+TIMES = [time(9), time(10), time(11)]
+
+
+class SchedulerTests(SimpleTestCase):
+    """The solver works on unsaved objects, so no database is needed."""
+
+    def setUp(self):
+        self.teams = {}
+        self.matches = []
+
+    def team(self, pk, **kwargs):
+        return self.teams.setdefault(pk, Team(pk=pk, **kwargs))
+
+    def match(self, home=None, away=None, **kwargs):
+        match = Match(pk=len(self.matches) + 1, **kwargs)
+        if home is not None:
+            match.home_team = self.team(home)
+        if away is not None:
+            match.away_team = self.team(away)
+        self.matches.append(match)
+        return match
+
+    def places(self, count):
+        return [Ground(pk=pk) for pk in range(1, count + 1)]
+
+    def solve(self, times=TIMES, places=1, **kwargs):
+        allocations, unplaced = Scheduler(times, self.places(places), **kwargs).solve(
+            self.matches
+        )
+        return {match: start for match, start, place in allocations}, unplaced
+
+    def test_earliest_free_place(self):
+        for home, away in ((1, 2), (3, 4), (5, 6)):
+            self.match(home, away)
+        allocations, unplaced = Scheduler(TIMES, self.places(2)).solve(self.matches)
+        self.assertEqual(
+            [(match.pk, start, place.pk) for match, start, place in allocations],
+            [(1, 540, 1), (2, 540, 2), (3, 600, 1)],
+        )
+        self.assertEqual([], unplaced)
+
+    def test_team_plays_once_per_slot(self):
+        first = self.match(1, 2)
+        second = self.match(1, 3)
+        starts, unplaced = self.solve(places=2)
+        self.assertEqual({first: 540, second: 600}, starts)
+
+    def test_min_gap(self):
+        first = self.match(1, 2)
+        second = self.match(3, 1)
+        starts, unplaced = self.solve(places=2, min_gap=120)
+        self.assertEqual({first: 540, second: 660}, starts)
+
+        self.match(1, 4)
+        starts, unplaced = self.solve(places=2, min_gap=120)
+        self.assertEqual(1, len(unplaced))
+
+    def test_clashes(self):
+        first = self.match(1, 2)
+        second = self.match(3, 4)
+        starts, unplaced = self.solve(places=2, clashes={1: {3}, 3: {1}})
+        self.assertEqual({first: 540, second: 600}, starts)
+
+    def test_time_preferences(self):
+        self.team(1, timeslots_after=time(10))
+        self.team(3, timeslots_before=time(9, 30))
+        late = self.match(1, 2)
+        early = self.match(3, 4)
+        starts, unplaced = self.solve()
+        self.assertEqual({late: 600, early: 540}, starts)
+
+    def test_deciding_match_first(self):
+        final = self.match()
+        semi = self.match(1, 2)
+        final.home_team_eval_related_id = semi.pk
+        starts, unplaced = self.solve(places=2, min_gap=60)
+        self.assertEqual({semi: 540, final: 600}, starts)
+
+    def test_blocked(self):
+        first = self.match(1, 2)
+        scheduler = Scheduler(TIMES, self.places(1))
+        scheduler.block(Match(pk=99, time=time(9), play_at_id=1, home_team_id=5))
+        allocations, unplaced = scheduler.solve(self.matches)
+        self.assertEqual([(first, 600)], [(m, start) for m, start, __ in allocations])
+
+    def test_backtracking(self):
+        # Placing each match at its earliest time leaves team 4 nowhere to go.
+        for home, away in ((5, 2), (4, 1), (4, 3)):
+            self.match(home, away)
+
+        starts, unplaced = self.solve(min_gap=120, max_backtracks=0)
+        self.assertEqual(1, len(unplaced))
+
+        starts, unplaced = self.solve(min_gap=120)
+        self.assertEqual([], unplaced)
+        self.assertEqual([600, 540, 660], [starts[match] for match in self.matches])
+
+    def test_large_day(self):
+        # 300 round robin matches for 50 pools of four teams on 20 fields.
+        for pool in range(50):
+            teams = range(pool * 4 + 1, pool * 4 + 5)
+            for home, away in combinations(teams, 2):
+                self.match(home, away)
+        for pk in range(1, 21):
+            self.team(pk).timeslots_after = time(12)
+        times = [time(9 + n // 2, 30 * (n % 2)) for n in range(18)]
+
+        starts, unplaced = self.solve(times=times, places=20, min_gap=60)
+        self.assertEqual([], unplaced)
+
+        teams = {}
+        for match, start in starts.items():
+            for team_id in (match.home_team_id, match.away_team_id):
+                teams.setdefault(team_id, []).append(start)
+            if match.home_team_id <= 20:
+                self.assertGreaterEqual(start, 720)
+        for team_starts in teams.values():
+            team_starts.sort()
+            for first, second in zip(team_starts, team_starts[1:]):
+                self.assertGreaterEqual(second - first, 60)
+
+
+class AutoScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = date(2024, 3, 2)
+        cls.season = factories.SeasonFactory.create(timezone="Australia/Sydney")
+        factories.SeasonMatchTimeFactory.create(
+            season=cls.season, start=time(9), interval=60, count=3
+        )
+        venue = factories.VenueFactory.create(season=cls.season)
+        cls.grounds = factories.GroundFactory.create_batch(2, venue=venue)
+        cls.stage = factories.StageFactory.create(division__season=cls.season)
+        cls.teams = factories.TeamFactory.create_batch(6, division=cls.stage.division)
+        cls.matches = [
+            factories.MatchFactory.create(
+                stage=cls.stage,
+                home_team=home,
+                away_team=away,
+                date=cls.date,
+                time=None,
+                datetime=None,
+            )
+            for home, away in zip(cls.teams[::2], cls.teams[1::2])
+        ]
+
+    def test_preview(self):
+        self.teams[0].team_clashes.add(self.teams[2])
+        fixed = factories.MatchFactory.create(
+            stage=self.stage,
+            home_team=self.teams[4],
+            away_team=self.teams[5],
+            date=self.date,
+            time=time(9),
+            play_at=self.grounds[0],
+            datetime=None,
+        )
+        self.matches[2].delete()
+
+        with self.assertNumQueries(8):
+            schedule = auto_schedule(self.season, self.date)
+
+        self.assertEqual(
+            [(time(9), self.grounds[1].pk), (time(10), self.grounds[0].pk)],
+            [(allocation.time, allocation.place.pk) for allocation in schedule],
+        )
+        self.assertEqual(
+            [self.matches[0], self.matches[1]],
+            [allocation.match for allocation in schedule],
+        )
+        self.assertEqual([], schedule.unplaced)
+
+        # Nothing is saved until asked.
+        self.assertIsNone(Match.objects.get(pk=self.matches[0].pk).time)
+        self.assertEqual(time(9), Match.objects.get(pk=fixed.pk).time)
+
+    def test_save(self):
+        schedule = auto_schedule(self.season, self.date)
+        self.assertEqual(3, len(schedule))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.save()
+
+        match = Match.objects.get(pk=self.matches[0].pk)
+        self.assertEqual(time(9), match.time)
+        self.assertEqual(self.grounds[0].pk, match.play_at_id)
+        self.assertEqual(
+            datetime(2024, 3, 2, 9, tzinfo=ZoneInfo("Australia/Sydney")),
+            match.datetime,
+        )
+        self.assertEqual([], list(auto_schedule(self.season, self.date).allocations))
+
+    def test_time_without_place(self):
+        match = self.matches[1]
+        Match.objects.filter(pk=match.pk).update(time=time(11))
+
+        schedule = auto_schedule(self.season, self.date)
+        allocations = {allocation.match: allocation for allocation in schedule}
+        self.assertEqual(time(11), allocations[match].time)
+        self.assertEqual(self.grounds[0].pk, allocations[match].place.pk)
+        self.assertEqual(3, len(schedule))
+
+    def test_admin_view_stale_preview(self):
+        args = (self.season.competition_id, self.season.pk, "20240302")
+        digest = auto_schedule(self.season, self.date).digest
+        self.matches[2].delete()
+
+        with self.login(factories.SuperUserFactory.create()):
+            self.post(
+                "admin:fixja:match-auto-schedule", *args, data={"preview": digest}
+            )
+            self.response_200()
+            self.assertEqual(2, len(self.get_context("schedule")))
+
+        self.assertFalse(
+            Match.objects.filter(date=self.date, time__isnull=False).exists()
+        )
+
+    def test_admin_view(self):
+        args = (self.season.competition_id, self.season.pk, "20240302")
+        self.assertLoginRequired("admin:fixja:match-auto-schedule", *args)
+
+        with self.login(factories.SuperUserFactory.create()):
+            self.assertGoodView(
+                "admin:fixja:match-auto-schedule", *args, data={"min_gap": 60}
+            )
+            self.assertEqual(3, len(self.get_context("schedule")))
+            self.assertIsNone(Match.objects.get(pk=self.matches[0].pk).time)
+
+            self.get("admin:fixja:match-auto-schedule", *args, data={"min_gap": -1})
+            self.response_200()
+            self.assertIsNone(self.get_context("schedule"))
+
+            digest = auto_schedule(self.season, self.date).digest
+            self.post(
+                "admin:fixja:match-auto-schedule", *args, data={"preview": digest}
+            )
+            self.response_302()
+
+        self.assertFalse(
+            Match.objects.filter(date=self.date, time__isnull=True).exists()
+        )
@@ -1,6 +1,20 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db.models import F
 from django.test import TestCase
 
-from tournamentcontrol.competition.models import LadderEntry, LadderSummary
+from tournamentcontrol.competition.ladders import (
+    defer_ladder_updates,
+    rebuild_ladder_summary,
+    recalculate_ladder_points,
+)
+from tournamentcontrol.competition.models import (
+    Division,
+    LadderEntry,
+    LadderSummary,
+    Match,
+)
 from tournamentcontrol.competition.tests import factories
 
 
@@ -56,3 +70,291 @@ class SignalHandlerTests(TestCase):
                 "difference",
             ),
         )
+
+    def test_ladder_summary_result_corrected(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=2)
+        summary = LadderSummary.objects.get(team=match.home_team)
+
+        match.home_team_score = 1
+        match.save()
+
+        # the existing summary is updated in place rather than replaced
+        self.assertQuerySetEqual(
+            LadderSummary.objects.filter(team=match.home_team),
+            [(summary.pk, 1, 0, 1, 0, 1, 2, -1, Decimal("50.00"), Decimal(1))],
+            transform=lambda o: (
+                o.pk,
+                o.played,
+                o.win,
+                o.loss,
+                o.draw,
+                o.score_for,
+                o.score_against,
+                o.difference,
+                o.percentage,
+                o.points,
+            ),
+        )
+
+    def test_ladder_summary_result_removed(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=0)
+
+        match.home_team_score = None
+        match.away_team_score = None
+        match.save()
+
+        self.assertCountEqual(
+            [(0, 0, 0, 0, 0, None), (0, 0, 0, 0, 0, None)],
+            LadderSummary.objects.values_list(
+                "played", "win", "score_for", "score_against", "points", "percentage"
+            ),
+        )
+
+    def test_ladder_summary_excluded_from_ladder(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=2)
+        factories.MatchFactory.create(
+            home_team=match.home_team,
+            home_team_score=3,
+            away_team=match.away_team,
+            away_team_score=4,
+            stage=match.stage,
+        )
+
+        match = Match.objects.get(pk=match.pk)
+        match.include_in_ladder = False
+        match.save()
+        self.assertCountEqual(
+            [(1, 0, 1, 3, 4), (1, 1, 0, 4, 3)],
+            LadderSummary.objects.values_list(
+                "played", "win", "loss", "score_for", "score_against"
+            ),
+        )
+
+        # the same instance can be put back in the ladder
+        match.include_in_ladder = True
+        match.save()
+        self.assertCountEqual(
+            [(2, 1, 1, 8, 6), (2, 1, 1, 6, 8)],
+            LadderSummary.objects.values_list(
+                "played", "win", "loss", "score_for", "score_against"
+            ),
+        )
+
+    def test_ladder_summary_match_deleted(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=2)
+        factories.MatchFactory.create(
+            home_team=match.home_team,
+            home_team_score=3,
+            away_team=match.away_team,
+            away_team_score=4,
+            stage=match.stage,
+        )
+
+        match.delete()
+
+        self.assertCountEqual(
+            [(1, 0, 1, 3, 4, 1), (1, 1, 0, 4, 3, 3)],
+            LadderSummary.objects.values_list(
+                "played", "win", "loss", "score_for", "score_against", "points"
+            ),
+        )
+
+    def test_ladder_summary_carry_ladder(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=2)
+        stage = factories.StageFactory.create(
+            division=match.stage.division, carry_ladder=True
+        )
+        factories.MatchFactory.create(
+            home_team=match.home_team,
+            home_team_score=3,
+            away_team=match.away_team,
+            away_team_score=4,
+            stage=stage,
+        )
+
+        self.assertCountEqual(
+            [(2, 1, 1, 8, 6), (2, 1, 1, 6, 8)],
+            stage.ladder_summary.values_list(
+                "played", "win", "loss", "score_for", "score_against"
+            ),
+        )
+
+    def test_rebuild_ladder_summary(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=2)
+        LadderSummary.objects.update(played=9, score_for=0, points=0)
+
+        for team in (match.home_team, match.away_team):
+            rebuild_ladder_summary(team, match.stage)
+
+        self.assertCountEqual(
+            [(1, 5, 2, 3), (1, 2, 5, 1)],
+            LadderSummary.objects.values_list(
+                "played", "score_for", "score_against", "points"
+            ),
+        )
+
+    def test_defer_ladder_updates(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=2)
+        other = factories.MatchFactory.create(
+            home_team=match.home_team, away_team=match.away_team, stage=match.stage
+        )
+
+        with defer_ladder_updates():
+            match.home_team_score = 1
+            match.save()
+            other.home_team_score = 3
+            other.away_team_score = 3
+            other.save()
+
+            # nothing is recalculated until the block exits
+            self.assertCountEqual(
+                [(1, 5, 2), (1, 2, 5)],
+                LadderSummary.objects.values_list(
+                    "played", "score_for", "score_against"
+                ),
+            )
+
+        self.assertCountEqual(
+            [
+                (2, 0, 1, 1, 4, 5, -1, Decimal("80.00"), 3),
+                (2, 1, 0, 1, 5, 4, 1, Decimal("125.00"), 5),
+            ],
+            LadderSummary.objects.values_list(
+                "played",
+                "win",
+                "loss",
+                "draw",
+                "score_for",
+                "score_against",
+                "difference",
+                "percentage",
+                "points",
+            ),
+        )
+
+    def test_defer_ladder_updates_rollback(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=2)
+
+        with self.assertRaises(ValueError):
+            with defer_ladder_updates():
+                match.home_team_score = 1
+                match.save()
+                raise ValueError
+
+        self.assertCountEqual(
+            [(5, 2), (2, 5)],
+            LadderSummary.objects.values_list("score_for", "score_against"),
+        )
+        self.assertCountEqual(
+            [(5, 2), (2, 5)],
+            LadderEntry.objects.values_list("score_for", "score_against"),
+        )
+
+    def test_changed_points_formula(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=0)
+        factories.MatchFactory.create(
+            home_team=match.home_team,
+            home_team_score=2,
+            away_team=match.away_team,
+            away_team_score=2,
+            stage=match.stage,
+        )
+
+        division = Division.objects.get(pk=match.stage.division_id)
+        division.points_formula = "4*win + 2*draw"
+        division.bonus_points_formula = "[win=1, score_against=0: 1]"
+        division.save()
+
+        self.assertCountEqual(
+            [(5, 1), (2, 0), (0, 0), (2, 0)],
+            LadderEntry.objects.values_list("points", "bonus_points"),
+        )
+        self.assertCountEqual(
+            [(match.home_team.pk, 7, 1), (match.away_team.pk, 2, 0)],
+            LadderSummary.objects.values_list("team", "points", "bonus_points"),
+        )
+
+    def test_recalculate_ladder_points_unchanged(self):
+        match = factories.MatchFactory.create(home_team_score=5, away_team_score=0)
+        summary = LadderSummary.objects.get(team=match.home_team)
+
+        self.assertEqual(0, recalculate_ladder_points(match.stage.division))
+        self.assertEqual(summary.pk, LadderSummary.objects.get(team=match.home_team).pk)
+
+
+class TeamTitleTests(TestCase):
+    def setUp(self):
+        self.stage = factories.StageFactory.create()
+        self.team = factories.TeamFactory.create(
+            division=self.stage.division, title="Eagles"
+        )
+        self.semi = factories.MatchFactory.create(
+            stage=self.stage, label="SF1", home_team=self.team
+        )
+        self.undecided = factories.UndecidedTeamFactory.create(
+            stage=self.stage, label="Host"
+        )
+        self.final = factories.MatchFactory.create(
+            stage=self.stage,
+            home_team=None,
+            away_team=None,
+            home_team_eval="W",
+            home_team_eval_related=self.semi,
+            away_team_undecided=self.undecided,
+        )
+
+    def titles(self, match):
+        return Match.objects.values_list("home_team_title", "away_team_title").get(
+            pk=match.pk
+        )
+
+    def test_stored_on_save(self):
+        self.assertEqual(("Winner SF1", "Host"), self.titles(self.final))
+        self.assertEqual("Eagles", self.titles(self.semi)[0])
+        self.assertFalse(
+            Match.objects.all()
+            ._team_titles()
+            .exclude(
+                home_team_title=F("computed_home_team_title"),
+                away_team_title=F("computed_away_team_title"),
+            )
+            .exists()
+        )
+
+    def test_default_queryset_is_not_annotated(self):
+        self.assertNotIn(
+            "vitriolic_stage_group_position", str(Match.objects.all().query)
+        )
+
+    def test_related_changes(self):
+        self.team.title = "Hawks"
+        self.team.save()
+        self.assertEqual("Hawks", self.titles(self.semi)[0])
+
+        self.semi.label = "Semi 1"
+        self.semi.save()
+        self.assertEqual("Winner Semi 1", self.titles(self.final)[0])
+
+        self.undecided.label = ""
+        self.undecided.formula = "G1P2"
+        self.undecided.save()
+        self.assertEqual("2nd Group 1", self.titles(self.final)[1])
+
+    def test_changed_titles_are_modified(self):
+        modified = Match.objects.values_list("last_modified", flat=True)
+        last_modified = modified.get(pk=self.final.pk)
+        path = "tournamentcontrol.competition.calendars.schedule_calendar_render"
+        semi = Match.objects.get(pk=self.semi.pk)
+
+        # Entering a result leaves the titles alone.
+        with mock.patch(path) as schedule:
+            semi.home_team_score = 3
+            semi.save()
+        schedule.assert_not_called()
+        self.assertEqual(last_modified, modified.get(pk=self.final.pk))
+
+        with mock.patch(path) as schedule:
+            semi.label = "Semi 1"
+            semi.save()
+        schedule.assert_called_once_with(match_ids=[self.final.pk])
+        self.assertGreater(modified.get(pk=self.final.pk), last_modified)
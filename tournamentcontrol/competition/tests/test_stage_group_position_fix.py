@@ -4,14 +4,19 @@ Tests the fix for AttributeError crash on invalid input and ensures comprehensiv
 coverage of all stage_group_position parsing scenarios.
 """
 
+from unittest import mock
+
 from test_plus import TestCase
 
+from tournamentcontrol.competition import models
+from tournamentcontrol.competition.models import Match
 from tournamentcontrol.competition.tests.factories import (
     DivisionFactory,
     MatchFactory,
     StageFactory,
     StageGroupFactory,
     TeamFactory,
+    UndecidedTeamFactory,
 )
 from tournamentcontrol.competition.utils import stage_group_position_re
 
@@ -329,3 +334,126 @@ class StageGroupPositionIntegrationTests(TestCase):
         self.assertEqual(home_result, {"title": "G5P1"})
         # Valid group should work normally
         self.assertIn("1st", away_result["title"])
+
+
+class PlaceholderLabelTests(TestCase):
+    """
+    Labels of unresolved teams are built for a whole stage at once and must
+    match those worked out for each match on its own.
+    """
+
+    def setUp(self):
+        self.division = DivisionFactory.create()
+        self.pools = StageFactory.create(division=self.division, order=1)
+        self.pool1, self.pool2 = StageGroupFactory.create_batch(
+            2, stage=self.pools, title="Pool A"
+        )
+        self.pool2.title = "Pool B"
+        self.pool2.save()
+        self.finals = StageFactory.create(division=self.division, order=2)
+
+    def create_finals(self):
+        semi = MatchFactory.create(
+            stage=self.finals,
+            label="SF1",
+            home_team=None,
+            away_team=None,
+            home_team_eval="G1P1",
+            away_team_eval="G2P2",
+        )
+        MatchFactory.create(
+            stage=self.finals,
+            home_team=None,
+            away_team=None,
+            home_team_eval="W",
+            home_team_eval_related=semi,
+            away_team_eval="P3",
+        )
+        MatchFactory.create(
+            stage=self.finals,
+            home_team=None,
+            away_team=None,
+            home_team_undecided=UndecidedTeamFactory.create(
+                stage=self.finals, formula="G2P1"
+            ),
+            away_team_undecided=UndecidedTeamFactory.create(
+                stage=self.finals, label="Host"
+            ),
+        )
+        MatchFactory.create(stage=self.finals, away_team=None, is_bye=True)
+
+    def labels(self):
+        return [
+            (match.get_home_team_plain(), match.get_away_team_plain())
+            for match in Match.objects.filter(stage=self.finals)
+            .select_related("stage", "home_team", "away_team")
+            .order_by("pk")
+        ]
+
+    def test_same_as_each_match(self):
+        self.create_finals()
+        expected = [
+            (
+                (
+                    match._placeholder_label("home_team", match._comes_after)
+                    if match.home_team is None
+                    else match.home_team
+                ),
+                match._placeholder_label("away_team", match._comes_after),
+            )
+            for match in Match.objects.filter(stage=self.finals).order_by("pk")
+        ]
+        labels = self.labels()
+        self.assertEqual(
+            [
+                ("1st Pool A", "2nd Pool B"),
+                ("Winner SF1", "3rd"),
+                ("1st Pool B", "Host"),
+            ],
+            labels[:3],
+        )
+        self.assertEqual(expected[:3], labels[:3])
+        self.assertEqual(expected[3][0], labels[3][0])
+        self.assertIn("Bye", labels[3][1].title)
+
+    def test_queries_do_not_grow(self):
+        self.create_finals()
+        self.labels()
+        with self.assertNumQueries(1):
+            self.labels()
+
+        self.create_finals()
+        self.labels()
+        with self.assertNumQueries(1):
+            self.assertEqual(8, len(self.labels()))
+
+    def test_invalidated_on_change(self):
+        self.create_finals()
+        self.assertEqual("1st Pool A", self.labels()[0][0])
+        self.pool1.title = "Pool Z"
+        self.pool1.save()
+        self.assertEqual("1st Pool Z", self.labels()[0][0])
+
+    def test_invalidated_on_match_label_change(self):
+        self.create_finals()
+        self.assertEqual("Winner SF1", self.labels()[1][0])
+        semi = Match.objects.get(stage=self.finals, label="SF1")
+
+        # Saving a match without changing its teams keeps the labels.
+        semi.home_team_score = 1
+        semi.save()
+        self.labels()
+        with self.assertNumQueries(1):
+            self.labels()
+
+        semi.label = "Semi 1"
+        semi.save()
+        self.assertEqual("Winner Semi 1", self.labels()[1][0])
+
+    def test_least_recently_used_dropped(self):
+        self.create_finals()
+        with mock.patch.object(models, "PLACEHOLDER_LABELS_MAX_STAGES", 1):
+            self.labels()
+            self.assertIn((None, self.finals.pk), models._placeholder_labels)
+            self.pools.placeholder_labels
+            self.assertEqual([(None, self.pools.pk)], list(models._placeholder_labels))
@@ -1,11 +1,17 @@
+import datetime
 import textwrap
 
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from test_plus import TestCase
 
 from tournamentcontrol.competition import utils
 from tournamentcontrol.competition.tests.factories import (
     DivisionFactory,
+    GroundFactory,
     MatchFactory,
+    SeasonMatchTimeFactory,
     StageFactory,
     StageGroupFactory,
     SuperUserFactory,
@@ -125,6 +131,43 @@ class UtilTests(TestCase):
         result_2_list = utils.round_robin_format([1, 2])
         self.assertEqual(result_2_int, result_2_list)
 
+    def test_round_robin_cycles(self):
+        """Repeated cycles swap home and away."""
+        first, second = utils.round_robin(range(1, 5), cycles=2)[::3]
+        self.assertEqual([(1, 4), (2, 3)], first)
+        self.assertEqual([(4, 1), (3, 2)], second)
+
+        for size in (2, 5, 8, 61):
+            with self.subTest(size=size):
+                pairings = [
+                    pair
+                    for round in utils.round_robin(range(1, size + 1), cycles=2)
+                    for pair in round
+                    if 0 not in pair
+                ]
+                self.assertEqual(size * (size - 1), len(pairings))
+                self.assertEqual(len(pairings), len(set(pairings)))
+
+    def test_round_robin_pairings_lazy(self):
+        pairings = utils.round_robin_pairings(range(1, 1001))
+        self.assertEqual(500, len(next(pairings)))
+        self.assertEqual((1, 999), next(pairings)[0])
+
+    def test_round_robin_rounds(self):
+        rounds = utils.round_robin_rounds(4, cycles=2)
+        self.assertEqual([1, 2, 3, 4, 5, 6], [round.count for round in rounds])
+        self.assertEqual(
+            [(7, "4", "1"), (8, "3", "2")],
+            [
+                (match.match_id, match.home_team, match.away_team)
+                for match in rounds[3].matches
+            ],
+        )
+        self.assertEqual(
+            utils.round_robin_format(4, cycles=2),
+            "\n".join(str(round) for round in rounds),
+        )
+
     def test_sum_dict_integer(self):
         d1 = utils.SumDict({"a": 1, "b": 2})
         d2 = utils.SumDict({"b": 1, "c": 2})
@@ -488,3 +531,76 @@ class TwoStageFormulaProblemTests(TestCase):
         self.assertResponseContains(f"1st {self.pool1.title}")
         # Invalid team (G3P1) should show the formula as fallback
         self.assertResponseContains("G3P1")
+
+
+class FixtureGridTests(TestCase):
+    """
+    The fixture grid is built with one query for its matches, and the
+    matrix of each date is cached for both the day and season grids.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stage = StageFactory.create()
+        cls.season = cls.stage.division.season
+        cls.ground = GroundFactory.create(venue__season=cls.season)
+        SeasonMatchTimeFactory.create(
+            season=cls.season, start=datetime.time(9), interval=30, count=2
+        )
+        cls.dates = [datetime.date(2024, 3, 1), datetime.date(2024, 3, 2)]
+        cls.matches = [
+            MatchFactory.create(
+                stage=cls.stage,
+                play_at=cls.ground,
+                date=date,
+                time=datetime.time(9, 30),
+                datetime=datetime.datetime.combine(
+                    date, datetime.time(9, 30), datetime.timezone.utc
+                ),
+            )
+            for date in cls.dates
+        ]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.play_at = list(self.season.get_places())
+        (self.place,) = self.play_at
+
+    def matrices(self, dates):
+        with CaptureQueriesContext(connection) as queries:
+            matrices = utils.fixture_grid_matrices(self.season, dates, self.play_at)
+        return matrices, len(queries)
+
+    def test_matrices(self):
+        matrices, queries = self.matrices(self.dates)
+        # the timeslot rules, then the matches of every date at once
+        self.assertEqual(queries, 2)
+        self.assertEqual(list(matrices), self.dates)
+        for date, match in zip(self.dates, self.matches):
+            with self.subTest(date=date):
+                matrix = matrices[date]
+                self.assertEqual(list(matrix), [datetime.time(9), datetime.time(9, 30)])
+                self.assertIsNone(matrix[datetime.time(9)][self.place])
+                self.assertEqual(matrix[datetime.time(9, 30)][self.place], [match])
+
+    def test_shared_by_day_and_season(self):
+        self.matrices(self.dates)
+        matrices, queries = self.matrices(self.dates[:1])
+        self.assertEqual(queries, 1)
+        self.assertEqual(
+            matrices[self.dates[0]][datetime.time(9, 30)][self.place],
+            self.matches[:1],
+        )
+
+    def test_match_changed(self):
+        self.matrices(self.dates)
+        match = self.matches[0]
+        match.time = datetime.time(9)
+        match.save()
+
+        matrices, queries = self.matrices(self.dates)
+        self.assertEqual(queries, 2)
+        matrix = matrices[self.dates[0]]
+        self.assertEqual(matrix[datetime.time(9)][self.place], [match])
+        self.assertIsNone(matrix[datetime.time(9, 30)][self.place])
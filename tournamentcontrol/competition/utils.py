@@ -7,13 +7,15 @@ import re
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
-from itertools import zip_longest
-from operator import and_, or_
+from itertools import groupby, zip_longest
+from operator import and_, attrgetter, or_
 from typing import Iterable, Optional, Union
 from zoneinfo import ZoneInfo
 
+from dateutil.rrule import rruleset
 from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db.models import Case, CharField, F, Func, Q, Value, When
 from django.db.models.functions import Cast, Concat
 from django.http import HttpResponse
@@ -298,38 +300,89 @@ def time_choice(t):
 #
 
 
-def round_robin(teams, rounds=None):
+def round_robin_pairings(teams, rounds=None, cycles=1):
     """
-    Based on recipe found at http://code.activestate.com/recipes/65200/
+    Yield the pairings for each round of a round robin between ``teams``.
+
+    Uses the circle method: the first team stays in place while the rest
+    rotate one position each round, so the teams in round ``n`` are found by
+    index arithmetic rather than by reshuffling a list. An odd number of teams
+    is padded with a bye, represented as ``0``.
+
+    Without ``rounds``, every team plays every other team once for each of
+    ``cycles``. Home and away are swapped in every second cycle, so a double
+    round robin is balanced.
     """
-    # ensure we have a list so we can perform appends and inserts
-    if not isinstance(teams, list):
-        teams = [t for t in teams]
+    teams = list(teams)
 
     # ensure we have an even number of teams
     if len(teams) % 2:
         teams.append(0)
 
     count = len(teams)
-    half = int(count / 2)
+    half = count // 2
+    if not count:
+        return
 
-    # if the rounds is not set, we will produce one complete round
+    # if the rounds is not set, we will produce complete cycles
     if rounds is None:
-        rounds = count - 1
+        rounds = (count - 1) * cycles
 
-    schedule = []
     for turn in range(rounds):
-        pairings = []
-        for i in range(half):
-            pairings.append((teams[i], teams[count - i - 1]))
-        teams.insert(1, teams.pop())
-        schedule.append(pairings)
+        cycle, offset = divmod(turn, count - 1)
+        order = [teams[0]] + [
+            teams[1 + (position - offset) % (count - 1)]
+            for position in range(count - 1)
+        ]
+        if cycle % 2:
+            yield [(order[count - i - 1], order[i]) for i in range(half)]
+        else:
+            yield [(order[i], order[count - i - 1]) for i in range(half)]
+
 
-    return schedule
+def round_robin(teams, rounds=None, cycles=1):
+    """
+    Return the list of pairings for each round of a round robin; see
+    ``round_robin_pairings``.
+    """
+    return list(round_robin_pairings(teams, rounds, cycles))
+
+
+def round_robin_rounds(
+    teams: Union[int, Iterable], rounds: Optional[int] = None, cycles: int = 1
+) -> list[RoundDescriptor]:
+    """
+    Build the ``RoundDescriptor`` list for a round robin tournament, ready to
+    be used by a ``DrawGenerator`` without producing and parsing the text
+    format.
+
+    Args:
+        teams: either an integer (number of teams) or an iterable of teams
+        rounds: number of rounds to generate (optional, defaults to complete
+                round-robin)
+        cycles: number of times every team plays every other team when
+                ``rounds`` is not given
+
+    Returns:
+        list of ``RoundDescriptor``, with matches numbered from 1
+    """
+    # If teams is an integer, convert it to a range starting from 1
+    if isinstance(teams, int):
+        teams = range(1, teams + 1)
+
+    series = []
+    match_id = 1
+    for count, pairings in enumerate(round_robin_pairings(teams, rounds, cycles), 1):
+        round = RoundDescriptor(count, None)
+        for home, away in pairings:
+            round.add(MatchDescriptor(match_id, str(home), str(away)))
+            match_id += 1
+        series.append(round)
+    return series
 
 
 def round_robin_format(
-    teams: Union[int, Iterable], rounds: Optional[int] = None
+    teams: Union[int, Iterable], rounds: Optional[int] = None, cycles: int = 1
 ) -> str:
     """
     Generate a formatted DrawGenerator string for a round-robin tournament.
@@ -342,6 +395,8 @@ def round_robin_format(
         teams: either an integer (number of teams) or an iterable of teams
         rounds: number of rounds to generate (optional, defaults to complete
                 round-robin)
+        cycles: number of times every team plays every other team when
+                ``rounds`` is not given
 
     Returns:
         formatted string showing the tournament schedule in DrawGenerator format
@@ -366,17 +421,7 @@ def round_robin_format(
         - For 4 teams: 6 matches across 3 rounds
         - For 6 teams: 15 matches across 5 rounds
     """
-    # If teams is an integer, convert it to a range starting from 1
-    if isinstance(teams, int):
-        teams = range(1, teams + 1)
-
-    i, s = 1, ""
-    for round in round_robin(teams, rounds):
-        s += "ROUND\n"
-        for home, away in round:
-            s += "%s: %s vs %s\n" % (i, home, away)
-            i += 1
-    return s.strip()
+    return "\n".join(str(round) for round in round_robin_rounds(teams, rounds, cycles))
 
 
 def final_series_rounds(pools: int) -> int:
@@ -573,6 +618,106 @@ def generate_scorecards(
     return output
 
 
+def fixture_grid_matrices(season, dates, play_at):
+    """
+    Return the ``{date: {time: {place: matches}}}`` matrices of the fixture
+    grid of ``season`` for each of ``dates``.
+
+    Each matrix is cached on its own until a match of the season changes, so
+    the grid of a day and of the whole season share them. The matches of the
+    dates not in the cache are loaded with a single query and grouped as they
+    are read, and the timeslot rules are expanded once for each distinct set
+    of them that applies.
+    """
+    from tournamentcontrol.competition.pagecache import (
+        PAGE_CACHE_TIMEOUT,
+        tagged_key,
+    )
+
+    Match = apps.get_model("competition", "Match")
+
+    dates = list(dates)
+    play_at = list(play_at)
+    rules = list(season.timeslots.all())
+
+    expansions = {}
+    timeslots = {}
+    for date in dates:
+        active = tuple(
+            rule
+            for rule in rules
+            if (rule.start_date is None or rule.start_date <= date)
+            and (rule.end_date is None or rule.end_date >= date)
+        )
+        if active not in expansions:
+            rset = rruleset()
+            for rule in active:
+                rset.rrule(rule.rrule())
+            expansions[active] = [dt.time() for dt in rset]
+        timeslots[date] = expansions[active]
+
+    # The places and timeslots are in the key, so changing either of them
+    # does not need to invalidate anything.
+    keys = {
+        date: tagged_key(
+            "fixture_grid",
+            [f"matches:{season.pk}"],
+            season.pk,
+            date.isoformat(),
+            ",".join(str(place.pk) for place in play_at),
+            ",".join(str(time) for time in timeslots[date]),
+        )
+        for date in dates
+    }
+    cached = cache.get_many(keys.values())
+    matrices = {date: cached[key] for date, key in keys.items() if key in cached}
+
+    missing = [date for date in dates if date not in matrices]
+    if missing:
+        matches = (
+            season.matches.select_related(
+                "stage_group",
+                "stage",
+                "stage__division",
+                "home_team",
+                "home_team__club",
+                "away_team",
+                "away_team__club",
+                "play_at",
+            )
+            .filter(date__in=missing)
+            .order_by(*Match._meta.ordering)
+        )
+        found = {
+            date: list(group)
+            for date, group in groupby(matches.iterator(), key=attrgetter("date"))
+        }
+
+        for date in missing:
+            keyed = collections.defaultdict(lambda: None)
+            for m in found.get(date, []):
+                keyed.setdefault((m.play_at, m.time), []).append(m)
+
+            times = sorted(
+                {m.time for m in found.get(date, []) if m.time is not None}.union(
+                    timeslots[date]
+                )
+            )
+            matrix = collections.OrderedDict()
+            for t in times:
+                matrix.setdefault(t, collections.OrderedDict())
+                for p in play_at:
+                    matrix[t].setdefault(p, keyed[(p, t)])
+            matrices[date] = matrix
+
+        cache.set_many(
+            {keys[date]: matrices[date] for date in missing},
+            timeout=PAGE_CACHE_TIMEOUT,
+        )
+
+    return collections.OrderedDict((date, matrices[date]) for date in dates)
+
+
 def generate_fixture_grid(
     season,
     dates=None,
@@ -601,39 +746,8 @@ def generate_fixture_grid(
     if extra_context is None:
         extra_context = {}
 
-    matrices = collections.OrderedDict()
-
     play_at = season.get_places()
-
-    for date in dates:
-        matches = season.matches.select_related(
-            "stage_group",
-            "stage",
-            "stage__division",
-            "home_team",
-            "home_team__club",
-            "away_team",
-            "away_team__club",
-            "play_at",
-        ).filter(date=date)
-
-        times = sorted(
-            {m.time for m in matches if m.time is not None}.union(
-                season.get_timeslots(date)
-            )
-        )
-
-        keyed = collections.defaultdict(lambda: None)
-        for m in matches:
-            keyed.setdefault((m.play_at, m.time), []).append(m)
-
-        matrix = collections.OrderedDict()
-        for t in times:
-            matrix.setdefault(t, collections.OrderedDict())
-            for p in play_at:
-                matrix[t].setdefault(p, keyed[(p, t)])
-
-        matrices.setdefault(date, matrix)
+    matrices = fixture_grid_matrices(season, dates, play_at)
 
     context = {
         "matrices": matrices,
@@ -685,6 +799,9 @@ def forfeit_notification_recipients(match):
 
 
 def regrade(team, to, from_date=None):
+    from tournamentcontrol.competition.calendars import schedule_calendar_render
+    from tournamentcontrol.competition.pagecache import invalidate_matches
+
     Division = apps.get_model("competition", "Division")
     Team = apps.get_model("competition", "Team")
 
@@ -705,17 +822,38 @@ def regrade(team, to, from_date=None):
     # into byes, removing them from the home_team and away_team fields. Strip
     # the time and field also.
     old_matches = team.matches.filter(match_unplayed, date__gte=from_date)
+    new_matches = to.matches.filter(legitimate_bye_match, date__gte=from_date)
+    affected = list(old_matches.values_list("pk", flat=True)) + list(
+        new_matches.values_list("pk", flat=True)
+    )
+    now = timezone.now()
     old_matches.filter(home_team=team).update(
-        home_team=None, is_bye=True, time=None, datetime=None, play_at=None
+        home_team=None,
+        is_bye=True,
+        time=None,
+        datetime=None,
+        play_at=None,
+        last_modified=now,
     )
     old_matches.filter(away_team=team).update(
-        away_team=None, is_bye=True, time=None, datetime=None, play_at=None
+        away_team=None,
+        is_bye=True,
+        time=None,
+        datetime=None,
+        play_at=None,
+        last_modified=now,
     )
 
     # Move team into the bye matches in the new division.
-    new_matches = to.matches.filter(legitimate_bye_match, date__gte=from_date)
-    new_matches.filter(home_team=None).update(home_team=team, is_bye=False)
-    new_matches.filter(away_team=None).update(away_team=team, is_bye=False)
+    new_matches.filter(home_team=None).update(
+        home_team=team, is_bye=False, last_modified=now
+    )
+    new_matches.filter(away_team=None).update(
+        away_team=team, is_bye=False, last_modified=now
+    )
+    old_matches.model.objects.filter(pk__in=affected).refresh_team_titles()
+    invalidate_matches(affected)
+    schedule_calendar_render(match_ids=affected, team_ids=[team.pk])
 
     # Determine the highest sequence value in the target division and assign
     # that to our team. If it throws an DoesNotExist exception, the division